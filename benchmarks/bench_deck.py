@@ -0,0 +1,339 @@
+"""Headless benchmark suite for the UMPB overlay.
+
+Runs under ``QT_QPA_PLATFORM=offscreen`` (set automatically), with no display
+and no real keyboard: the global listener is replaced by a fake one, so the
+real ``_install_hotkey`` callbacks are driven by synthetic key events.
+
+    python benchmarks/bench_deck.py -o base.json
+    python benchmarks/bench_deck.py -o new.json --compare base.json
+
+Each result is reported per operation (µs): min / median / mean / stdev.
+``--compare`` exits with status 1 when a median got slower than ``--threshold``.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import PySide6  # noqa: E402
+from PySide6.QtCore import QEvent, QObject  # noqa: E402
+from PySide6.QtTest import QTest  # noqa: E402
+from PySide6.QtWidgets import QApplication, QWidget  # noqa: E402
+
+import deck_fixtures  # noqa: E402
+import deck_overlay  # noqa: E402
+from deck_overlay import Shortcut, VirtualSteamDeck  # noqa: E402
+from umpb import MOD_ALT, NativeHotkeys  # noqa: E402
+
+LAYOUT_SIZES = (10, 100, 1_000, 10_000)
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+class _FakeNative(NativeHotkeys):
+    """Backend nativo senza OS: `_press` come se l'OS avesse consegnato la combo registrata."""
+
+    name = "fake"
+
+    def update(self, table):
+        pass
+
+    def _run(self):
+        self._registered([])
+
+
+class _PaintCounter(QObject):
+    """Conta i QEvent.Paint consegnati a un widget e ai suoi discendenti."""
+
+    def __init__(self, root: QWidget):
+        super().__init__()
+        self.root = root
+        self.paints = 0
+
+    def eventFilter(self, obj, event) -> bool:
+        if event.type() == QEvent.Paint and (obj is self.root or self.root.isAncestorOf(obj)):
+            self.paints += 1
+        return False
+
+
+def make_deck_class(workdir: Path, renderer: str = VirtualSteamDeck.RENDERER):
+    return deck_fixtures.make_deck_class(workdir, RENDERER=renderer)
+
+
+def synthetic_layout(n: int, per_page: int = 8) -> dict:
+    shortcuts = []
+    for i in range(n):
+        if i % 4 == 3:
+            sc = Shortcut(str(i), f"App {i}", "", f"app{i}", "bg-purple-500", "app",
+                          path=f"/nonexistent/App{i}.app")
+        else:
+            sc = Shortcut(str(i), f"Action {i}", f"ctrl+shift+{'abcdefgh'[i % 8]}",
+                          f"action{i}", "bg-blue-500", "shortcut")
+        shortcuts.append(sc.to_dict())
+    pages = [shortcuts[i:i + per_page] for i in range(0, len(shortcuts), per_page)] or [[]]
+    return {"version": 2, "pages": pages}
+
+
+def key(char: str = None, name: str = None):
+    """Evento tastiera sintetico con la stessa forma dei Key/KeyCode di pynput."""
+    return SimpleNamespace(char=char, name=name, vk=None)
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+def measure(fn: Callable[[], None], number: int, repeat: int, setup: Callable[[], None] = None) -> Dict:
+    if setup:
+        setup()
+    fn()                                    # warm-up
+    samples: List[float] = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter_ns()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter_ns() - t0) / number / 1e3)
+    return {
+        "unit": "us/op",
+        "number": number,
+        "repeat": repeat,
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+
+
+def run(app: QApplication, quick: bool, only: str = "") -> Dict[str, Dict]:
+    results: Dict[str, Dict] = {}
+    scale = 0.2 if quick else 1.0
+    reps = 3 if quick else 7
+
+    def bench(name: str, fn, number: int, setup=None):
+        if only and only not in name:
+            return
+        results[name] = measure(fn, max(1, int(number * scale)), reps, setup)
+        print(f"{name:<36}{results[name]['median']:>12.1f} us/op", flush=True)
+
+    with tempfile.TemporaryDirectory(prefix="umpb-bench-") as tmp:
+        workdir = Path(tmp)
+        deck_overlay.ICON_CACHE.disk_dir = workdir / "icons"
+        Deck = make_deck_class(workdir)
+        decks: List[VirtualSteamDeck] = []
+
+        def write_layout(n: int):
+            Deck.LAYOUT_PATH.write_text(json.dumps(synthetic_layout(n)), encoding="utf-8")
+
+        def build():
+            d = Deck()
+            d.show()
+            app.processEvents()
+            decks.append(d)
+
+        def drop_decks():
+            while decks:
+                d = decks.pop()
+                d._executor.shutdown(0)
+                d.close()
+                d.deleteLater()
+            app.processEvents()
+
+        # ---- construction
+        for n in (8, 1_000):
+            write_layout(n)
+            bench(f"construct/{n}", build, 5)
+            drop_decks()
+
+        # ---- paging & edit mode (on a 40-page deck)
+        write_layout(320)
+        deck = Deck()
+        deck.show()
+        app.processEvents()
+        pages = len(deck.pages)
+        state = {"i": 0}
+
+        def switch():
+            state["i"] = (state["i"] + 1) % pages
+            deck._goto_page(state["i"])
+
+        def switch_cold():
+            state["i"] = (state["i"] + 1) % pages
+            deck._invalidate_page(state["i"])
+            deck._goto_page(state["i"])
+
+        def toggle_edit():
+            deck._handle_settings()
+
+        for i in range(pages):          # tutte le pagine in cache
+            deck._goto_page(i)
+        bench("page_switch/cached", switch, 400)
+        bench("page_switch/cold", switch_cold, 100)
+        bench("edit_toggle", toggle_edit, 200)
+        deck.is_edit_mode = False
+        deck._refresh_ui()
+
+        # ---- layout load / save
+        for n in LAYOUT_SIZES:
+            write_layout(n)
+            number = max(1, 20_000 // n)
+            bench(f"layout_load/{n}", deck._load_layout, number)
+
+            def save():
+                deck._save_layout()
+                deck._persister.flush()
+
+            bench(f"layout_save/{n}", save, number)
+
+        # ---- hotkey → engine → coda → _trigger_tile via the real _install_hotkey callbacks
+        write_layout(8)
+        deck._load_layout()
+        fired = {"n": 0}
+        deck.tile_requested.disconnect(deck._trigger_tile)                      # solo dispatch
+        deck.tile_requested.connect(lambda _: fired.__setitem__("n", fired["n"] + 1))
+        lst = deck.fake_listener
+        alt, three, plain = key(name="alt"), key(char="3"), key(char="x")
+
+        def hotkey():
+            lst.on_press(alt)
+            lst.on_press(three)
+            lst.on_release(three)
+            lst.on_release(alt)
+
+        def typing():
+            lst.on_press(plain)
+            lst.on_release(plain)
+
+        native = _FakeNative(deck._hotkey_engine, deck._dispatch_hotkey)
+
+        def native_hotkey():
+            native._press(MOD_ALT, "3")
+            native.engine.release_key("3")
+
+        bench("hotkey/dispatch", hotkey, 5_000)
+        if "hotkey/dispatch" in results:
+            results["hotkey/dispatch"]["emitted"] = fired["n"]
+        bench("hotkey/non_matching_key", typing, 20_000)
+        fired["n"] = 0
+        bench("hotkey/native_dispatch", native_hotkey, 5_000)
+        if "hotkey/native_dispatch" in results:
+            results["hotkey/native_dispatch"]["emitted"] = fired["n"]      # tile_requested emessi
+
+        # ---- usage: costo di un uso sul percorso del click, classifica su 1000 tile usati
+        usage = deck._usage
+        bench("usage/hit", lambda: usage.hit("0"), 20_000)
+        for i in range(1_000):
+            usage.hit(str(i))
+        usage.fold()
+        bench("usage/rank_1000", lambda: usage.ranked(8), 200)
+
+        deck._executor.shutdown(0)
+        deck.close()
+        drop_decks()
+
+        # ---- renderer: widget per pagina, hover tra due tile, frame completo
+        for renderer in VirtualSteamDeck.RENDERERS:
+            write_layout(8)                 # senza chiave "renderer": vale quello della classe
+            d = make_deck_class(workdir, renderer)()
+            d.show()
+            d._handle_settings()            # edit-mode: badge ✕ e ➕ visibili
+            app.processEvents()
+            view = d.grid_stack.currentWidget()
+            if renderer == "painted":
+                centers = [view.cell_rect(i).center() for i in (0, 1)]
+            else:
+                centers = [view.tiles[i].geometry().center() for i in (0, 1)]
+            counter = _PaintCounter(view)
+            hover = {"i": 0, "moves": 0}
+
+            def move():
+                hover["i"] ^= 1
+                hover["moves"] += 1
+                QTest.mouseMove(view, centers[hover["i"]])
+                app.processEvents()
+
+            name = f"render/{renderer}"
+            app.installEventFilter(counter)
+            bench(f"{name}/hover", move, 200)
+            app.removeEventFilter(counter)
+            bench(f"{name}/frame", view.grab, 100)
+            if f"{name}/hover" in results:
+                results[f"{name}/hover"]["widgets"] = len(view.findChildren(QWidget)) + 1
+                results[f"{name}/hover"]["paints_per_op"] = counter.paints / hover["moves"]
+            d._executor.shutdown(0)
+            d.close()
+            d.deleteLater()
+            app.processEvents()
+
+        # ---- CLI Qt-free: processo completo `python -m umpb list` su 1000 tile
+        write_layout(1_000)
+        root = Path(__file__).resolve().parent.parent
+        cli = [sys.executable, "-m", "umpb", "--layout", str(Deck.LAYOUT_PATH), "list"]
+        bench("cli/list_1000", lambda: subprocess.run(cli, cwd=root, stdout=subprocess.DEVNULL, check=True), 10)
+
+    return results
+
+
+def compare(base: Dict, new: Dict, threshold: float) -> int:
+    regressions = 0
+    print(f"\n{'benchmark':<36}{'base':>10}{'new':>10}{'ratio':>8}")
+    for name, res in new["results"].items():
+        old = base["results"].get(name)
+        if old is None:
+            print(f"{name:<36}{'-':>10}{res['median']:>10.1f}{'new':>8}")
+            continue
+        ratio = res["median"] / old["median"] if old["median"] else float("inf")
+        flag = "  ← slower" if ratio > threshold else ""
+        regressions += bool(flag)
+        print(f"{name:<36}{old['median']:>10.1f}{res['median']:>10.1f}{ratio:>8.2f}{flag}")
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-o", "--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", metavar="BASE", help="compare against a previous JSON result")
+    parser.add_argument("--threshold", type=float, default=1.15, help="slowdown ratio flagged as regression")
+    parser.add_argument("--quick", action="store_true", help="fewer iterations (smoke run)")
+    parser.add_argument("-k", dest="only", default="", help="only run benchmarks whose name contains this")
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication([sys.argv[0]])
+    results = run(app, args.quick, args.only)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pyside6": PySide6.__version__,
+            "platform": platform.platform(),
+            "qpa": os.environ.get("QT_QPA_PLATFORM"),
+            "quick": args.quick,
+        },
+        "results": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if args.compare:
+        base = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        return 1 if compare(base, report, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
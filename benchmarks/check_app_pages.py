@@ -0,0 +1,123 @@
+"""Headless check of the app → page routing (layout key ``app_rules``).
+
+Drives the real ``_make_window_watcher`` hook with a ``FakeWindowWatcher``: window
+changes are injected from a separate thread, as the X11/Win32/macOS watchers do, and
+the deck must switch to the mapped page, once, and never re-render when the resolved
+page does not change (same app, another window of it, an unmapped app, edit mode).
+
+    python benchmarks/check_app_pages.py
+
+Exit status 1 when a step does not behave as expected.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+import deck_fixtures  # noqa: E402
+from deck_overlay import FakeWindowWatcher, Shortcut  # noqa: E402
+
+RULES = {"firefox": 2, "code": 3}          # pagine da 1, come nel layout
+
+
+def make_deck_class(workdir: Path):
+    class AppPagesDeck(deck_fixtures.make_deck_class(workdir)):
+        def _make_window_watcher(self):
+            self.fake_watcher = FakeWindowWatcher()
+            self.switches = 0
+            return self.fake_watcher
+
+        def _goto_page(self, idx: int):
+            self.switches += 1
+            super()._goto_page(idx)
+
+    return AppPagesDeck
+
+
+def layout() -> dict:
+    pages = [[Shortcut(f"{p}-{i}", f"Tile {p}.{i}", "", f"a{p}{i}", "bg-blue-500", "shortcut").to_dict()
+              for i in range(3)] for p in range(3)]
+    return {"version": 2, "app_rules": RULES, "pages": pages}
+
+
+def spin(app: QApplication, seconds: float = 0.05):
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        app.processEvents()
+        time.sleep(0.002)
+
+
+def run(app: QApplication) -> List[str]:
+    failures: List[str] = []
+    with tempfile.TemporaryDirectory(prefix="umpb-apppages-") as tmp:
+        Deck = make_deck_class(Path(tmp))
+        Deck.LAYOUT_PATH.write_text(json.dumps(layout()), encoding="utf-8")
+        deck = Deck()
+        deck.show()
+        deadline = time.monotonic() + 5
+        while getattr(deck, "fake_watcher", None) is None and time.monotonic() < deadline:
+            spin(app)                   # il watcher parte dopo il primo paint
+        if getattr(deck, "fake_watcher", None) is None:
+            return ["the window watcher was not started (app_rules present)"]
+        stack_changes = {"n": 0}
+        deck.grid_stack.currentChanged.connect(lambda _: stack_changes.__setitem__("n", stack_changes["n"] + 1))
+
+        def step(label: str, wid, app_name: str, page: int, switched: bool, edit: Optional[bool] = None):
+            if edit is not None and edit != deck.is_edit_mode:
+                deck._handle_settings()
+            before, changes = deck.switches, stack_changes["n"]
+            t = threading.Thread(target=deck.fake_watcher.activate, args=(wid, app_name))
+            t.start()                   # dal thread del watcher, come i backend veri
+            t.join()
+            spin(app)
+            did = deck.switches - before
+            ok = deck.current_page == page and did == (1 if switched else 0)
+            if not switched and stack_changes["n"] != changes:
+                ok = False
+            print(f"{label:<44}page {deck.current_page + 1}  switches {did}  {'ok' if ok else 'FAIL'}", flush=True)
+            if not ok:
+                failures.append(f"{label}: page {deck.current_page + 1}, {did} switch(es), "
+                                f"expected page {page + 1}, {1 if switched else 0}")
+
+        step("firefox → page 2", 101, "Navigator.firefox", 1, True)
+        step("another firefox window", 102, "Navigator.firefox", 1, False)
+        step("same firefox window again (cached)", 101, "Navigator.firefox", 1, False)
+        step("unmapped app: stay", 103, "xterm", 1, False)
+        step("code → page 3", 104, "code.Code", 2, True)
+        step("unmapped app again: stay", 103, "xterm", 2, False)
+        step("firefox while in edit mode: stay", 101, "Navigator.firefox", 2, False, edit=True)
+        step("code after edit mode: already shown", 104, "code.Code", 2, False, edit=False)
+        step("firefox in edit mode again: stay", 101, "Navigator.firefox", 2, False, edit=True)
+        step("another firefox window after edit mode", 102, "Navigator.firefox", 1, True, edit=False)
+        step("code → page 3 again", 104, "code.Code", 2, True)
+        deck._goto_page(0)
+        step("firefox after a manual page change", 102, "Navigator.firefox", 1, True)
+
+        deck._executor.shutdown(0)
+        deck.close()
+        deck.deleteLater()
+        app.processEvents()
+    return failures
+
+
+def main() -> int:
+    app = QApplication.instance() or QApplication([sys.argv[0]])
+    failures = run(app)
+    for f in failures:
+        print("FAIL:", f)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
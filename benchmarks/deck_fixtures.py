@@ -0,0 +1,55 @@
+"""Fixture condivise dagli script in benchmarks/: un deck headless isolato e un listener finto.
+
+    from deck_fixtures import FakeListener, make_deck_class
+
+Gli script girano come ``python benchmarks/<script>.py``: la cartella è già in sys.path.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Callable, Optional
+
+from deck_overlay import VirtualSteamDeck
+
+
+class FakeListener:
+    """Sostituisce pynput.keyboard.Listener: nessun thread, nessuna tastiera."""
+
+    running = True
+
+    def __init__(self, on_press: Optional[Callable] = None, on_release: Optional[Callable] = None):
+        self.on_press = on_press
+        self.on_release = on_release
+
+    def start(self):
+        pass
+
+    def wait(self):
+        pass
+
+    def is_alive(self) -> bool:
+        return True
+
+    def stop(self):
+        self.running = False
+
+
+def make_deck_class(workdir: Path, **attrs):
+    """Sottoclasse di VirtualSteamDeck per i benchmark: layout in `workdir`, niente socket di
+    controllo né watcher del file, FakeListener (in `fake_listener`) al posto di pynput.
+
+    `attrs` sovrascrive gli attributi di classe (RENDERER, HOTKEY_BACKEND, …).
+    """
+    class HeadlessDeck(VirtualSteamDeck):
+        LAYOUT_PATH = workdir / "layout.json"
+        CONTROL_NAME = None
+        WATCH_LAYOUT = False
+        HOTKEY_BACKEND = "pynput"           # il fake listener prende il posto di pynput
+
+        def _make_listener(self, on_press, on_release):
+            self.fake_listener = FakeListener(on_press, on_release)
+            return self.fake_listener
+
+    for name, value in attrs.items():
+        setattr(HeadlessDeck, name, value)
+    return HeadlessDeck
@@ -0,0 +1,459 @@
+"""Replay harness for the global hot-key listener.
+
+Drives the real ``_install_hotkey`` callbacks (``HotkeyInput`` → engine → queue →
+GUI drain) from a ``umpb.ReplaySource`` instead of a keyboard, headless
+(``QT_QPA_PLATFORM=offscreen``), and compares the actions the deck emits on its
+public signals (``toggle_requested``, ``tile_requested``, …) with the expected ones,
+exactly and in order.
+
+    python benchmarks/replay_hotkeys.py                       # all synthetic scenarios
+    python benchmarks/replay_hotkeys.py -k shifted --speed 1  # one scenario, real time
+    python benchmarks/replay_hotkeys.py --stream keys.jsonl   # recorded with deck_overlay.py --record-keys
+    python benchmarks/replay_hotkeys.py --save streams/       # write the synthetic streams as JSON lines
+    xvfb-run -a python benchmarks/replay_hotkeys.py --native  # native X11 backend (XGrabKey), keys via XTest
+
+The stream clock is virtual: auto-repeat and rate limits see the recorded
+intervals whatever ``--speed`` is, so results only depend on the stream.
+At ``--speed 0`` the listener thread can outrun the GUI thread and the bounded
+listener → GUI queue drops actions: that run passes ("ok, lossy") only if the
+missing actions are exactly the counted drops, with nothing extra or reordered.
+Exit status 1 when an expected sequence does not match.
+
+``--native`` checks the registered-hotkey backend instead of pynput: the deck grabs its
+combos with XGrabKey and the stream is typed into the X server through the XTest
+extension (an Xvfb is enough), so only the grabbed combos reach the deck. The engine
+then runs on the real clock, hence the default speed of 1; the "cb" columns report the
+cost of each injected event, and storm is left out.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+import deck_fixtures  # noqa: E402
+from deck_overlay import VirtualSteamDeck  # noqa: E402
+from umpb import ReplaySource, load_key_stream, save_key_stream, x11_keysym  # noqa: E402
+
+
+# ---------------------------------------------------------------------------
+# Synthetic streams (default bindings: ctrl+shift+d toggle, alt+1…8 tiles)
+# ---------------------------------------------------------------------------
+
+TOGGLE = ("toggle",)
+
+
+def tile(n: int) -> tuple:
+    """Azione attesa per Alt+n (n da 1)."""
+    return ("tile", n - 1)
+
+
+class Stream:
+    """Costruisce un flusso: tempo che avanza, tasti giù/su, azioni attese."""
+
+    def __init__(self):
+        self.t = 0.0
+        self.events: List[tuple] = []
+        self.expected: List[tuple] = []
+
+    def wait(self, ms: float):
+        self.t += ms / 1000
+
+    def down(self, key: str, ms: float = 0, expect: tuple = None):
+        self.events.append((self.t, True, key))
+        if expect is not None:
+            self.expected.append(expect)
+        self.wait(ms)
+
+    def up(self, key: str, ms: float = 0):
+        self.events.append((self.t, False, key))
+        self.wait(ms)
+
+    def tap(self, key: str, hold: float = 30, gap: float = 20, expect: tuple = None):
+        self.down(key, hold, expect)
+        self.up(key, gap)
+
+    def combo(self, mods: List[str], key: str, expect: tuple = None, hold: float = 40):
+        for m in mods:
+            self.down(m, 8)
+        self.tap(key, hold, 8, expect)
+        for m in reversed(mods):
+            self.up(m, 8)
+        self.wait(60)
+
+
+def typist(rng: random.Random) -> Stream:
+    """Dattilografo veloce (~25 ms tra i tasti, rollover), con Alt+N e toggle in mezzo al testo."""
+    s = Stream()
+    letters = "etaoinshrdlucmfwypvbgkqjxz"
+    for w in range(400):
+        word = "".join(rng.choice(letters) for _ in range(rng.randint(2, 9)))
+        prev = None
+        for ch in word:
+            if ch.isalpha() and rng.random() < 0.05:
+                s.down("shift_l", 10)           # maiuscola: arriva come char shiftato
+                ch = ch.upper()
+            s.down(ch, rng.uniform(10, 30))
+            if prev is not None:
+                s.up(prev, rng.uniform(2, 10))  # rollover: il tasto precedente si rilascia dopo
+            prev = ch
+            if ch.isupper():
+                s.up("shift_l", 5)
+        s.up(prev, 15)
+        s.tap("space", 20, 25)
+        if rng.random() < 0.15:
+            s.tap(str(rng.randint(0, 9)))       # cifre senza Alt: nessuna azione
+        if w % 20 == 19:
+            n = rng.randint(1, 8)
+            s.combo(["alt"], str(n), tile(n))
+        if w % 97 == 96:
+            s.combo(["ctrl", "shift"], "d", TOGGLE)
+    return s
+
+
+def autorepeat(rng: random.Random) -> Stream:
+    """Combo tenute premute: l'OS ripete il press ogni ~33 ms; deve scattare una volta sola."""
+    s = Stream()
+    for n in range(1, 9):
+        s.down("alt", 10)
+        s.down(str(n), rng.uniform(250, 400), tile(n))   # ritardo prima del primo repeat
+        for _ in range(rng.randint(20, 60)):
+            s.down(str(n), 33)
+        s.up(str(n), 10)
+        s.up("alt", 80)
+    s.down("ctrl", 5)
+    s.down("shift", 5)
+    s.down("d", 300, TOGGLE)
+    for _ in range(40):
+        s.down("d", 33)
+    s.up("d", 5)
+    s.up("shift", 5)
+    s.up("ctrl", 100)
+    return s
+
+
+def interleaved(rng: random.Random) -> Stream:
+    """Modificatori premuti e rilasciati in ordini diversi, lati sinistro/destro sovrapposti."""
+    s = Stream()
+    for _ in range(25):
+        # rilascio dei modificatori prima del tasto
+        s.down("ctrl", 6); s.down("shift", 6); s.down("d", 20, TOGGLE)
+        s.up("ctrl", 6); s.up("d", 6); s.up("shift", 40)
+        # ordine inverso, lati diversi
+        s.down("shift_r", 6); s.down("ctrl_l", 6); s.down("d", 20, TOGGLE)
+        s.up("d", 6); s.up("shift_r", 6); s.up("ctrl_l", 40)
+        # alt_l rilasciato mentre alt_r resta giù
+        s.down("alt_l", 6); s.down("alt_r", 6); s.up("alt_l", 6)
+        s.down("4", 20, tile(4)); s.up("4", 6); s.up("alt_r", 40)
+        # tasto prima del modificatore: nessuna azione
+        s.down("5", 6); s.down("alt", 20); s.up("5", 6); s.up("alt", 40)
+        # Alt rilasciato con il tasto ancora giù, poi il tasto da solo
+        s.down("alt", 6); s.down("6", 20, tile(6)); s.up("alt", 6); s.up("6", 20)
+        s.tap("6")
+        # due cifre con Alt tenuto, la seconda prima di rilasciare la prima
+        s.down("alt", 6); s.down("1", 15, tile(1)); s.down("2", 15, tile(2))
+        s.up("1", 6); s.up("2", 6); s.up("alt", rng.uniform(30, 90))
+    return s
+
+
+def shifted(rng: random.Random) -> Stream:
+    """Alt+Shift+cifra arriva come simbolo ("!"); il release può arrivare già senza Shift ("1")."""
+    s = Stream()
+    symbols = "!@#$%^&*"
+    for _ in range(30):
+        n = rng.randint(1, 8)
+        sym = symbols[n - 1]
+        s.down("alt", 6)
+        s.down("shift", 6)
+        s.down(sym, 20, tile(n))
+        s.up("shift", 6)
+        s.up(str(n), 10)                # Shift già su: il release riporta la cifra
+        s.down("shift", 6)              # subito di nuovo, entro la finestra dell'auto-repeat
+        s.down(sym, 20, tile(n))
+        s.up(sym, 6)                    # questa volta il release riporta il simbolo
+        s.up("shift", 6)
+        s.up("alt", rng.uniform(40, 120))
+    return s
+
+
+def storm(rng: random.Random) -> Stream:
+    """Tutti gli scenari concatenati più volte: throughput del percorso completo."""
+    s = Stream()
+    for i in range(5):
+        for make in (typist, autorepeat, interleaved, shifted):
+            part = make(random.Random(rng.random()))
+            s.events.extend((s.t + t, press, key) for t, press, key in part.events)
+            s.expected.extend(part.expected)
+            s.t += part.t + 0.5
+    return s
+
+
+# nome → (costruttore, velocità di default): gli scenari realistici girano a 20× il tempo
+# registrato, lo storm il più veloce possibile (lì il thread GUI può restare indietro)
+SCENARIOS: Dict[str, tuple] = {
+    "typist": (typist, 20.0),
+    "autorepeat": (autorepeat, 20.0),
+    "interleaved": (interleaved, 20.0),
+    "shifted": (shifted, 20.0),
+    "storm": (storm, 0.0),
+}
+NATIVE_SCENARIOS = ("typist", "autorepeat", "interleaved", "shifted")
+
+
+# ---------------------------------------------------------------------------
+# Replay through the deck
+# ---------------------------------------------------------------------------
+
+class GatedReplay(ReplaySource):
+    """Il deck avvia il listener nel costruttore: il replay parte solo con `release()`,
+    quando il loop degli eventi gira e il drain può tenere il passo."""
+
+    def start(self):
+        self.running = True
+
+    def release(self):
+        self._thread.start()
+
+
+class XTestReplay:
+    """Digita il flusso nel server X con XTest, dal proprio thread: al deck arrivano solo
+    le combo registrate dal backend nativo, come da una tastiera vera. Stessa interfaccia
+    di GatedReplay per `replay()`; `costs_ns` è il costo di ogni evento iniettato."""
+
+    def __init__(self, events: List[tuple], speed: float):
+        from Xlib import display
+
+        self._display = display.Display()
+        if not self._display.has_extension("XTEST"):
+            raise RuntimeError("the X server has no XTEST extension")
+        keycodes: Dict[str, int] = {}
+        self.events = []
+        for t, press, name in events:
+            if name not in keycodes:
+                sym = x11_keysym(name)
+                keycodes[name] = self._display.keysym_to_keycode(sym) if sym else 0
+            if keycodes[name]:                  # tasto assente dalla keymap (o segnaposto): saltato
+                self.events.append((t, press, keycodes[name]))
+        self.speed = speed
+        self.costs_ns: List[int] = []
+        self.elapsed = 0.0
+        self._thread = threading.Thread(target=self._run, name="umpb-xtest", daemon=True)
+
+    def release(self):
+        self._thread.start()
+
+    def is_alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def _run(self):
+        from Xlib import X
+        from Xlib.ext import xtest
+
+        d, costs, clock = self._display, self.costs_ns, time.perf_counter_ns
+        start = time.perf_counter()
+        for t, press, keycode in self.events:
+            delay = start + t / self.speed - time.perf_counter() if self.speed > 0 else 0
+            if delay > 0:
+                time.sleep(delay)
+            t0 = clock()
+            xtest.fake_input(d, X.KeyPress if press else X.KeyRelease, keycode)
+            d.flush()
+            costs.append(clock() - t0)
+        d.sync()
+        self.elapsed = time.perf_counter() - start
+        d.close()
+
+
+def make_deck_class(workdir: Path, events: List[tuple], speed: float, native: bool = False):
+    class ReplayDeck(deck_fixtures.make_deck_class(workdir, HOTKEY_BACKEND="native" if native else "pynput")):
+        def __init__(self):
+            super().__init__()
+            # le azioni si registrano dai segnali pubblici, emessi dal drain della coda
+            self.delivered: List[tuple] = []
+            record = self.delivered.append
+            self.toggle_requested.connect(lambda: record(("toggle",)))
+            self.tile_requested.connect(lambda idx: record(("tile", idx)))
+            self.page_requested.connect(lambda idx: record(("page", idx)))
+            self.shortcut_requested.connect(lambda sid: record(("shortcut", sid)))
+            self.palette_requested.connect(lambda: record(("palette",)))
+            self.most_used_requested.connect(lambda: record(("most_used",)))
+
+        def _make_listener(self, on_press, on_release):
+            self.source = GatedReplay(events, on_press, on_release, speed)
+            return self.source
+
+        # gli slot del deck non eseguono nulla (niente finestra mostrata, tasti inviati, pagine)
+        def _on_toggle_requested(self):
+            pass
+
+        def _trigger_tile(self, idx):
+            pass
+
+        def _trigger_page(self, idx):
+            pass
+
+        def _trigger_shortcut(self, sid):
+            pass
+
+        def _open_palette(self):
+            pass
+
+        def _show_most_used(self):
+            pass
+
+    return ReplayDeck
+
+
+def is_subsequence(short: List[tuple], long: List[tuple]) -> bool:
+    it = iter(long)
+    return all(a in it for a in short)
+
+
+def wait_native(app: QApplication, deck: VirtualSteamDeck) -> bool:
+    """Attende che il backend nativo abbia registrato le combo; False se non è partito."""
+    source = deck._hotkey_source
+    while deck.hotkey_backend == "x11" and source.is_alive() and not source._ready.is_set():
+        app.processEvents()
+        time.sleep(0.005)
+    app.processEvents()                 # eventuale fallback su pynput
+    return deck.hotkey_backend == "x11" and source.is_alive()
+
+
+def replay(app: QApplication, workdir: Path, events: List[tuple], expected: Optional[List[tuple]],
+           speed: float, native: bool = False) -> Dict:
+    Deck = make_deck_class(workdir, events, speed, native)
+    deck = Deck()
+    if native:
+        if not wait_native(app, deck):
+            raise RuntimeError(f"native hot-keys not active (backend: {deck.hotkey_backend})")
+        source = XTestReplay(events, speed)
+    else:
+        source = deck.source
+    app.processEvents()
+    source.release()
+    while source.is_alive():
+        app.processEvents()
+    settle = time.monotonic() + (0.3 if native else 0)    # eventi X ancora in volo verso il backend
+    app.processEvents()                 # ultimo drain della coda
+    while time.monotonic() < settle:
+        app.processEvents()
+        time.sleep(0.005)
+    delivered = list(deck.delivered)
+    costs = sorted(source.costs_ns) or [0]
+    dropped = deck._hotkey_queue.dropped
+    result = {
+        "speed": speed,
+        "events": len(events),
+        "elapsed_s": source.elapsed,
+        "events_per_s": len(events) / source.elapsed if source.elapsed else 0.0,
+        "callback_us": {
+            "median": statistics.median(costs) / 1e3,
+            "p99": costs[min(len(costs) - 1, int(len(costs) * 0.99))] / 1e3,
+            "max": costs[-1] / 1e3,
+        },
+        "delivered": {k: sum(1 for a in delivered if a[0] == k) for k in ("toggle", "tile")},
+        "engine": dict(deck._hotkey_engine.counters),
+        "dropped": dropped,
+    }
+    if expected is not None:
+        result["expected"] = {k: sum(1 for a in expected if a[0] == k) for k in ("toggle", "tile")}
+        result["exact"] = delivered == expected
+        # sotto sovraccarico la coda listener → GUI scarta (by design): va bene solo se
+        # mancano esattamente le azioni scartate, senza azioni fantasma o fuori ordine
+        result["match"] = result["exact"] or (
+            len(expected) - len(delivered) == dropped and is_subsequence(delivered, expected))
+        if not result["exact"]:
+            i = next((i for i, (a, b) in enumerate(zip(expected, delivered)) if a != b),
+                     min(len(expected), len(delivered)))
+            result["first_mismatch"] = {
+                "index": i,
+                "expected": [list(a) for a in expected[i:i + 3]],
+                "actual": [list(a) for a in delivered[i:i + 3]],
+            }
+    deck._executor.shutdown(0)
+    deck.close()
+    deck.deleteLater()
+    app.processEvents()
+    return result
+
+
+def report(name: str, r: Dict):
+    exp = r.get("expected")
+    status = "-" if exp is None else ("ok" if r["exact"] else "ok, lossy" if r["match"] else "MISMATCH")
+    counts = f"{r['delivered']['toggle']}/{r['delivered']['tile']}"
+    if exp is not None:
+        counts += f" of {exp['toggle']}/{exp['tile']}"
+    cb = r["callback_us"]
+    print(f"{name:<22}{r['speed']:>6g}{r['events']:>8}{r['events_per_s']:>12.0f}{cb['median']:>9.1f}{cb['p99']:>9.1f}"
+          f"   {counts:<20}{status}", flush=True)
+    if exp is not None and not r["exact"]:
+        m = r["first_mismatch"]
+        print(f"    first mismatch at action #{m['index']}: expected {m['expected']} got {m['actual']}")
+    if r["dropped"]:
+        print(f"    {r['dropped']} action(s) dropped by the full listener → GUI queue")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="only", default="", help="only run scenarios whose name contains this")
+    parser.add_argument("--speed", type=float,
+                        help="replay speed: 1 = recorded timing, 2 = twice as fast, 0 = as fast as possible "
+                             "(default: 20 for the synthetic scenarios and recordings, 0 for storm)")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the synthetic streams")
+    parser.add_argument("--stream", metavar="FILE", action="append", default=[],
+                        help="replay a recorded JSON-lines stream (instead of the synthetic scenarios)")
+    parser.add_argument("--save", metavar="DIR", help="write the synthetic streams to DIR and exit")
+    parser.add_argument("--native", action="store_true",
+                        help="test the native X11 backend: keys typed through XTest (needs an X server, "
+                             "e.g. xvfb-run); default speed 1")
+    parser.add_argument("-o", "--output", help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+    if args.native and not os.environ.get("DISPLAY"):
+        parser.error("--native needs an X server (DISPLAY), e.g. xvfb-run -a python benchmarks/replay_hotkeys.py --native")
+
+    if args.stream:
+        runs = [(Path(f).name, *load_key_stream(Path(f)), 20.0) for f in args.stream]
+    else:
+        runs = []
+        for name, (make, speed) in SCENARIOS.items():
+            if args.only in name and (not args.native or name in NATIVE_SCENARIOS):
+                s = make(random.Random(args.seed))
+                runs.append((name, s.events, s.expected, speed))
+    if args.save:
+        out = Path(args.save)
+        out.mkdir(parents=True, exist_ok=True)
+        for name, events, expected, _ in runs:
+            save_key_stream(out / f"{name}.jsonl", events, expected)
+        print(f"{len(runs)} stream(s) written to {out}")
+        return 0
+
+    app = QApplication.instance() or QApplication([sys.argv[0]])
+    results: Dict[str, Dict] = {}
+    print(f"{'stream':<22}{'speed':>6}{'events':>8}{'events/s':>12}{'cb p50':>9}{'cb p99':>9}   toggle/tile (µs per callback)")
+    with tempfile.TemporaryDirectory(prefix="umpb-replay-") as tmp:
+        for name, events, expected, speed in runs:
+            speed = args.speed if args.speed is not None else 1.0 if args.native else speed
+            results[name] = replay(app, Path(tmp), events, expected, speed, args.native)
+            report(name, results[name])
+    if args.output:
+        meta = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "seed": args.seed,
+                "backend": "x11" if args.native else "pynput"}
+        Path(args.output).write_text(json.dumps({"meta": meta, "results": results}, indent=2), encoding="utf-8")
+    return 1 if any(r.get("match") is False for r in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,109 @@
 # virtual_steamdeck.py — v0.8.0 umpb
 from __future__ import annotations
-from pynput import keyboard as _kb
+import time
+_T_START = time.perf_counter()      # riferimento per --profile-startup
+
 from pathlib import Path
+from collections import OrderedDict, deque
+import hashlib
 import json
+import os
 
-import subprocess
 import sys
 import threading
-import time
-from dataclasses import dataclass
+from functools import lru_cache
 from typing import Callable, List, Optional
 
-from PySide6.QtCore import QPoint, QSize, Qt, Signal, QFileInfo
-from PySide6.QtGui import QFont, QIcon, QPixmap, QPainter, QKeySequence
+from umpb import (
+    DEFAULT_LAYOUT_PATH, KEYBOARD, TRACE,
+    ActionExecutor, EventQueue, HotkeyEngine, HotkeyInput, HotkeyTable, LayoutJournal, LayoutPersister, MacroRunner,
+    NativeHotkeys, ProcessSupervisor, Shortcut, ShortcutIndex, UsageStats,
+    apply_layout_op, compile_combo, control_name, control_socket_path, default_shortcuts, invert_layout_op,
+    journal_path, make_native_hotkeys, open_path, parse_layout, read_layout, replay_journal, save_key_stream,
+    send_plan, usage_path, send_control as _send_control_unix,
+)
+
+
+# ---------------------------------------------------------------------------
+# CLI: i comandi per un overlay già in esecuzione partono prima di importare Qt
+# ---------------------------------------------------------------------------
+
+def _cli_parser():
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="deck_overlay", description="UMPB virtual Stream Deck overlay")
+    parser.add_argument("--fast-start", action="store_true",
+                        help="show the overlay first; install the hot-key listener, resolve icons "
+                             "and build hidden pages after the first paint")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print a phase-by-phase startup timing breakdown")
+    parser.add_argument("--trace", metavar="PATH", nargs="?", const="", default=None,
+                        help="record hot-key latency histograms; dumped to PATH (default "
+                             "~/.umpb_trace.json) on exit. Also enabled by UMPB_TRACE=1")
+    parser.add_argument("--perf-hud", action="store_true",
+                        help="show live latency percentiles in place of the info line (implies --trace)")
+    parser.add_argument("--record-keys", metavar="PATH",
+                        help="record the key stream seen by the hot-key listener to PATH on exit, for "
+                             "benchmarks/replay_hotkeys.py (keys outside any binding are masked)")
+    ctl = parser.add_argument_group("remote control",
+                                    "forwarded to the running instance (or applied at start-up if none)")
+    ctl.add_argument("--trigger", metavar="N", type=int, action="append", default=[],
+                     help="run tile N (1-based) of the current page")
+    ctl.add_argument("--page", metavar="N", type=int, help="go to page N (1-based)")
+    ctl.add_argument("--shortcut", metavar="ID", action="append", default=[], help="run the tile with this id")
+    ctl.add_argument("--toggle", action="store_true", help="show/hide the overlay")
+    ctl.add_argument("--palette", action="store_true", help="open the command palette")
+    ctl.add_argument("--most-used", action="store_true", help="show the most used page (layout key \"most_used\")")
+    ctl.add_argument("--reload", action="store_true", help="re-read the layout file")
+    ctl.add_argument("--cancel", action="store_true", help="stop running macros")
+    ctl.add_argument("--stats", action="store_true",
+                     help="print the runtime counters (icon cache, actions, launches, hotkeys, macros) as JSON")
+    ctl.add_argument("--new-instance", action="store_true",
+                     help="don't forward to a running instance; start a new one without a control socket")
+    return parser
+
+
+def _control_commands(args) -> List[str]:
+    """Opzioni di controllo remoto → righe del protocollo, nell'ordine in cui vanno applicate."""
+    return (
+        (["reload"] if args.reload else [])
+        + ([f"page {args.page}"] if args.page is not None else [])
+        + [f"tile {n}" for n in args.trigger]
+        + [f"shortcut {sid}" for sid in args.shortcut]
+        + (["toggle"] if args.toggle else [])
+        + (["palette"] if args.palette else [])
+        + (["most-used"] if args.most_used else [])
+        + (["cancel"] if args.cancel else [])
+        + (["stats"] if args.stats else [])
+    )
+
+
+def _report_replies(replies: List[str], commands: List[str]) -> int:
+    """Stampa le risposte dell'istanza in esecuzione; exit status del processo che ha inoltrato."""
+    errors = [r for r in replies if r.startswith("error:")]
+    for r in replies:
+        if r in errors:
+            print("⚠️ ", r)
+        elif r != "ok":
+            print(r)
+    return 1 if errors or len(replies) < len(commands) else 0
+
+
+if __name__ == "__main__":
+    # istanza singola via socket Unix: inoltro in ~import di umpb, senza caricare PySide6
+    _args, _ = _cli_parser().parse_known_args()
+    if not _args.new_instance and control_socket_path(control_name()) is not None:
+        _commands = _control_commands(_args) or ["show"]
+        _replies = _send_control_unix(control_name(), _commands)
+        if _replies is not None:
+            sys.exit(_report_replies(_replies, _commands))
+
+from PySide6.QtCore import QFileSystemWatcher, QEvent, QPoint, QRect, QRectF, QSize, Qt, QTimer, Signal, QFileInfo, QObject, QThread, QThreadPool
+from PySide6.QtNetwork import QLocalServer, QLocalSocket
+from PySide6.QtGui import (
+    QFont, QIcon, QIconEngine, QImage, QPixmap, QPainter, QKeySequence, QGuiApplication,
+    QAccessible, QAccessibleEvent, QAccessibleInterface, QColor, QPen,
+)
 from PySide6.QtWidgets import (
     QApplication,
     QFrame,
@@ -28,52 +119,1334 @@ from PySide6.QtWidgets import (
     QFileDialog,
     QInputDialog,
     QStyle,
-    QFileIconProvider
+    QFileIconProvider,
+    QStackedWidget,
+    QLineEdit,
+    QListWidget,
+    QListWidgetItem,
+    QToolTip,
+    QAccessibleWidget,
 )
 
+# ---------------------------------------------------------------------------
+# Startup profile (--profile-startup)
+# ---------------------------------------------------------------------------
+
+class StartupProfile:
+    """Timestamp delle fasi di avvio, relativi all'inizio dell'import del modulo."""
+
+    def __init__(self, t0: float):
+        self.t0 = t0
+        self.marks: List[tuple[str, float]] = []
+        self._lock = threading.Lock()
+
+    def mark(self, phase: str):
+        with self._lock:
+            self.marks.append((phase, time.perf_counter()))
+
+    def report(self) -> str:
+        with self._lock:
+            marks = sorted(self.marks, key=lambda m: m[1])
+        lines = [f"{'phase':<28}{'at (ms)':>10}{'delta (ms)':>12}"]
+        prev = self.t0
+        for phase, t in marks:
+            lines.append(f"{phase:<28}{(t - self.t0) * 1e3:>10.1f}{(t - prev) * 1e3:>12.1f}")
+            prev = t
+        return "\n".join(lines)
+
+
+PROFILE = StartupProfile(_T_START)
+PROFILE.mark("imports")
+
 # ---------------------------------------------------------------------------
 # Helpers & Data model
 # ---------------------------------------------------------------------------
 
-def _icon(glyph: str) -> QIcon:
-    """Crea un'icona 64×64 disegnando il glyph Unicode centrato."""
-    pm = QPixmap(64, 64)
+# glyph dei tile "shortcut" con azione nota; gli altri usano DEFAULT_GLYPH (o Shortcut.glyph)
+TILE_GLYPHS = {
+    "undo": "↶", "redo": "↷", "copy": "⎘", "cut": "✂",
+    "save": "💾", "find": "🔍", "new": "📄", "explorer": "📁",
+}
+DEFAULT_GLYPH = "🔘"
+
+
+def _screen_dpr() -> float:
+    screen = QGuiApplication.primaryScreen()
+    return screen.devicePixelRatio() if screen else 1.0
+
+
+class GlyphAtlas:
+    """Tutti i glyph dei tile rasterizzati una sola volta, al DPR corrente, in un'unica pixmap.
+
+    Celle di CELL×CELL pixel logici, COLS per riga. Un glyph nuovo (custom) viene disegnato
+    nella prima cella libera; quando l'atlante è pieno raddoppia. Le icone leggono la loro
+    sotto-area al momento del paint: dopo `set_dpr` basta un repaint.
+    """
+
+    CELL = 64
+    COLS = 8
+
+    def __init__(self, glyphs: tuple = (), dpr: Optional[float] = None):
+        self.dpr = dpr
+        self.generation = 0                 # incrementato a ogni rasterizzazione completa
+        self.pixmap: Optional[QPixmap] = None
+        self._rows = 1
+        self._slots: dict[str, int] = {}
+        for g in glyphs:
+            self._slots.setdefault(g, len(self._slots))
+
+    def _render(self):
+        self.dpr = self.dpr or _screen_dpr()
+        while self._rows * self.COLS < len(self._slots):
+            self._rows *= 2
+        cell = self.CELL
+        pm = QPixmap(round(self.COLS * cell * self.dpr), round(self._rows * cell * self.dpr))
+        pm.setDevicePixelRatio(self.dpr)
+        pm.fill(Qt.transparent)
+        painter = self._painter(pm)
+        for glyph, i in self._slots.items():
+            painter.drawText(self._cell(i), Qt.AlignCenter, glyph)
+        painter.end()
+        self.pixmap = pm
+        self.generation += 1
+
+    def _painter(self, pm: QPixmap) -> QPainter:
+        painter = QPainter(pm)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.white)
+        font = QFont()                      # carattere di default del sistema
+        font.setPixelSize(round(self.CELL * 46 / 64))   # grandezza visibile
+        painter.setFont(font)
+        return painter
+
+    def _cell(self, i: int) -> QRect:
+        """Cella `i` in pixel logici."""
+        row, col = divmod(i, self.COLS)
+        return QRect(col * self.CELL, row * self.CELL, self.CELL, self.CELL)
+
+    def lookup(self, glyph: str) -> tuple[QPixmap, QRect]:
+        """(atlante, sotto-area in pixel fisici) del glyph; lo aggiunge se manca."""
+        i = self._slots.get(glyph)
+        if i is None:
+            i = self._slots[glyph] = len(self._slots)
+            if self.pixmap is not None and i < self._rows * self.COLS:
+                painter = self._painter(self.pixmap)
+                painter.drawText(self._cell(i), Qt.AlignCenter, glyph)
+                painter.end()
+            else:
+                self.pixmap = None          # pieno: si rasterizza tutto su un atlante più grande
+        if self.pixmap is None:
+            self._render()
+        r, px = self._cell(i), self.dpr
+        return self.pixmap, QRect(round(r.x() * px), round(r.y() * px), round(r.width() * px), round(r.height() * px))
+
+    def set_dpr(self, dpr: float) -> bool:
+        """Nuovo fattore di scala (finestra spostata su un altro monitor); True se è cambiato."""
+        if dpr == self.dpr:
+            return False
+        self.dpr = dpr
+        if self.pixmap is not None:
+            self._render()
+        return True
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+
+class _AtlasIconEngine(QIconEngine):
+    """Icona che disegna una cella del GlyphAtlas (una pixmap scalata in cache per dimensione)."""
+
+    def __init__(self, atlas: GlyphAtlas, glyph: str):
+        super().__init__()
+        self.atlas = atlas
+        self.glyph = glyph
+        self._cached: tuple = (None, None)  # ((generation, w, h), QPixmap)
+
+    def paint(self, painter: QPainter, rect: QRect, mode, state):
+        pm, src = self.atlas.lookup(self.glyph)
+        painter.drawPixmap(QRectF(rect), pm, QRectF(src))
+
+    def scaledPixmap(self, size: QSize, mode, state, scale: float) -> QPixmap:
+        w, h = round(size.width() * scale), round(size.height() * scale)
+        pm, src = self.atlas.lookup(self.glyph)
+        key = (self.atlas.generation, w, h)
+        if self._cached[0] != key:
+            out = pm.copy(src)
+            if out.width() != w or out.height() != h:
+                out = out.scaled(w, h, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            out.setDevicePixelRatio(scale)
+            self._cached = (key, out)
+        return self._cached[1]
+
+    def pixmap(self, size: QSize, mode, state) -> QPixmap:
+        return self.scaledPixmap(size, mode, state, 1.0)
+
+    def clone(self) -> QIconEngine:
+        return _AtlasIconEngine(self.atlas, self.glyph)
+
+
+class IconCache:
+    """Cache a due livelli per le icone dei tile.
+
+    * memoria: LRU di QIcon delle app, chiave (path, mtime, size, dpr)
+    * disco:   PNG delle icone app, chiave (path, mtime, size) — sopravvive ai riavvii
+    * glyph:   un solo GlyphAtlas condiviso; una QIcon per glyph che ne disegna una cella
+    """
+
+    def __init__(self, capacity: int = 256, disk_dir: Optional[Path] = None):
+        self.capacity = capacity
+        self.disk_dir = disk_dir or Path.home() / ".cache" / "umpb" / "icons"
+        self._mem: "OrderedDict[tuple, QIcon]" = OrderedDict()
+        self._local = threading.local()         # un QFileIconProvider per thread
+        self.atlas = GlyphAtlas((*TILE_GLYPHS.values(), DEFAULT_GLYPH))
+        self._glyphs: dict[str, QIcon] = {}
+        self.stats = {"mem_hits": 0, "mem_misses": 0, "disk_hits": 0, "disk_misses": 0, "evictions": 0}
+
+    # ---- memory layer
+    def _lookup(self, key: tuple) -> Optional[QIcon]:
+        icon = self._mem.get(key)
+        if icon is None:
+            self.stats["mem_misses"] += 1
+            return None
+        self._mem.move_to_end(key)
+        self.stats["mem_hits"] += 1
+        return icon
+
+    def _store(self, key: tuple, icon: QIcon) -> QIcon:
+        self._mem[key] = icon
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.capacity:
+            self._mem.popitem(last=False)
+            self.stats["evictions"] += 1
+        return icon
+
+    # ---- public API
+    def glyph(self, glyph: str) -> QIcon:
+        """Icona del glyph, servita dall'atlante (qualunque dimensione, al DPR dell'atlante)."""
+        icon = self._glyphs.get(glyph)
+        if icon is None:
+            icon = self._glyphs[glyph] = QIcon(_AtlasIconEngine(self.atlas, glyph))
+        return icon
+
+    def app_key(self, path: str, size: int = 64, dpr: Optional[float] = None) -> tuple:
+        """Chiave di cache per l'icona di `path` (include mtime: un'app aggiornata invalida la voce)."""
+        dpr = dpr or _screen_dpr()
+        try:
+            mtime = Path(path).stat().st_mtime_ns
+        except OSError:
+            mtime = None                # file assente: niente cache su disco
+        return ("app", path, mtime, size, dpr)
+
+    def peek(self, key: tuple) -> Optional[QIcon]:
+        """Solo livello memoria: non risolve nulla se la voce manca."""
+        return self._lookup(key)
+
+    def app(self, path: str, size: int = 64, dpr: Optional[float] = None) -> QIcon:
+        """Risoluzione sincrona (thread GUI) dell'icona di un'app."""
+        key = self.app_key(path, size, dpr)
+        icon = self._lookup(key)
+        if icon is None:
+            image, from_disk = self.load_app_image(key)
+            icon = self.store_app_image(key, image, from_disk)
+        return icon
+
+    def load_app_image(self, key: tuple) -> tuple[Optional[QImage], bool]:
+        """Carica l'icona come QImage da disco o dal provider di sistema.
+
+        Usa solo QImage e un QFileIconProvider per-thread: può girare su un worker.
+        """
+        _, path, mtime, size, dpr = key
+        px = round(size * dpr)
+        disk = self._disk_path(path, mtime, px) if mtime is not None else None
+        if disk is not None and disk.exists():
+            image = QImage(str(disk))
+            if not image.isNull():
+                return image, True
+
+        provider = getattr(self._local, "provider", None)
+        if provider is None:
+            provider = self._local.provider = QFileIconProvider()
+        image = provider.icon(QFileInfo(path)).pixmap(px, px).toImage()
+        if image.isNull():
+            return None, False
+        if disk is not None:
+            try:
+                disk.parent.mkdir(parents=True, exist_ok=True)
+                image.save(str(disk), "PNG")
+            except OSError as e:
+                print("⚠️  Failed to cache icon:", e)
+        return image, False
+
+    def store_app_image(self, key: tuple, image: Optional[QImage], from_disk: bool) -> QIcon:
+        """Converte (thread GUI) l'immagine risolta in QIcon e la mette nella LRU."""
+        if key[2] is not None:
+            self.stats["disk_hits" if from_disk else "disk_misses"] += 1
+        if image is None:
+            return self._store(key, QIcon())
+        pm = QPixmap.fromImage(image)
+        pm.setDevicePixelRatio(key[4])
+        return self._store(key, QIcon(pm))
+
+    def _disk_path(self, path: str, mtime: int, px: int) -> Path:
+        digest = hashlib.sha1(f"{path}|{mtime}|{px}".encode("utf-8")).hexdigest()
+        return self.disk_dir / f"{digest}.png"
+
+    def summary(self) -> str:
+        st = self.stats
+        return (
+            f"mem {st['mem_hits']} hit / {st['mem_misses']} miss, "
+            f"disk {st['disk_hits']} hit / {st['disk_misses']} miss, "
+            f"{st['evictions']} evicted, {len(self._mem)}/{self.capacity} entries, "
+            f"atlas {len(self.atlas)} glyphs @{self.atlas.dpr or 0:g}x"
+        )
+
+
+ICON_CACHE = IconCache()
+
+
+class IconLoader(QObject):
+    """Risolve le icone delle app su un QThreadPool; i risultati tornano sul thread GUI.
+
+    Il thread GUI non tocca il disco: stat/mtime e caricamento girano nel job. Le
+    richieste per lo stesso percorso in volo si accorpano in un solo job; i callback
+    sono indicizzati per `token` (il tile), così un refresh ripetuto sostituisce il
+    callback invece di accumularne un altro. Una voce già risolta è servita dalla
+    memoria e, passati REVALIDATE_S secondi, ricontrollata in background (mtime).
+    """
+
+    PLACEHOLDER = "⌛"
+    REVALIDATE_S = 30.0
+    _resolved = Signal(object, object, object, object)   # req, key, QImage | None, from_disk | None
+
+    def __init__(self, cache: IconCache, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.cache = cache
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(1, min(4, QThread.idealThreadCount())))
+        self._waiters: dict[tuple, dict[object, Callable[[QIcon], None]]] = {}
+        self._latest: dict[tuple, tuple[tuple, float]] = {}  # req → (chiave risolta, quando)
+        self.deduped = 0
+        self._resolved.connect(self._on_resolved)
+
+    def request(self, path: str, callback: Callable[[QIcon], None], size: int = 64,
+                token: object = None) -> Optional[QIcon]:
+        """Restituisce subito l'icona se è in memoria, altrimenti None e poi `callback(icon)`.
+
+        Un'altra richiesta con lo stesso `token` per un job in volo ne sostituisce il callback.
+        """
+        req = (path, size, _screen_dpr())
+        latest = self._latest.get(req)
+        if latest is not None:
+            icon = self.cache.peek(latest[0])
+            if icon is not None:
+                if time.monotonic() - latest[1] > self.REVALIDATE_S and req not in self._waiters:
+                    self._waiters[req] = {}
+                    self._start(req, latest[0])
+                return icon
+        waiters = self._waiters.get(req)
+        if waiters is not None:
+            self.deduped += 1
+        else:
+            waiters = self._waiters[req] = {}
+            self._start(req, None)
+        waiters[callback if token is None else token] = callback
+        return None
+
+    def _start(self, req: tuple, known: Optional[tuple]):
+        self.pool.start(lambda: self._run(req, known))
+
+    def _run(self, req: tuple, known: Optional[tuple]):
+        path, size, dpr = req
+        key, image, from_disk = None, None, None
+        try:
+            key = self.cache.app_key(path, size, dpr)
+            if key != known:            # `known` invariata: la voce in memoria è ancora buona
+                image, from_disk = self.cache.load_app_image(key)
+        except Exception as e:
+            print("⚠️  Failed to resolve icon:", e)
+            key = key or ("app", path, None, size, dpr)
+            image, from_disk = None, False
+        self._resolved.emit(req, key, image, from_disk)
+
+    def _on_resolved(self, req: tuple, key: tuple, image: Optional[QImage], from_disk: Optional[bool]):
+        if from_disk is None:           # mtime invariato
+            icon = self.cache.peek(key)
+            if icon is None:            # nel frattempo uscita dalla LRU: si ricarica
+                self._start(req, None)
+                return
+        else:
+            icon = self.cache.store_app_image(key, image, from_disk)
+        self._latest[req] = (key, time.monotonic())
+        for cb in self._waiters.pop(req, {}).values():
+            cb(icon)
+
+    def placeholder(self) -> QIcon:
+        return self.cache.glyph(self.PLACEHOLDER)
+
+    def shutdown(self):
+        self.pool.clear()
+        self.pool.waitForDone(500)
+
+# ---------------------------------------------------------------------------
+# Hot reload: il file di layout cambiato da fuori viene riletto e applicato
+# ---------------------------------------------------------------------------
+
+class LayoutWatcher(QObject):
+    """Osserva il file di layout e ne rilegge le modifiche esterne.
+
+    Si osserva anche la cartella: la rename atomica (nostra o di un config manager)
+    sostituisce il file e QFileSystemWatcher smette di seguirlo. Lettura, hash e
+    parsing avvengono in un thread; `changed(digest, data)` arriva sul thread GUI.
+    Le scritture per cui `is_known(digest)` è vero (le nostre) sono ignorate; un file
+    malformato viene solo segnalato.
+    """
+
+    changed = Signal(str, object)
+    DEBOUNCE_MS = 150
+
+    def __init__(self, path: Path, is_known: Callable[[str], bool], parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.is_known = is_known
+        self.ignored = 0
+        self.failed = 0
+        self._gen = 0
+        self._stat: Optional[tuple] = None  # (mtime, size, inode) dell'ultima lettura
+        self._timer = QTimer(self, singleShot=True, interval=self.DEBOUNCE_MS)
+        self._timer.timeout.connect(self._check)
+        self._fs = QFileSystemWatcher(self)
+        self._fs.fileChanged.connect(self._timer.start)
+        self._fs.directoryChanged.connect(self._timer.start)
+        self._fs.addPath(str(path.parent))
+        self._watch_file()
+
+    def _watch_file(self):
+        if self.path.exists() and str(self.path) not in self._fs.files():
+            self._fs.addPath(str(self.path))
+
+    def _check(self):
+        self._watch_file()
+        self._gen += 1
+        threading.Thread(target=self._read, args=(self._gen,), name="umpb-layout-watch", daemon=True).start()
+
+    def _read(self, gen: int):
+        try:
+            st = self.path.stat()
+            stat = (st.st_mtime_ns, st.st_size, st.st_ino)
+            if stat == self._stat:
+                return                      # evento sulla cartella (es. il journal): file invariato
+            raw = self.path.read_bytes()
+        except OSError:
+            return                          # file sparito (rename in corso): arriverà un altro evento
+        self._stat = stat
+        digest = hashlib.sha256(raw).hexdigest()
+        if self.is_known(digest):
+            self.ignored += 1
+            return
+        try:
+            data = parse_layout(raw)
+        except Exception as e:
+            self.failed += 1
+            print(f"⚠️  Ignoring invalid layout change in {self.path}:", e)
+            return
+        if gen == self._gen:                # un evento più recente ha già riletto il file
+            self.changed.emit(digest, data)
+
+
+# ---------------------------------------------------------------------------
+# Theme engine: un solo stylesheet applicativo, stato via object name + property
+# ---------------------------------------------------------------------------
+
+# palette Tailwind (500) usata dal campo Shortcut.color ("bg-blue-500" → "blue")
+TILE_COLORS = {
+    "slate": "#64748b", "red": "#ef4444", "orange": "#f97316", "yellow": "#eab308",
+    "green": "#22c55e", "teal": "#14b8a6", "blue": "#3b82f6", "purple": "#a855f7",
+    "pink": "#ec4899",
+}
+
+THEMES = {
+    "slate": {
+        "root_bg": "rgba(30,41,59,0.85)", "root_border": "rgba(71,85,105,0.5)",
+        "header_bg": "rgba(51,65,85,0.9)", "title": "#e2e8f0", "muted": "#94a3b8",
+        "info": "#64748b", "tile_bg": "rgba(51,65,85,0.7)", "tile_hover": "rgba(71,85,105,0.9)",
+        "tile_fg": "#cbd5e1", "add_bg": "rgba(51,65,85,0.5)", "add_border": "rgba(71,85,105,0.6)",
+        "add_hover": "rgba(203,213,225,0.8)", "accent": "#3b82f6", "dot": "#475569",
+        "danger": "#ef4444", "danger_soft": "#f87171",
+    },
+    "midnight": {
+        "root_bg": "rgba(2,6,23,0.9)", "root_border": "rgba(30,41,59,0.8)",
+        "header_bg": "rgba(15,23,42,0.95)", "title": "#f1f5f9", "muted": "#64748b",
+        "info": "#475569", "tile_bg": "rgba(15,23,42,0.9)", "tile_hover": "rgba(30,41,59,1)",
+        "tile_fg": "#e2e8f0", "add_bg": "rgba(15,23,42,0.6)", "add_border": "rgba(51,65,85,0.8)",
+        "add_hover": "rgba(148,163,184,0.8)", "accent": "#6366f1", "dot": "#334155",
+        "danger": "#dc2626", "danger_soft": "#f87171",
+    },
+    "light": {
+        "root_bg": "rgba(248,250,252,0.92)", "root_border": "rgba(203,213,225,0.9)",
+        "header_bg": "rgba(226,232,240,0.95)", "title": "#0f172a", "muted": "#475569",
+        "info": "#64748b", "tile_bg": "rgba(255,255,255,0.9)", "tile_hover": "rgba(241,245,249,1)",
+        "tile_fg": "#1e293b", "add_bg": "rgba(241,245,249,0.8)", "add_border": "rgba(148,163,184,0.8)",
+        "add_hover": "rgba(71,85,105,0.8)", "accent": "#2563eb", "dot": "#cbd5e1",
+        "danger": "#ef4444", "danger_soft": "#dc2626",
+    },
+}
+
+_STYLESHEET = """
+QFrame#root{{background:{root_bg};border:2px solid {root_border};border-radius:16px;}}
+QFrame#header{{background:{header_bg};border-radius:12px;}}
+QLabel#title{{color:{title};font-weight:600;font-size:13px;}}
+QLabel#pageLabel{{color:{muted};font-size:11px;}}
+QLabel#infoLabel{{color:{info};}}
+QPushButton#headerButton{{background:transparent;border:none;color:{muted};}}
+QPushButton#headerButton:hover{{color:{danger_soft};}}
+QPushButton#tile{{background:{tile_bg};color:{tile_fg};border:none;border-radius:8px;font-size:10px;text-align:center;}}
+QPushButton#tile:hover{{background:{tile_hover};}}
+{tile_colors}
+QPushButton#tile[edit="true"]{{border:1px dashed {add_border};}}
+QPushButton#addTile{{background:{add_bg};color:{muted};border:2px dashed {add_border};border-radius:8px;font-size:11px;}}
+QPushButton#addTile:hover{{border-color:{add_hover};}}
+QPushButton#deleteBadge{{border-radius:8px;background:{danger};color:white;font-size:10px;}}
+QPushButton#navDot{{border-radius:4px;background-color:{dot};}}
+QPushButton#navDot[active="true"]{{background-color:{accent};}}
+QPushButton#addPage{{border-radius:4px;background:{add_bg};color:{muted};border:1px solid {add_border};}}
+QPushButton#mostUsed{{background:transparent;border:none;color:{dot};font-size:11px;}}
+QPushButton#mostUsed[active="true"]{{color:{accent};}}
+QDialog#palette{{background:{root_bg};border:2px solid {root_border};border-radius:12px;}}
+QLineEdit#paletteInput{{background:{tile_bg};color:{title};border:none;border-radius:6px;padding:6px;font-size:13px;}}
+QListWidget#paletteList{{background:transparent;color:{tile_fg};border:none;font-size:12px;}}
+QListWidget#paletteList::item:selected{{background:{accent};color:white;border-radius:4px;}}
+"""
+
+
+def tile_color(color: str) -> str:
+    """Mappa una classe Tailwind ("bg-blue-500") sul nome colore usato come property del tile."""
+    parts = color.split("-")
+    name = parts[1] if len(parts) >= 2 and parts[0] == "bg" else color
+    return name if name in TILE_COLORS else "slate"
+
+
+def tile_icon(sc: Shortcut) -> QIcon:
+    """Icona visualizzata sul tile."""
+    if sc.type == "app" and sc.path:
+        # usa l’icona di sistema del file / bundle (cache memoria + disco)
+        return ICON_CACHE.app(sc.path)
+    return ICON_CACHE.glyph(sc.glyph or TILE_GLYPHS.get(sc.action, DEFAULT_GLYPH))
+
+
+def tile_face(sc: Shortcut, tile: int) -> tuple[int, str]:
+    """(lato dell'icona, testo) di un tile: stesse regole per entrambi i renderer."""
+    if sc.type == "app":
+        return tile - 12, ""                # solo icona grande
+    if sc.type == "shortcut":
+        if sc.action in TILE_GLYPHS or sc.glyph:
+            return 40, ""                   # scorciatoie note → solo glyph, un po’ più grande
+        return 28, sc.key.lower()           # scorciatoie custom → iconcina e testo (ctrl+…)
+    return 32, sc.name
+
+
+class ThemeEngine:
+    """Compila (una volta per tema) lo stylesheet dell'app e lo applica a QApplication."""
+
+    def __init__(self, themes: dict = THEMES):
+        self.themes = themes
+        self._compiled: dict[str, str] = {}
+        self.current: Optional[str] = None
+
+    def stylesheet(self, name: str) -> str:
+        css = self._compiled.get(name)
+        if css is None:
+            tile_colors = "\n".join(
+                f'QPushButton#tile[tileColor="{c}"]{{border-bottom:2px solid {hex_};}}'
+                for c, hex_ in TILE_COLORS.items()
+            )
+            css = self._compiled[name] = _STYLESHEET.format(tile_colors=tile_colors, **self.themes[name])
+        return css
+
+    def apply(self, name: str):
+        if name not in self.themes:
+            print(f"⚠️  Unknown theme {name!r}, keeping {self.current!r}")
+            return
+        if name == self.current:
+            return
+        app = QApplication.instance()
+        if app is not None:
+            app.setStyleSheet(self.stylesheet(name))
+        self.current = name
+
+
+def _set_state(w: QWidget, name: str, value):
+    """Aggiorna una property dinamica usata dai selettori e ri-applica lo stile al solo widget."""
+    if w.property(name) == value:
+        return
+    w.setProperty(name, value)
+    w.style().unpolish(w)
+    w.style().polish(w)
+
+
+# ---------------------------------------------------------------------------
+# Page view (griglia di una singola pagina, costruita una volta e riusata)
+# ---------------------------------------------------------------------------
+
+class _PageView(QWidget):
+    """Griglia di tile di una pagina; resta nello stack finché non viene invalidata."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.grid = QGridLayout(self)
+        self.grid.setContentsMargins(0, 0, 0, 0)
+        self.badges: List[QPushButton] = []       # pulsanti ✕ (visibili solo in edit-mode)
+        self.add_tile: Optional[QPushButton] = None
+        self.add_slot: Optional[QWidget] = None   # placeholder sostituito da ➕ in edit-mode
+        self.edit_mode: Optional[bool] = None
+        self.pending_icons: dict[QPushButton, Shortcut] = {}   # tile con icona ancora placeholder
+        self.tiles: List[QPushButton] = []
+
+    def set_edit_mode(self, on: bool):
+        if self.edit_mode == on:
+            return
+        self.edit_mode = on
+        for b in self.badges:
+            b.setVisible(on)
+        for t in self.tiles:
+            _set_state(t, "edit", on)
+        if self.add_tile is not None:
+            self.add_tile.setVisible(on)
+            if self.add_slot is not None:
+                self.add_slot.setVisible(not on)
+
+    def set_icon(self, btn: QPushButton, icon: QIcon):
+        btn.setIcon(icon)
+
+
+@lru_cache(maxsize=None)
+def _qcolor(css: str) -> QColor:
+    """Colore nella sintassi dello stylesheet ("#rrggbb" o "rgba(r,g,b,a)") → QColor."""
+    if css.startswith("rgba("):
+        r, g, b, a = (float(x) for x in css[5:-1].split(","))
+        return QColor(int(r), int(g), int(b), round(a * 255))
+    return QColor(css)
+
+
+class _PaintedPageView(QWidget):
+    """Pagina disegnata da un solo widget (layout "renderer": "painted").
+
+    Tile, hover, badge ✕ e ➕ sono dipinti con QPainter: niente widget figli, hit-test
+    proprio e repaint limitato alle celle che cambiano stato. Emette le stesse azioni
+    dei pulsanti di _PageView; tooltip e interfaccia accessibile sono per singolo tile.
+    """
+
+    tile_clicked = Signal(object)   # Shortcut
+    delete_clicked = Signal(str)    # Shortcut.id
+    add_clicked = Signal()
+
+    BADGE = 16
+    _accessible_installed = False
+
+    def __init__(self, rows: int, cols: int, tile: int, spacing: int,
+                 theme: Callable[[], str], parent=None):
+        super().__init__(parent)
+        self.rows, self.cols, self.tile, self.spacing = rows, cols, tile, spacing
+        self._theme = theme                     # nome del tema corrente, letto a ogni paint
+        self.tiles: List[Shortcut] = []
+        self.icons: List[QIcon] = []
+        self.pending_icons: dict[int, Shortcut] = {}      # indice → tile con icona ancora placeholder
+        self.edit_mode: Optional[bool] = None
+        self.hover: Optional[tuple[int, str]] = None      # (indice, "tile" | "badge" | "add")
+        self._pressed: Optional[tuple[int, str]] = None
+        self.paints = 0
+        self._font = QFont()
+        self._font.setPixelSize(10)
+        self.setMouseTracking(True)
+        self.setMinimumSize(cols * tile + (cols - 1) * spacing, rows * tile + (rows - 1) * spacing)
+        if not _PaintedPageView._accessible_installed:
+            QAccessible.installFactory(_painted_accessible)
+            _PaintedPageView._accessible_installed = True
+
+    # ---- contenuto
+    def set_tile(self, i: int, sc: Shortcut, icon: QIcon, pending: bool):
+        if i == len(self.tiles):
+            self.tiles.append(sc)
+            self.icons.append(icon)
+        else:
+            self.tiles[i], self.icons[i] = sc, icon
+        self.pending_icons.pop(i, None)
+        if pending:
+            self.pending_icons[i] = sc
+        self.update(self.cell_rect(i))
+
+    def set_icon(self, i: int, icon: QIcon):
+        self.icons[i] = icon
+        self.update(self.cell_rect(i))
+
+    def set_edit_mode(self, on: bool):
+        if self.edit_mode == on:
+            return
+        self.edit_mode = on
+        self.update()
+
+    def has_add(self) -> bool:
+        return bool(self.edit_mode) and len(self.tiles) < self.rows * self.cols
+
+    # ---- geometria + hit-test
+    def _origin(self) -> QPoint:
+        w = self.cols * self.tile + (self.cols - 1) * self.spacing
+        h = self.rows * self.tile + (self.rows - 1) * self.spacing
+        return QPoint(max(0, (self.width() - w) // 2), max(0, (self.height() - h) // 2))
+
+    def cell_rect(self, i: int) -> QRect:
+        r, c = divmod(i, self.cols)
+        o, step = self._origin(), self.tile + self.spacing
+        return QRect(o.x() + c * step, o.y() + r * step, self.tile, self.tile)
+
+    def badge_rect(self, cell: QRect) -> QRect:
+        return QRect(cell.x() + self.tile - 20, cell.y() + 4, self.BADGE, self.BADGE)
+
+    def hit(self, pos: QPoint) -> Optional[tuple[int, str]]:
+        o, step = self._origin(), self.tile + self.spacing
+        x, y = pos.x() - o.x(), pos.y() - o.y()
+        if x < 0 or y < 0:
+            return None
+        (c, dx), (r, dy) = divmod(x, step), divmod(y, step)
+        if c >= self.cols or r >= self.rows or dx >= self.tile or dy >= self.tile:
+            return None                         # fuori griglia o nello spazio tra i tile
+        i = r * self.cols + c
+        if i < len(self.tiles):
+            if self.edit_mode and self.badge_rect(self.cell_rect(i)).contains(pos):
+                return i, "badge"
+            return i, "tile"
+        if i == len(self.tiles) and self.has_add():
+            return i, "add"
+        return None
+
+    def tile_text(self, i: int, part: str) -> str:
+        if part == "add":
+            return "Add shortcut"
+        name = self.tiles[i].name
+        return f"Delete {name}" if part == "badge" else name
+
+    def activate(self, i: int, part: str):
+        """Stessa azione del click sul pulsante corrispondente di _PageView."""
+        if part == "add":
+            self.add_clicked.emit()
+        elif part == "badge":
+            self.delete_clicked.emit(self.tiles[i].id)
+        else:
+            self.tile_clicked.emit(self.tiles[i])
+
+    # ---- eventi
+    def event(self, event) -> bool:
+        if event.type() == QEvent.ToolTip:
+            hit = self.hit(event.pos())
+            if hit is None:
+                QToolTip.hideText()
+                event.ignore()
+            else:
+                QToolTip.showText(event.globalPos(), self.tile_text(*hit), self, self.cell_rect(hit[0]))
+            return True
+        return super().event(event)
+
+    def mouseMoveEvent(self, event):
+        self._set_hover(self.hit(event.position().toPoint()))
+
+    def leaveEvent(self, event):
+        self._set_hover(None)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self._pressed = self.hit(event.position().toPoint())
+        else:
+            super().mousePressEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        pressed, self._pressed = self._pressed, None
+        if event.button() != Qt.LeftButton or pressed is None:
+            return
+        if self.hit(event.position().toPoint()) == pressed:   # come un pulsante: press e release sullo stesso punto
+            self.activate(*pressed)
+
+    def _set_hover(self, hit: Optional[tuple[int, str]]):
+        old, self.hover = self.hover, hit
+        cells = [h[0] for h in (old, hit) if h is not None]
+        if len(cells) == 2 and cells[0] == cells[1]:
+            return                              # stessa cella (tile ↔ badge): niente da ridisegnare
+        for i in cells:
+            self.update(self.cell_rect(i))
+        if (old is None) != (hit is None):
+            self.setCursor(Qt.PointingHandCursor if hit else Qt.ArrowCursor)
+        if hit is not None and QAccessible.isActive():
+            ev = QAccessibleEvent(self, QAccessible.Focus)
+            ev.setChild(hit[0])
+            QAccessible.updateAccessibility(ev)
+
+    # ---- paint
+    def paintEvent(self, event):
+        self.paints += 1
+        theme, dpr = self._theme(), self.devicePixelRatioF()
+        hover = self.hover[0] if self.hover is not None else -1
+        clip = event.rect()
+        p = QPainter(self)
+        p.setFont(self._font)
+        fm = p.fontMetrics()
+        for i, sc in enumerate(self.tiles):
+            cell = self.cell_rect(i)
+            if not cell.intersects(clip):
+                continue
+            p.drawPixmap(cell.topLeft(), _tile_skin(theme, tile_color(sc.color), i == hover,
+                                                     bool(self.edit_mode), self.tile, dpr))
+            size, text = tile_face(sc, self.tile)
+            if text:
+                top = cell.y() + (self.tile - size - 2 - fm.height()) // 2
+                self.icons[i].paint(p, QRect(cell.x() + (self.tile - size) // 2, top, size, size))
+                p.setPen(_qcolor(THEMES.get(theme, THEMES[VirtualSteamDeck.THEME])["tile_fg"]))
+                p.drawText(QRect(cell.x() + 2, top + size + 2, self.tile - 4, fm.height()), Qt.AlignCenter,
+                           fm.elidedText(text, Qt.ElideRight, self.tile - 4))
+            else:
+                off = (self.tile - size) // 2
+                self.icons[i].paint(p, QRect(cell.x() + off, cell.y() + off, size, size))
+            if self.edit_mode:      # il badge sta sopra l'icona
+                p.drawPixmap(self.badge_rect(cell).topLeft(), _tile_skin(theme, "badge", False, True, self.BADGE, dpr))
+        if self.has_add():
+            cell = self.cell_rect(len(self.tiles))
+            if cell.intersects(clip):
+                p.drawPixmap(cell.topLeft(), _tile_skin(theme, "add", len(self.tiles) == hover, True, self.tile, dpr))
+        p.end()
+
+
+@lru_cache(maxsize=256)
+def _tile_skin(theme: str, kind: str, hovered: bool, edit: bool, size: int, dpr: float) -> QPixmap:
+    """Parti statiche di una cella pre-renderizzate: fondo e bordi di un tile (kind = colore),
+    badge ✕ ("badge") o tile ➕ ("add"). A ogni paint resta un drawPixmap per parte."""
+    colors = THEMES.get(theme, THEMES[VirtualSteamDeck.THEME])
+    pm = QPixmap(round(size * dpr), round(size * dpr))
+    pm.setDevicePixelRatio(dpr)
     pm.fill(Qt.transparent)
+    p = QPainter(pm)
+    p.setRenderHint(QPainter.Antialiasing)
+    box = QRectF(0, 0, size, size)
+    font = QFont()
+    if kind == "badge":
+        p.setPen(Qt.NoPen)
+        p.setBrush(_qcolor(colors["danger"]))
+        p.drawEllipse(box)
+        font.setPixelSize(10)
+        p.setFont(font)
+        p.setPen(Qt.white)
+        p.drawText(box, Qt.AlignCenter, "✕")
+    elif kind == "add":
+        p.setPen(QPen(_qcolor(colors["add_hover" if hovered else "add_border"]), 2, Qt.DashLine))
+        p.setBrush(_qcolor(colors["add_bg"]))
+        p.drawRoundedRect(box.adjusted(1, 1, -1, -1), 8, 8)
+        font.setPixelSize(11)
+        p.setFont(font)
+        p.setPen(_qcolor(colors["muted"]))
+        p.drawText(box, Qt.AlignCenter, "➕\nAdd")
+    else:
+        p.setPen(Qt.NoPen)
+        p.setBrush(_qcolor(colors["tile_hover" if hovered else "tile_bg"]))
+        p.drawRoundedRect(box, 8, 8)
+        # bordo inferiore colorato (border-bottom:2px del tile nello stylesheet)
+        p.setClipRect(QRectF(0, size - 2, size, 2))
+        p.setBrush(_qcolor(TILE_COLORS[kind]))
+        p.drawRoundedRect(box, 8, 8)
+        p.setClipping(False)
+        if edit:
+            p.setPen(QPen(_qcolor(colors["add_border"]), 1, Qt.DashLine))
+            p.setBrush(Qt.NoBrush)
+            p.drawRoundedRect(box.adjusted(0.5, 0.5, -0.5, -0.5), 8, 8)
+    p.end()
+    return pm
+
+
+class _PaintedTileAccessible(QAccessibleInterface):
+    """Un tile di _PaintedPageView (o il suo badge ✕, o il ➕) per le tecnologie assistive."""
+
+    def __init__(self, grid: "_PaintedGridAccessible", i: int, part: str):
+        super().__init__()
+        self._grid, self.i, self.part = grid, i, part
+
+    def _cell(self) -> QRect:
+        view = self._grid.view
+        cell = view.cell_rect(self.i)
+        return view.badge_rect(cell) if self.part == "badge" else cell
+
+    def isValid(self) -> bool:
+        view = self._grid.view
+        if self.part == "add":
+            return view.has_add() and self.i == len(view.tiles)
+        return self.i < len(view.tiles) and (self.part == "tile" or bool(view.edit_mode))
+
+    def object(self):
+        return None
+
+    def window(self):
+        return self._grid.window()
+
+    def relations(self, match=QAccessible.AllRelations):
+        return []
+
+    def focusChild(self):
+        return None
+
+    def parent(self):
+        return self._grid.tile(self.i, "tile") if self.part == "badge" else self._grid
+
+    def childCount(self) -> int:
+        return int(self.part == "tile" and bool(self._grid.view.edit_mode))
+
+    def child(self, index: int):
+        return self._grid.tile(self.i, "badge") if index == 0 and self.childCount() else None
+
+    def indexOfChild(self, child) -> int:
+        return 0 if isinstance(child, _PaintedTileAccessible) and child.part == "badge" else -1
+
+    def childAt(self, x: int, y: int):
+        badge = self.child(0)
+        return badge if badge is not None and badge.rect().contains(x, y) else None
+
+    def text(self, t) -> str:
+        if not self.isValid():
+            return ""
+        if t == QAccessible.Name:
+            return self._grid.view.tile_text(self.i, self.part)
+        if t == QAccessible.Description and self.part == "tile":
+            sc = self._grid.view.tiles[self.i]
+            return sc.key or sc.path or sc.action
+        return ""
+
+    def setText(self, t, text: str):
+        pass
+
+    def rect(self) -> QRect:
+        view, cell = self._grid.view, self._cell()
+        return QRect(view.mapToGlobal(cell.topLeft()), cell.size())
+
+    def role(self):
+        return QAccessible.Button
+
+    def state(self):
+        st = QAccessible.State()
+        st.invisible = not self._grid.view.isVisible()
+        st.hotTracked = (self._grid.view.hover or (None, None))[0] == self.i
+        return st
+
+
+class _PaintedGridAccessible(QAccessibleWidget):
+    """Interfaccia accessibile di _PaintedPageView: un figlio per tile (più il ➕ in edit-mode)."""
+
+    def __init__(self, view: _PaintedPageView):
+        super().__init__(view, QAccessible.Grouping)
+        self.view = view
+        self._tiles: dict[tuple[int, str], _PaintedTileAccessible] = {}   # restano vivi finché vive la view
+
+    def tile(self, i: int, part: str) -> _PaintedTileAccessible:
+        iface = self._tiles.get((i, part))
+        if iface is None:
+            iface = self._tiles[(i, part)] = _PaintedTileAccessible(self, i, part)
+        return iface
+
+    def childCount(self) -> int:
+        return len(self.view.tiles) + self.view.has_add()
+
+    def child(self, index: int):
+        if 0 <= index < len(self.view.tiles):
+            return self.tile(index, "tile")
+        if index == len(self.view.tiles) and self.view.has_add():
+            return self.tile(index, "add")
+        return None
+
+    def indexOfChild(self, child) -> int:
+        if isinstance(child, _PaintedTileAccessible) and child.part != "badge" and child.isValid():
+            return child.i
+        return -1
+
+    def childAt(self, x: int, y: int):
+        hit = self.view.hit(self.view.mapFromGlobal(QPoint(x, y)))
+        return None if hit is None else self.child(hit[0])
+
+
+def _painted_accessible(key: str, obj: QObject):
+    if isinstance(obj, _PaintedPageView):
+        obj._accessible = iface = _PaintedGridAccessible(obj)
+        return iface
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Command palette (type-to-search su tutti i tile)
+# ---------------------------------------------------------------------------
+
+class CommandPalette(QDialog):
+    """Popup di ricerca: ↑/↓ per scegliere, Invio per eseguire, Esc per chiudere."""
+
+    chosen = Signal(object)   # Shortcut
+    LIMIT = 50
+
+    def __init__(self, parent=None):
+        super().__init__(parent, Qt.Dialog | Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
+        self.setObjectName("palette")
+        self.setAttribute(Qt.WA_StyledBackground)
+        self.resize(420, 320)
+        self.index: Optional[ShortcutIndex] = None
+        lay = QVBoxLayout(self)
+        self.input = QLineEdit(objectName="paletteInput", placeholderText="Search shortcuts…")
+        self.list = QListWidget(objectName="paletteList")
+        self.list.setUniformItemSizes(True)         # layout O(1) anche con molte righe
+        lay.addWidget(self.input)
+        lay.addWidget(self.list)
+        self.input.textChanged.connect(self._filter)
+        self.input.returnPressed.connect(self._accept_current)
+        self.input.installEventFilter(self)
+        self.list.itemActivated.connect(lambda _: self._accept_current())
+
+    def open_with(self, index: ShortcutIndex):
+        self.index = index
+        self.input.clear()
+        self._filter("")
+        self.show()
+        self.raise_()
+        self.activateWindow()
+        self.input.setFocus()
+
+    def _filter(self, text: str):
+        if self.index is None:
+            return
+        self.list.setUpdatesEnabled(False)
+        self.list.clear()
+        for page, idx, sc in self.index.search(text, self.LIMIT):
+            detail = sc.path if sc.type == "app" else sc.key
+            item = QListWidgetItem(f"{sc.name}    ·  p{page + 1}/{idx + 1}  {detail or ''}")
+            item.setData(Qt.UserRole, sc)
+            self.list.addItem(item)
+        self.list.setCurrentRow(0)
+        self.list.setUpdatesEnabled(True)
+
+    def eventFilter(self, obj, event):
+        if obj is self.input and event.type() == QEvent.KeyPress:
+            key = event.key()
+            if key in (Qt.Key_Down, Qt.Key_Up):
+                step = 1 if key == Qt.Key_Down else -1
+                row = max(0, min(self.list.count() - 1, self.list.currentRow() + step))
+                self.list.setCurrentRow(row)
+                return True
+            if key == Qt.Key_Escape:
+                self.hide()
+                return True
+        return super().eventFilter(obj, event)
+
+    def _accept_current(self):
+        item = self.list.currentItem()
+        self.hide()
+        if item is not None:
+            self.chosen.emit(item.data(Qt.UserRole))
+
+
+# ---------------------------------------------------------------------------
+# Finestra attiva → pagina: regole per app, backend intercambiabili
+# ---------------------------------------------------------------------------
+
+class ActiveAppRouter:
+    """Regole "app_rules" del layout ({"firefox": 2, ...}, pagine da 1) → indice pagina.
+
+    Il nome dell'app (WM_CLASS, eseguibile o bundle) è confrontato per sottostringa,
+    senza maiuscole; il risultato è messo in cache per finestra (una finestra non cambia app).
+    """
+
+    CACHE_SIZE = 256
+
+    def __init__(self, rules: Optional[dict] = None):
+        self.hits = 0
+        self.misses = 0
+        self.set_rules(rules or {})
+
+    def set_rules(self, rules: dict):
+        # nuove regole → nuova cache (assegnazioni atomiche: il watcher può leggere intanto)
+        self.rules = dict(rules)
+        self._rules = tuple((app.lower(), int(page) - 1) for app, page in rules.items())
+        self._cache: "OrderedDict[object, Optional[int]]" = OrderedDict()
+
+    def __bool__(self) -> bool:
+        return bool(self._rules)
+
+    def resolve(self, wid, app: str) -> Optional[int]:
+        key = wid if wid is not None else app
+        cache = self._cache
+        if key in cache:
+            self.hits += 1
+            cache.move_to_end(key)
+            return cache[key]
+        self.misses += 1
+        app = (app or "").lower()
+        page = next((p for name, p in self._rules if name in app), None)
+        cache[key] = page
+        if len(cache) > self.CACHE_SIZE:
+            cache.popitem(last=False)
+        return page
+
+    def changed(self, wid, app: str, current: int) -> Optional[int]:
+        """La pagina da mostrare se è diversa da `current` (quella mostrata), altrimenti None.
+
+        Si confronta con la pagina del deck, non con l'ultima risolta: uno switch ignorato
+        (edit mode) non lascia il router convinto di averlo fatto.
+        """
+        page = self.resolve(wid, app)
+        return None if page is None or page == current else page
+
+
+class WindowWatcher:
+    """Backend: chiama `on_change(wid, app)` dal proprio thread quando cambia la finestra attiva."""
+
+    name = "none"
+
+    def start(self, on_change: Callable[[object, str], None]):
+        self.on_change = on_change
+
+    def stop(self):
+        pass
+
+
+class FakeWindowWatcher(WindowWatcher):
+    """Per test e benchmark: `activate()` simula un cambio di finestra (sul thread chiamante)."""
+
+    name = "fake"
+
+    def activate(self, wid, app: str):
+        self.on_change(wid, app)
+
+
+class PollingWindowWatcher(WindowWatcher):
+    """Fallback: interroga `probe() -> (wid, app) | None` ogni `interval` secondi."""
+
+    name = "poll"
+
+    def __init__(self, probe: Callable[[], Optional[tuple]], interval: float = 0.5):
+        self.probe = probe
+        self.interval = interval
+        self._stop = threading.Event()
+
+    def start(self, on_change):
+        super().start(on_change)
+        threading.Thread(target=self._run, name="umpb-window-poll", daemon=True).start()
+
+    def _run(self):
+        last = None
+        while not self._stop.is_set():
+            try:
+                cur = self.probe()
+            except Exception:
+                cur = None
+            if cur is not None and cur != last:
+                last = cur
+                self.on_change(*cur)
+            self._stop.wait(self.interval)
+
+    def stop(self):
+        self._stop.set()
+
+
+class X11WindowWatcher(WindowWatcher):
+    """Event-driven: PropertyNotify di _NET_ACTIVE_WINDOW sulla root window (python-xlib)."""
+
+    name = "x11"
+
+    def __init__(self):
+        from Xlib import X, display
+
+        self._X = X
+        self._display = display.Display()
+        self._root = self._display.screen().root
+        self._atom = self._display.intern_atom("_NET_ACTIVE_WINDOW")
+        self._classes: "OrderedDict[int, str]" = OrderedDict()     # wid → WM_CLASS
+        self._stop = threading.Event()
+
+    def start(self, on_change):
+        super().start(on_change)
+        self._root.change_attributes(event_mask=self._X.PropertyChangeMask)
+        self._display.flush()
+        threading.Thread(target=self._run, name="umpb-window-x11", daemon=True).start()
+
+    def _run(self):
+        import select
+
+        d, last = self._display, None
+        try:
+            last = self._report(last)
+            while not self._stop.is_set():
+                if not d.pending_events():
+                    select.select([d.fileno()], [], [], 0.5)    # timeout: per accorgersi di stop()
+                    continue
+                ev = d.next_event()
+                if ev.type == self._X.PropertyNotify and ev.atom == self._atom:
+                    last = self._report(last)
+        except Exception as e:
+            print("⚠️  Active-window watcher stopped:", e)
+        finally:
+            d.close()
+
+    def _report(self, last):
+        prop = self._root.get_full_property(self._atom, self._X.AnyPropertyType)
+        wid = int(prop.value[0]) if prop is not None and len(prop.value) else 0
+        if not wid or wid == last:
+            return last
+        app = self._classes.get(wid)
+        if app is None:
+            try:
+                cls = self._display.create_resource_object("window", wid).get_wm_class() or ()
+            except Exception:
+                cls = ()                    # finestra già chiusa
+            app = self._classes[wid] = " ".join(cls)
+            if len(self._classes) > 256:
+                self._classes.popitem(last=False)
+        self.on_change(wid, app)
+        return wid
+
+    def stop(self):
+        self._stop.set()
+
+
+def _win_foreground() -> Optional[tuple]:
+    """(HWND, nome dell'eseguibile) della finestra in primo piano (Windows, ctypes)."""
+    import ctypes
+    from ctypes import wintypes
+
+    user32, kernel32 = ctypes.windll.user32, ctypes.windll.kernel32
+    hwnd = user32.GetForegroundWindow()
+    if not hwnd:
+        return None
+    pid = wintypes.DWORD()
+    user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+    handle = kernel32.OpenProcess(0x1000, False, pid.value)     # PROCESS_QUERY_LIMITED_INFORMATION
+    if not handle:
+        return hwnd, ""
+    try:
+        buf, size = ctypes.create_unicode_buffer(260), wintypes.DWORD(260)
+        kernel32.QueryFullProcessImageNameW(handle, 0, buf, ctypes.byref(size))
+        return hwnd, Path(buf.value).stem
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+def _mac_frontmost() -> Optional[tuple]:
+    """(pid, bundle id + nome) dell'app in primo piano (macOS, pyobjc/AppKit)."""
+    from AppKit import NSWorkspace
+
+    app = NSWorkspace.sharedWorkspace().frontmostApplication()
+    if app is None:
+        return None
+    return app.processIdentifier(), f"{app.bundleIdentifier() or ''} {app.localizedName() or ''}"
+
+
+def make_window_watcher() -> Optional[WindowWatcher]:
+    """Il backend migliore disponibile: eventi X11, altrimenti polling; None se non supportato."""
+    try:
+        if sys.platform.startswith("win"):
+            return PollingWindowWatcher(_win_foreground)
+        if sys.platform == "darwin":
+            import AppKit  # noqa: F401  (pyobjc, opzionale)
+            return PollingWindowWatcher(_mac_frontmost)
+        return X11WindowWatcher()
+    except Exception as e:
+        print("⚠️  Active-window watcher unavailable:", e)
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Canale di controllo locale (IPC) + istanza singola
+# ---------------------------------------------------------------------------
+# Protocollo testuale, un comando per riga, una risposta per riga ("ok" / "error: …" / JSON per stats):
+#   tile N · page N · shortcut ID · toggle · show · hide · palette · most-used · reload · cancel [ID] ·
+#   stats · ping
+# N parte da 1, come Alt+1…8.
+
+_CONTROL_ARGS = {                   # comando → (argomenti minimi, massimi, uso)
+    "tile": (1, 1, "tile N"), "page": (1, 1, "page N"), "shortcut": (1, 1, "shortcut ID"),
+    "cancel": (0, 1, "cancel [ID]"),
+    **{c: (0, 0, c) for c in ("toggle", "show", "hide", "palette", "most-used", "reload", "stats", "ping")},
+}
+
+
+def _control_number(arg: str, what: str) -> int:
+    try:
+        return int(arg)
+    except ValueError:
+        raise ValueError(f"{what} must be a number, not {arg!r}") from None
+
+def send_control(name: str, commands: List[str], timeout_ms: int = 300) -> Optional[List[str]]:
+    """Invia i comandi all'istanza in ascolto; None se non c'è nessuno dall'altra parte.
+
+    Con i socket Unix usa il client di umpb; QLocalSocket resta per le named pipe di Windows.
+    """
+    if control_socket_path(name) is not None:
+        return _send_control_unix(name, commands, timeout_ms)
+    sock = QLocalSocket()
+    sock.connectToServer(name)
+    if not sock.waitForConnected(timeout_ms):
+        return None
+    sock.write("".join(c + "\n" for c in commands).encode("utf-8"))
+    sock.waitForBytesWritten(timeout_ms)
+    replies: List[str] = []
+    deadline = time.monotonic() + timeout_ms / 1000
+    while len(replies) < len(commands):
+        while sock.canReadLine():
+            replies.append(bytes(sock.readLine()).decode("utf-8").rstrip("\n"))
+        left = int((deadline - time.monotonic()) * 1000)
+        if len(replies) >= len(commands) or left <= 0 or not sock.waitForReadyRead(left):
+            break
+    sock.disconnectFromServer()
+    return replies
+
+
+class ControlServer(QObject):
+    """QLocalServer sul thread GUI: ogni riga ricevuta è passata a `handler(cmd, args)`.
+
+    La risposta è una riga: quella restituita dall'handler, "ok" oppure "error: …".
+    """
+
+    def __init__(self, name: str, handler: Callable[[str, List[str]], None], parent=None):
+        super().__init__(parent)
+        self.name = name
+        self.handler = handler
+        self.server = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.UserAccessOption)
+        self.server.newConnection.connect(self._on_connection)
+
+    def listen(self) -> bool:
+        """Si mette in ascolto; un socket rimasto da un crash (nessuno risponde) viene rimosso."""
+        if self.server.listen(self.name):
+            return True
+        if send_control(self.name, ["ping"]) is not None:
+            print(f"⚠️  Another instance already owns the control socket {self.name!r}")
+            return False
+        QLocalServer.removeServer(self.name)
+        ok = self.server.listen(self.name)
+        if not ok:
+            print("⚠️  Control socket unavailable:", self.server.errorString())
+        return ok
+
+    def close(self):
+        self.server.close()
+
+    def _on_connection(self):
+        while self.server.hasPendingConnections():
+            sock = self.server.nextPendingConnection()
+            sock.readyRead.connect(lambda s=sock: self._read(s))
+            sock.disconnected.connect(sock.deleteLater)
+
+    def _read(self, sock: QLocalSocket):
+        while sock.canReadLine():
+            line = bytes(sock.readLine()).decode("utf-8", "replace").strip()
+            if not line:
+                continue
+            cmd, *args = line.split()
+            try:
+                reply = self.handler(cmd.lower(), args) or "ok"
+            except ValueError as e:
+                reply = f"error: {e}"
+            except Exception as e:      # niente eccezioni nello slot Qt: il client riceve sempre una riga
+                print(f"⚠️  Control command {line!r} failed:", repr(e))
+                reply = f"error: {cmd} failed ({type(e).__name__}: {e})"
+            sock.write((reply + "\n").encode("utf-8"))
+        sock.flush()
 
-    painter = QPainter(pm)
-    painter.setRenderHint(QPainter.Antialiasing)
-    painter.setPen(Qt.white)
-
-    font = QFont()                 # carattere di default del sistema
-    font.setPixelSize(46)          # grandezza visibile
-    painter.setFont(font)
-
-    painter.drawText(pm.rect(), Qt.AlignCenter, glyph)
-    painter.end()
-
-    return QIcon(pm)
-
-@dataclass
-class Shortcut:
-    id: str
-    name: str
-    key: str
-    action: str
-    color: str  # e.g. "bg-blue-500" (mapped later)
-    type: str   # "shortcut" | "app"
-    path: Optional[str] = None
-
-    def qt_icon(self) -> QIcon:
-        """Icona visualizzata sul tile."""
-        if self.type == "app" and self.path:
-            # usa l’icona di sistema del file / bundle
-            provider = QFileIconProvider()
-            return provider.icon(QFileInfo(self.path))
-        glyphs = {
-            "undo": "↶", "redo": "↷", "copy": "⎘", "cut": "✂",
-            "save": "💾", "find": "🔍", "new": "📄", "explorer": "📁",
-        }
-        return _icon(glyphs.get(self.action, "🔘"))
 
 # ---------------------------------------------------------------------------
 # Main window
@@ -81,9 +1454,17 @@ class Shortcut:
 
 class VirtualSteamDeck(QMainWindow):
     toggle_requested = Signal()
-    tile_requested   = Signal(int)   # indice 0-7 da hot-key
-
-    # ---- layout constants
+    listener_ready   = Signal(bool)  # dal thread del listener: avviato (True) o fallito (False)
+    tile_requested   = Signal(int)   # indice del tile sulla pagina corrente, da hot-key
+    page_requested   = Signal(int)   # indice pagina, da hot-key
+    shortcut_requested = Signal(str) # Shortcut.id, da binding per-tile
+    palette_requested = Signal()
+    most_used_requested = Signal()
+    hotkeys_pending  = Signal()      # dal thread del listener: la coda hot-key ha eventi da consegnare
+    app_page_requested = Signal(int) # dal watcher della finestra attiva: pagina associata all'app
+    index_ready      = Signal(int, object)  # dal thread dell'indice: (generazione del layout, ShortcutIndex)
+
+    # ---- layout constants (righe/colonne di default, configurabili nel layout: "grid")
     GRID_ROWS = 2
     GRID_COLS = 4
     TILE = 62           # tile size (px)
@@ -92,25 +1473,50 @@ class VirtualSteamDeck(QMainWindow):
 
     # ---- misc
     HOTKEY = "ctrl+shift+d"
-    MAX_PAGES = 5
-    LAYOUT_PATH = Path.home() / ".umpb_layout.json"
-
-    def __init__(self):
+    DEFAULT_HOTKEYS = {
+        "toggle": HOTKEY,
+        "tiles": [f"alt+{n}" for n in range(1, 9)],
+        "pages": [],
+        "palette": "ctrl+shift+space",
+        "most_used": "",                 # vuoto = nessun binding
+    }
+    THEME = "slate"
+    MAX_PAGES: Optional[int] = None      # None = nessun limite (configurabile: "max_pages")
+    PALETTE_RUN_DELAY_MS = 60            # lascia al WM il tempo di ridare il focus all'app
+    LAYOUT_PATH = DEFAULT_LAYOUT_PATH
+    CONTROL_NAME: Optional[str] = control_name()    # None = nessun canale IPC
+    WATCH_LAYOUT = True                               # ricarica le modifiche esterne al file di layout
+    COMPACT_EVERY = 50                                # operazioni nel journal prima di un nuovo snapshot
+    UNDO_DEPTH = 100
+    RENDERER = "widgets"                              # "widgets" (un QPushButton per tile) | "painted"
+    RENDERERS = ("widgets", "painted")
+    MOST_USED: Optional[int] = None                   # tile della pagina automatica "most used" (None = off)
+    PREWARM = 0                                       # tile probabili da preparare dopo ogni uso (0 = off)
+    USAGE_FOLD_MS = 30_000                            # contatori d'uso accorpati (e scritti a lotti) ogni 30 s
+    HOTKEY_BACKEND = "auto"                           # "auto" (nativo se c'è, altrimenti pynput) | "native" | "pynput"
+
+    def __init__(self, fast_start: bool = False, profile_startup: bool = False,
+                 perf_hud: bool = False, trace_path: Optional[Path] = None,
+                 record_keys: Optional[Path] = None):
         super().__init__()
-        # Compute window size to guarantee NO overlap
-        # ---------- persistenza layout ---------- #
-
-        width = (
-            self.GRID_COLS * self.TILE
-            + (self.GRID_COLS - 1) * self.GRID_SPACING
-            + self.BODY_MARGIN * 2
-        )
-        height = 260  # empirically comfortable with header+nav+sys+info
+        # tracing: timestamp dei press in attesa di consegna, uno per segnale (FIFO)
+        self._trace_pending: dict[str, deque] = {"toggle": deque(), "tile": deque(), "shortcut": deque()}
+        self.trace_path = trace_path
+        self.perf_hud = perf_hud
+        self.record_keys = record_keys      # flusso di tasti da salvare all'uscita (per l'harness di replay)
+        self._hotkey_input: Optional[HotkeyInput] = None
+        self._hotkey_source = None                      # Listener di pynput o NativeHotkeys
+        self.hotkey_backend = "none"
+        # fast-start: prima il frame, poi (dopo il primo paint) listener, icone e pagine non visibili
+        self.fast_start = fast_start
+        self.profile_startup = profile_startup
+        self._painted = False
+        self._deferred_done = False
+        self._listener_up = False
 
         self.setWindowTitle("UMPB")
         self.setWindowFlags(Qt.WindowStaysOnTopHint | Qt.FramelessWindowHint | Qt.WindowDoesNotAcceptFocus)
         self.setAttribute(Qt.WA_TranslucentBackground)
-        self.setFixedSize(width + 40, height)  # +40 to account for window border shadows
 
         # ----- state
         self.is_edit_mode = False
@@ -118,39 +1524,366 @@ class VirtualSteamDeck(QMainWindow):
         self.drag_offset = QPoint()
         self.current_page = 0
         self.pages: List[List[Shortcut]] = [self._default_shortcuts()]
+        self._page_views: dict[int, QWidget] = {}      # _PageView o _PaintedPageView
+        self._nav_dots: List[QPushButton] = []
+        self._icon_loader = IconLoader(ICON_CACHE, self)
+        self._executor = ActionExecutor()
+        self._supervisor = ProcessSupervisor()
+        self._macros = MacroRunner({
+            # tasti e testo passano dal worker dei keystroke: mai intrecciati con l'invio di un tile
+            "keys": lambda plan: self._macro_keys("macro:keys", self._send_plan, plan),
+            "text": lambda text: self._macro_keys("macro:text", KEYBOARD.type_text, text),
+            "launch": lambda path: self._executor.submit_launch(f"launch:{path}", self._launch_app, path),
+            "page": self.page_requested.emit,       # dal thread delle macro: consegna accodata
+        })
+        self._journal = LayoutJournal(journal_path(self.LAYOUT_PATH))
+        self._persister = LayoutPersister(self.LAYOUT_PATH, on_written=self._snapshot_written)
+        self._undo: deque = deque(maxlen=self.UNDO_DEPTH)
+        self._journal_unbased = False
+        self._redo: List[dict] = []
+        self.theme = self.THEME
+        self.hotkeys_cfg = dict(self.DEFAULT_HOTKEYS)
+        self.grid_rows, self.grid_cols = self.GRID_ROWS, self.GRID_COLS
+        self.max_pages = self.MAX_PAGES
+        self.renderer = self.RENDERER
+        self.most_used = self.MOST_USED
+        self.prewarm = self.PREWARM
+        self.showing_most_used = False
+        self._most_used_view: Optional[tuple[tuple, List[Shortcut], QWidget]] = None   # (chiave, tile, vista)
+        self._usage = UsageStats(usage_path(self.LAYOUT_PATH)).load()
+        self._usage_timer = QTimer(self, interval=self.USAGE_FOLD_MS)
+        self._usage_timer.timeout.connect(self._usage.fold)
+        self._usage_timer.start()
+        self._prewarm_queued = False
+        self._warm_plans: set = set()
+        self._launcher_warm = False
+        self._index: Optional[ShortcutIndex] = None     # ricostruito on-demand dopo ogni modifica
+        self._layout_gen = 0                            # incrementato a ogni modifica del layout
+        self._palette: Optional[CommandPalette] = None
+        self._themes = ThemeEngine()
+        self._layout_hash = ""                          # sha256 dell'ultimo layout letto/applicato
+        self._watcher: Optional[LayoutWatcher] = None
+        self._app_router = ActiveAppRouter()
+        self._window_watcher: Optional[WindowWatcher] = None
         self._load_layout()
+        PROFILE.mark("layout loaded")
+        self._apply_window_size()
+        self._themes.apply(self.theme)
+        self._hotkey_engine = HotkeyEngine(self._build_hotkey_table())
+        self._hotkey_queue = EventQueue()
 
         # build & hotkey
         self._build_ui()
-        self.toggle_requested.connect(self.toggle_visibility)
+        PROFILE.mark("ui built")
+        self.toggle_requested.connect(self._on_toggle_requested)
         self.tile_requested.connect(self._trigger_tile)
-        self._install_hotkey()
+        self.page_requested.connect(self._trigger_page)
+        self.shortcut_requested.connect(self._trigger_shortcut)
+        self.palette_requested.connect(self._open_palette)
+        self.most_used_requested.connect(self._show_most_used)
+        self.hotkeys_pending.connect(self._drain_hotkeys)
+        self.app_page_requested.connect(self._on_app_page)
+        self.index_ready.connect(self._on_index_ready)
+        self.listener_ready.connect(self._on_listener_ready)
+        self._control: Optional[ControlServer] = None
+        if self.CONTROL_NAME:
+            self._control = ControlServer(self.CONTROL_NAME, self.control, self)
+            if not self._control.listen():
+                self._control = None
+            PROFILE.mark("control socket")
+        if not self.fast_start:
+            self._install_hotkey()
+        self.centralWidget().installEventFilter(self)    # primo paint → lavoro differito
+        if self.perf_hud:
+            TRACE.enabled = True
+            self._hud_timer = QTimer(self, interval=500)
+            self._hud_timer.timeout.connect(lambda: self.info_label.setText(TRACE.hud_text()))
+            self._hud_timer.start()
+            self.info_label.setToolTip("Double-click to dump latency histograms to JSON")
+            self.info_label.mouseDoubleClickEvent = lambda _: self.dump_trace()
+        app = QApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self._persister.flush)
+            app.aboutToQuit.connect(self._usage.close)
+            app.aboutToQuit.connect(lambda: TRACE.enabled and self.dump_trace())
+            if self.record_keys is not None:
+                app.aboutToQuit.connect(self.save_key_recording)
+            if self._control is not None:
+                app.aboutToQuit.connect(self._control.close)
+
+    def save_key_recording(self) -> Optional[Path]:
+        """Scrive i tasti visti dal listener (--record-keys), rigiocabili con benchmarks/replay_hotkeys.py."""
+        hotkeys = self._hotkey_input
+        if hotkeys is None or not hotkeys.record:
+            return None
+        try:
+            save_key_stream(self.record_keys, hotkeys.record)
+            print(f"Key stream written to {self.record_keys} ({len(hotkeys.record)} events)")
+            return self.record_keys
+        except OSError as e:
+            print("⚠️  Failed to write key stream:", e)
+            return None
+
+    # -------------------------------------------------------------------
+    # Startup: lavoro differito dopo il primo paint
+    # -------------------------------------------------------------------
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and not self._painted:
+            self._painted = True
+            PROFILE.mark("first paint")
+            QTimer.singleShot(0, self._after_first_paint)
+        return super().eventFilter(obj, event)
+
+    def _after_first_paint(self):
+        """Listener, icone e pagine non visibili: tutto ciò che non serve al primo frame."""
+        if self.fast_start:
+            self._install_hotkey()
+            self._request_icons(self._page_view(self.current_page))
+            PROFILE.mark("icons requested")
+        handle = self.windowHandle()
+        if handle is not None:
+            handle.screenChanged.connect(self._on_screen_changed)
+            self._on_screen_changed(handle.screen())
+        self._sync_window_watcher()
+        if self.WATCH_LAYOUT:
+            self._watcher = LayoutWatcher(self.LAYOUT_PATH, self._is_known_layout, self)
+            self._watcher.changed.connect(self._on_layout_changed)
+        self._prebuild_index()
+        self._prebuild_pages([i for i in range(len(self.pages)) if i not in self._page_views])
+
+    def _on_screen_changed(self, screen):
+        """Monitor con un altro fattore di scala: si rasterizza di nuovo l'atlante dei glyph."""
+        if screen is not None and ICON_CACHE.atlas.set_dpr(screen.devicePixelRatio()):
+            for view in self._page_views.values():
+                view.update()
+
+    def _prebuild_pages(self, todo: List[int]):
+        """Costruisce le pagine non ancora in cache, una per giro di event loop."""
+        while todo and todo[0] >= len(self.pages):
+            todo.pop(0)
+        if todo:
+            self._page_view(todo.pop(0))
+            QTimer.singleShot(0, lambda: self._prebuild_pages(todo))
+            return
+        PROFILE.mark("pages prebuilt")
+        self._deferred_done = True
+        self._maybe_report_startup()
+
+    def _on_listener_ready(self, ok: bool):
+        if not ok and isinstance(self._hotkey_source, NativeHotkeys):
+            print(f"⚠️  Native hot-keys ({self.hotkey_backend}) failed, falling back to pynput")
+            self._install_hotkey(native=False)
+            return
+        PROFILE.mark("listener ready" if ok else "listener failed")
+        self._listener_up = True
+        self._maybe_report_startup()
+
+    def _maybe_report_startup(self):
+        if self.profile_startup and self._deferred_done and self._listener_up:
+            self.profile_startup = False
+            print(PROFILE.report())
+
+    def _read_layout(self) -> Optional[tuple[str, dict]]:
+        """(sha256, layout parsato); se il file è corrotto ripiega sull'ultima copia buona (.bak)."""
+        return read_layout(self._persister.candidates())
 
     def _load_layout(self):
-            if self.LAYOUT_PATH.exists():
-                try:
-                    with self.LAYOUT_PATH.open("r", encoding="utf-8") as f:
-                        data = json.load(f)
-                    self.pages = [[Shortcut(**sc) for sc in page] for page in data]
-                except Exception as e:
-                    print("⚠️  Failed to load layout:", e)
+        """Carica il layout all'avvio (nessuna pagina ancora costruita): snapshot + replay del journal."""
+        loaded = self._read_layout()
+        data: dict = {}
+        if loaded is not None:
+            self._layout_hash, data = loaded
+            self._apply_settings(data)
+        pages = replay_journal(data.get("pages", self.pages), self._journal.load(data))
+        self.pages = self._repaginate(pages)
+        # journal nuovo: serve uno snapshot che ne indichi la base, scritto solo alla prima modifica
+        self._journal_unbased = (data.get("journal") or {}).get("id") != self._journal.id
+
+    def _ensure_journal_base(self):
+        if self._journal_unbased:
+            self._journal_unbased = False
+            self._save_layout()
+
+    def _apply_settings(self, data: dict):
+        self.theme = data.get("theme", self.theme)
+        self.hotkeys_cfg = {**self.DEFAULT_HOTKEYS, **data.get("hotkeys", {})}
+        grid = data.get("grid", {})
+        self.grid_rows = grid.get("rows", self.GRID_ROWS)
+        self.grid_cols = grid.get("cols", self.GRID_COLS)
+        self.max_pages = data.get("max_pages", self.MAX_PAGES)
+        renderer = data.get("renderer", self.RENDERER)
+        if renderer not in self.RENDERERS:
+            print(f"⚠️  Unknown renderer {renderer!r}, using {self.RENDERER!r}")
+            renderer = self.RENDERER
+        self.renderer = renderer
+        self.most_used = data.get("most_used", self.MOST_USED)
+        self.prewarm = data.get("prewarm", self.PREWARM)
+        self._supervisor.configure(**data.get("launch", {}))
+        self._app_router.set_rules(data.get("app_rules", {}))
+
+    def _repaginate(self, pages: List[List[Shortcut]]) -> List[List[Shortcut]]:
+        """Se la griglia è più piccola del layout salvato, i tile in eccesso di una pagina passano
+        a pagine nuove in coda: le altre pagine, e gli indici usati da app_rules e hot-key, restano."""
+        per_page = self.grid_rows * self.grid_cols
+        if all(len(p) <= per_page for p in pages):
+            return pages or [[]]
+        spill = [sc for page in pages for sc in page[per_page:]]
+        return [page[:per_page] for page in pages] + [spill[i:i + per_page] for i in range(0, len(spill), per_page)]
+
+    def _is_known_layout(self, digest: str) -> bool:
+        """Chiamato dal thread del watcher: contenuto già applicato o scritto da noi."""
+        return digest == self._layout_hash or digest in self._persister.written
+
+    def _on_layout_changed(self, digest: str, data: dict):
+        """Modifica esterna del file (già parsata): vince sullo snapshot non ancora scritto e sul journal."""
+        if self._is_known_layout(digest):
+            return
+        tiles, pages = self._apply_layout(data)     # impostazioni già validate da parse_layout
+        self._layout_hash = digest
+        self._persister.discard()
+        # il journal non descrive più il layout: se ne apre uno nuovo, con snapshot alla prima modifica
+        # (il file appena letto non viene riscritto)
+        self._journal.restart(truncate=True)
+        self._journal_unbased = True
+        self._undo.clear()
+        self._redo.clear()
+        print(f"Layout reloaded from {self.LAYOUT_PATH}: {tiles} tile(s), {pages} page(s) re-rendered")
+
+    def _apply_layout(self, data: dict) -> tuple[int, int]:
+        """Applica un layout parsato confrontandolo per `Shortcut.id` con quello in memoria.
+
+        Gli Shortcut invariati vengono riusati; nelle pagine già costruite si sostituiscono
+        solo i tile cambiati (una pagina che cambia numero di tile viene ricostruita).
+        Restituisce (tile sostituiti, pagine invalidate).
+        """
+        old_grid = (self.grid_rows, self.grid_cols, self.renderer)
+        self._apply_settings(data)
+        old_by_id = {sc.id: sc for page in self.pages for sc in page}
+        new_pages = [
+            [old if (old := old_by_id.get(sc.id)) == sc else sc for sc in page]
+            for page in self._repaginate(data["pages"])
+        ]
+        old_pages, self.pages = self.pages, new_pages
+        tiles = pages = 0
+        if (self.grid_rows, self.grid_cols, self.renderer) != old_grid:
+            pages = len(self._page_views)
+            for idx in list(self._page_views):
+                self._invalidate_page(idx)
+            self._apply_window_size()
+        for idx in list(self._page_views):
+            old = old_pages[idx] if idx < len(old_pages) else None
+            new = new_pages[idx] if idx < len(new_pages) else None
+            if old is None or new is None or len(old) != len(new):
+                self._invalidate_page(idx)
+                pages += 1
+                continue
+            for i, (a, b) in enumerate(zip(old, new)):
+                if a is not b:
+                    self._replace_tile(self._page_views[idx], i, b)
+                    tiles += 1
+        self.current_page = min(self.current_page, len(self.pages) - 1)
+        self._index = None
+        self._layout_gen += 1
+        self._set_hotkey_table(self._build_hotkey_table())
+        self._themes.apply(self.theme)
+        self._refresh_ui()
+        if self._painted:
+            self._sync_window_watcher()
+        return tiles, pages
+
+    def _apply_window_size(self):
+        """Dimensioni della finestra ricavate dalla griglia, così i tile non si sovrappongono mai."""
+        width = (
+            self.grid_cols * self.TILE
+            + (self.grid_cols - 1) * self.GRID_SPACING
+            + self.BODY_MARGIN * 2
+        )
+        # 124 px: header + nav + info + margini (empiricamente comodo)
+        height = 124 + self.grid_rows * self.TILE + (self.grid_rows - 1) * self.GRID_SPACING
+        self.setFixedSize(width + 40, height)  # +40 to account for window border shadows
+
+    def _layout_data(self) -> dict:
+        return {
+            "version": 2,
+            "theme": self.theme,
+            "hotkeys": self.hotkeys_cfg,
+            "grid": {"rows": self.grid_rows, "cols": self.grid_cols},
+            "max_pages": self.max_pages,
+            "renderer": self.renderer,
+            "most_used": self.most_used,
+            "prewarm": self.prewarm,
+            "launch": self._supervisor.config(),
+            "app_rules": self._app_router.rules,
+            "pages": [[sc.to_dict() for sc in page] for page in self.pages],
+        }
 
     def _save_layout(self):
+        """Snapshot completo sul thread GUI, scrittura (accorpata e atomica) in background.
+
+        Le singole modifiche vanno nel journal (`_edit`); lo snapshot serve per le impostazioni,
+        alla chiusura e come compattazione quando il journal si allunga.
+        """
+        self._index = None
+        self._layout_gen += 1
+        self._journal_unbased = False
+        data = self._layout_data()
+        data["journal"] = self._journal.position()
+        self._persister.schedule(data)
+        self._usage.flush()                 # i contatori d'uso vanno su disco insieme allo snapshot
+
+    def _snapshot_written(self, data: dict):
+        """Thread del persister: lo snapshot è su disco, le operazioni incluse escono dal journal."""
+        if data.get("journal"):
+            self._journal.compact(data["journal"])
+
+    # ---------------- edit journal + undo/redo ---------------------------
+    def _edit(self, op: dict):
+        """Modifica dell'utente: applicata, registrata nel journal e annullabile."""
+        if self._apply_edit(op):
+            self._undo.append(op)
+            self._redo.clear()
+            self._refresh_ui()
+
+    def _undo_edit(self):
+        if self._undo:
+            op = self._undo.pop()
+            if self._apply_edit(invert_layout_op(op)):
+                self._redo.append(op)
+            self._refresh_ui()
+
+    def _redo_edit(self):
+        if self._redo:
+            op = self._redo.pop()
+            if self._apply_edit(op):
+                self._undo.append(op)
+            self._refresh_ui()
+
+    def _apply_edit(self, op: dict) -> bool:
+        self._ensure_journal_base()
         try:
-            data = [[sc.__dict__ for sc in page] for page in self.pages]
-            with self.LAYOUT_PATH.open("w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2)
-        except Exception as e:
-            print("⚠️  Failed to save layout:", e)
+            page = apply_layout_op(self.pages, op)
+        except (ValueError, KeyError) as e:
+            print("⚠️  Can't apply edit:", e)
+            return False
+        self._journal.append(op)
+        if op["op"] in ("add_page", "remove_page"):
+            for idx in [i for i in self._page_views if i >= page]:    # gli indici successivi scorrono
+                self._invalidate_page(idx)
+        else:
+            self._invalidate_page(page)
+        self.current_page = min(page, len(self.pages) - 1)
+        self._index = None
+        self._layout_gen += 1
+        self._set_hotkey_table(self._build_hotkey_table())
+        if self._journal.since_snapshot >= self.COMPACT_EVERY:
+            self._save_layout()
+        return True
 
     # -------------------------------------------------------------------
     # UI construction
     # -------------------------------------------------------------------
     def _build_ui(self):
         root = QFrame(objectName="root")
-        root.setStyleSheet(
-            "QFrame#root{background:rgba(30,41,59,0.85);border:2px solid rgba(71,85,105,0.5);border-radius:16px;}"
-        )
         self.setCentralWidget(root)
         main_v = QVBoxLayout(root)
         main_v.setContentsMargins(0, 0, 0, 0)
@@ -166,12 +1899,9 @@ class VirtualSteamDeck(QMainWindow):
         body_v.setContentsMargins(self.BODY_MARGIN, self.BODY_MARGIN, self.BODY_MARGIN, self.BODY_MARGIN)
         body_v.setSpacing(4)
 
-        # grid
-        self.grid_widget = QWidget()
-        self.grid_layout = QGridLayout(self.grid_widget)
-        self.grid_layout.setHorizontalSpacing(self.GRID_SPACING)
-        self.grid_layout.setVerticalSpacing(self.GRID_SPACING)
-        body_v.addWidget(self.grid_widget)
+        # grid: una _PageView per pagina, costruite on-demand e tenute nello stack
+        self.grid_stack = QStackedWidget()
+        body_v.addWidget(self.grid_stack)
 
         # nav dots
         self.nav_widget = QWidget()
@@ -181,10 +1911,22 @@ class VirtualSteamDeck(QMainWindow):
         self.nav_layout.setSpacing(6)
         body_v.addWidget(self.nav_widget)
 
+        self.btn_add_page = QPushButton("+", objectName="addPage")
+        self.btn_add_page.setFixedSize(18, 18)
+        self.btn_add_page.setCursor(Qt.PointingHandCursor)
+        self.btn_add_page.clicked.connect(self._add_page)
+        self.nav_layout.addWidget(self.btn_add_page)
+
+        self.btn_most_used = QPushButton("★", objectName="mostUsed")
+        self.btn_most_used.setFixedSize(14, 14)
+        self.btn_most_used.setCursor(Qt.PointingHandCursor)
+        self.btn_most_used.setToolTip("Most used")
+        self.btn_most_used.clicked.connect(self._show_most_used)
+        self.nav_layout.addWidget(self.btn_most_used)
+
         # info label
-        self.info_label = QLabel(alignment=Qt.AlignCenter)
+        self.info_label = QLabel(alignment=Qt.AlignCenter, objectName="infoLabel")
         f = QFont(); f.setPointSize(9); self.info_label.setFont(f)
-        self.info_label.setStyleSheet("color:#64748b;")
         body_v.addWidget(self.info_label)
 
         main_v.addWidget(self.body)
@@ -194,18 +1936,23 @@ class VirtualSteamDeck(QMainWindow):
 
     # ---------------------- header helpers -----------------------------
     def _make_header(self) -> QWidget:
-        bar = QFrame()
-        bar.setStyleSheet("background:rgba(51,65,85,0.9); border-radius:12px;")
+        bar = QFrame(objectName="header")
         h = QHBoxLayout(bar)
         h.setContentsMargins(16, 8, 8, 8)
 
-        self.lbl_title = QLabel("UMPB")
-        self.lbl_title.setStyleSheet("color:#e2e8f0;font-weight:600;font-size:13px;")
-        self.lbl_page = QLabel()
-        self.lbl_page.setStyleSheet("color:#94a3b8;font-size:11px;")
+        self.lbl_title = QLabel("UMPB", objectName="title")
+        self.lbl_title.setToolTip("Double-click to switch theme")
+        self.lbl_title.mouseDoubleClickEvent = lambda _: self._cycle_theme()
+        self.lbl_page = QLabel(objectName="pageLabel")
         h.addWidget(self.lbl_title)
         h.addWidget(self.lbl_page)
         h.addStretch()
+        self.btn_undo = self._header_button(QStyle.SP_ArrowBack,          self._undo_edit)
+        self.btn_redo = self._header_button(QStyle.SP_ArrowForward,       self._redo_edit)
+        self.btn_undo.setToolTip("Undo")
+        self.btn_redo.setToolTip("Redo")
+        h.addWidget(self.btn_undo)
+        h.addWidget(self.btn_redo)
         h.addWidget(self._header_button(QStyle.SP_TitleBarMinButton,      self._toggle_minimise))
         h.addWidget(self._header_button(QStyle.SP_DialogOkButton,         self._handle_home))
         self.btn_settings = self._header_button(QStyle.SP_FileDialogNewFolder, self._handle_settings)
@@ -220,15 +1967,11 @@ class VirtualSteamDeck(QMainWindow):
 
     @staticmethod
     def _header_button(std_pix: QStyle.StandardPixmap, slot: Callable) -> QPushButton:
-        b = QPushButton()
+        b = QPushButton(objectName="headerButton")
         b.setFixedSize(18, 18)
         b.setCursor(Qt.PointingHandCursor)
         b.setIcon(b.style().standardIcon(std_pix))
         b.setIconSize(QSize(16, 16))
-        b.setStyleSheet(
-            "QPushButton{background:transparent;border:none;color:#94a3b8;}"
-            "QPushButton:hover{color:#f87171;}"
-        )
         b.clicked.connect(slot)
         return b
 
@@ -253,124 +1996,201 @@ class VirtualSteamDeck(QMainWindow):
     # -------------------------------------------------------------------
     def _refresh_ui(self):
         self.lbl_title.setText("Edit Mode" if self.is_edit_mode else "UMPB")
-        self.lbl_page.setText(
-            f"  Page {self.current_page + 1}/{len(self.pages)}" if len(self.pages) > 1 else ""
-        )
+        if self.showing_most_used and (self.is_edit_mode or not self.most_used):
+            self.showing_most_used = False
+        if self.showing_most_used:
+            self.lbl_page.setText("  Most used")
+        else:
+            self.lbl_page.setText(
+                f"  Page {self.current_page + 1}/{len(self.pages)}" if len(self.pages) > 1 else ""
+            )
         # icona toggle Edit/Normal
         edit_icon = QStyle.SP_DialogApplyButton if self.is_edit_mode else QStyle.SP_FileDialogNewFolder
         self.btn_settings.setIcon(self.btn_settings.style().standardIcon(edit_icon))
+        for btn, stack in ((self.btn_undo, self._undo), (self.btn_redo, self._redo)):
+            btn.setVisible(self.is_edit_mode)
+            btn.setEnabled(bool(stack))
 
-        self.info_label.setText(
-            "Tap ➕ to add • ✕ to delete • New pages with ➕ circle" if self.is_edit_mode else "Press Ctrl+Shift+D to toggle • Settings = Edit mode"
-        )
+        if not self.perf_hud:       # con l'HUD attivo la label mostra le latenze
+            self.info_label.setText(
+                "Tap ➕ to add • ✕ to delete • New pages with ➕ circle" if self.is_edit_mode else "Press Ctrl+Shift+D to toggle • Settings = Edit mode"
+            )
 
-        # --- grid
-        while self.grid_layout.count():
-            w = self.grid_layout.takeAt(0).widget()
-            if w:
-                w.deleteLater()
-
-        cur = self.pages[self.current_page]
-        idx = 0
-        for r in range(self.GRID_ROWS):
-            for c in range(self.GRID_COLS):
-                if idx < len(cur):
-                    tile = self._make_shortcut_button(cur[idx])
-                elif self.is_edit_mode and idx == len(cur):
-                    tile = self._make_add_shortcut_button()
-                else:
-                    placeholder = QLabel()
-                    placeholder.setFixedSize(self.TILE, self.TILE)
-                    tile = placeholder
-                self.grid_layout.addWidget(tile, r, c)
-                idx += 1
-
-        # --- nav dots
-        while self.nav_layout.count():
-            w = self.nav_layout.takeAt(0).widget()
-            if w:
-                w.deleteLater()
-
-        for i in range(len(self.pages)):
-            dot = QPushButton()
+        # --- grid: solo cambio indice se la pagina è già costruita
+        view = self._most_used_page() if self.showing_most_used else self._page_view(self.current_page)
+        view.set_edit_mode(self.is_edit_mode)
+        self.grid_stack.setCurrentWidget(view)
+        self._request_icons(view)
+
+        # --- nav dots: ricreati solo se cambia il numero di dot; con molte pagine
+        #     si mostra una finestra di dot centrata sulla pagina corrente
+        n_dots = min(len(self.pages), self._max_nav_dots())
+        if len(self._nav_dots) != n_dots:
+            self._rebuild_nav_dots(n_dots)
+        first = max(0, min(self.current_page - n_dots // 2, len(self.pages) - n_dots))
+        for i, dot in enumerate(self._nav_dots):
+            dot.setProperty("page", first + i)
+            _set_state(dot, "active", first + i == self.current_page and not self.showing_most_used)
+        self.btn_add_page.setVisible(self.is_edit_mode and self._can_add_page())
+        self.btn_most_used.setVisible(bool(self.most_used) and not self.is_edit_mode)
+        _set_state(self.btn_most_used, "active", self.showing_most_used)
+
+    def _max_nav_dots(self) -> int:
+        return max(1, (self.width() - 80) // 14)     # dot 8px + spacing 6px; spazio per il "+"
+
+    def _can_add_page(self) -> bool:
+        return self.max_pages is None or len(self.pages) < self.max_pages
+
+    def _rebuild_nav_dots(self, n: int):
+        for dot in self._nav_dots:
+            self.nav_layout.removeWidget(dot)
+            dot.deleteLater()
+        self._nav_dots = []
+        for i in range(n):
+            dot = QPushButton(objectName="navDot")
             dot.setFixedSize(8, 8)
             dot.setCursor(Qt.PointingHandCursor)
-            dot.setStyleSheet(
-                f"border-radius:4px;background-color:{'#3b82f6' if i == self.current_page else '#475569'};"
-            )
-            dot.clicked.connect(lambda _, x=i: self._goto_page(x))
-            self.nav_layout.addWidget(dot)
-
-        if self.is_edit_mode and len(self.pages) < self.MAX_PAGES:
-            add = QPushButton("+")
-            add.setFixedSize(18, 18)
-            add.setCursor(Qt.PointingHandCursor)
-            add.setStyleSheet(
-                "border-radius:4px;background:rgba(51,65,85,0.5);color:#94a3b8;border:1px solid rgba(71,85,105,0.6);"
-            )
-            add.clicked.connect(self._add_page)
-            self.nav_layout.addWidget(add)
+            dot.clicked.connect(lambda _, d=dot: self._goto_page(d.property("page")))
+            self.nav_layout.insertWidget(i, dot)
+            self._nav_dots.append(dot)
+
+    # ---------------- page cache ---------------------------------------
+    def _page_view(self, idx: int) -> QWidget:
+        """Restituisce la griglia della pagina `idx`, costruendola solo la prima volta."""
+        view = self._page_views.get(idx)
+        if view is None:
+            view = self._build_page(idx)
+            self._page_views[idx] = view
+            self.grid_stack.addWidget(view)
+        return view
+
+    def _invalidate_page(self, idx: int):
+        """Scarta la griglia cache della pagina `idx` (verrà ricostruita al prossimo refresh)."""
+        view = self._page_views.pop(idx, None)
+        if view is not None:
+            self.grid_stack.removeWidget(view)
+            view.deleteLater()
+
+    def _request_icons(self, view: QWidget):
+        """Chiede al loader le icone mancanti della pagina visibile.
+
+        I risultati che arrivano quando la pagina non è più visibile (o è stata
+        invalidata) vengono scartati; restano in cache per il prossimo passaggio.
+        In fast-start la risoluzione parte solo dopo il primo paint.
+        """
+        if self.fast_start and not self._painted:
+            return
+        for tile, sc in list(view.pending_icons.items()):
+            def apply(icon: QIcon, tile=tile, view=view):
+                if self.grid_stack.currentWidget() is not view or tile not in view.pending_icons:
+                    return
+                del view.pending_icons[tile]
+                view.set_icon(tile, icon)
+
+            icon = self._icon_loader.request(sc.path, apply, token=(view, tile))
+            if icon is not None:
+                apply(icon)
+
+    def _build_page(self, idx: int) -> QWidget:
+        return self._build_grid(self.pages[idx])
+
+    def _build_grid(self, cur: List[Shortcut]) -> QWidget:
+        """Vista di una griglia di tile (una pagina del layout o la pagina "most used")."""
+        if self.renderer == "painted":
+            return self._build_painted_grid(cur)
+        view = _PageView()
+        view.grid.setHorizontalSpacing(self.GRID_SPACING)
+        view.grid.setVerticalSpacing(self.GRID_SPACING)
+
+        n = 0
+        for r in range(self.grid_rows):
+            for c in range(self.grid_cols):
+                if n < len(cur):
+                    tile = self._make_shortcut_button(cur[n], view)
+                    view.tiles.append(tile)
+                    view.badges.append(tile.del_btn)
+                else:
+                    tile = QLabel()
+                    tile.setFixedSize(self.TILE, self.TILE)
+                    if n == len(cur):
+                        # slot del ➕: placeholder e pulsante condividono la cella
+                        view.add_tile = self._make_add_shortcut_button()
+                        view.add_slot = tile
+                        view.grid.addWidget(view.add_tile, r, c)
+                view.grid.addWidget(tile, r, c)
+                n += 1
+        return view
+
+    def _build_painted_grid(self, cur: List[Shortcut]) -> _PaintedPageView:
+        view = _PaintedPageView(self.grid_rows, self.grid_cols, self.TILE, self.GRID_SPACING,
+                                lambda: self._themes.current or self.theme)
+        for i, sc in enumerate(cur):
+            view.set_tile(i, sc, *self._tile_icon(sc))
+        view.tile_clicked.connect(self._handle_shortcut)
+        view.delete_clicked.connect(self._delete_shortcut)
+        view.add_clicked.connect(self._add_shortcut)
+        return view
 
     # ---------------- tile factories -----------------------------------
-    def _make_shortcut_button(self, sc: Shortcut) -> QWidget:
-        btn = QPushButton()
+    def _tile_icon(self, sc: Shortcut) -> tuple[QIcon, bool]:
+        """(icona iniziale, da risolvere in background?) di un tile."""
+        if sc.type == "app" and sc.path:
+            # icona di sistema risolta in background: intanto un placeholder
+            return self._icon_loader.placeholder(), True
+        return tile_icon(sc), False
+
+    def _make_shortcut_button(self, sc: Shortcut, view: _PageView) -> QWidget:
+        btn = QPushButton(objectName="tile")
+        btn.setProperty("tileColor", tile_color(sc.color))
         btn.setFixedSize(self.TILE, self.TILE)
         btn.setCursor(Qt.PointingHandCursor)
 
         # --- icona + testo ------------------------------------------------
-        btn.setIcon(sc.qt_icon())
-
-        if sc.type == "app":
-            # solo icona grande
-            btn.setText("")
-            btn.setIconSize(QSize(self.TILE - 12, self.TILE - 12))
-
-        elif sc.type == "shortcut":
-            known = {"undo", "redo", "copy", "cut", "save", "find", "new", "explorer"}
-            if sc.action in known:
-                # scorciatoie note → solo glyph, un po’ più grande
-                btn.setText("")
-                btn.setIconSize(QSize(40, 40))
-            else:
-                # scorciatoie custom → iconcina e testo (ctrl+…)
-                btn.setIconSize(QSize(28, 28))
-                btn.setText(sc.key.lower())
-
-        else:
-            btn.setIconSize(QSize(32, 32))
-            btn.setText(sc.name)
+        icon, pending = self._tile_icon(sc)
+        btn.setIcon(icon)
+        if pending:
+            view.pending_icons[btn] = sc
+        size, text = tile_face(sc, self.TILE)
+        btn.setIconSize(QSize(size, size))
+        btn.setText(text)
 
         # --- stile --------------------------------------------------------
         btn.setToolTip(sc.name)
-        btn.setStyleSheet(
-            "QPushButton{background:rgba(51,65,85,0.7);color:#cbd5e1;border:none;border-radius:8px;"
-            "font-size:10px;text-align:center;}"
-            "QPushButton:hover{background:rgba(71,85,105,0.9);}"
-        )
         btn.clicked.connect(lambda: self._handle_shortcut(sc))
 
-        # pulsante delete in edit-mode
-        if self.is_edit_mode:
-            del_btn = QPushButton("✕", btn)
-            del_btn.setFixedSize(16, 16)
-            del_btn.move(self.TILE - 20, 4)
-            del_btn.setCursor(Qt.PointingHandCursor)
-            del_btn.setStyleSheet(
-                "border-radius:8px;background:#ef4444;color:white;font-size:10px;"
-            )
-            del_btn.clicked.connect(lambda _, sid=sc.id: self._delete_shortcut(sid))
+        # pulsante delete: creato sempre, visibile solo in edit-mode
+        del_btn = QPushButton("✕", btn, objectName="deleteBadge")
+        del_btn.setFixedSize(16, 16)
+        del_btn.move(self.TILE - 20, 4)
+        del_btn.setCursor(Qt.PointingHandCursor)
+        del_btn.clicked.connect(lambda _, sid=sc.id: self._delete_shortcut(sid))
+        del_btn.setVisible(False)
+        btn.del_btn = del_btn
 
         return btn
 
 
+    def _replace_tile(self, view: QWidget, i: int, sc: Shortcut):
+        """Sostituisce il solo tile `i` di una pagina già costruita."""
+        if isinstance(view, _PaintedPageView):
+            view.set_tile(i, sc, *self._tile_icon(sc))
+            return
+        old = view.tiles[i]
+        view.grid.removeWidget(old)
+        view.pending_icons.pop(old, None)
+        old.deleteLater()
+        tile = self._make_shortcut_button(sc, view)
+        if view.edit_mode:
+            _set_state(tile, "edit", True)
+            tile.del_btn.setVisible(True)
+        view.grid.addWidget(tile, *divmod(i, self.grid_cols))
+        view.tiles[i] = tile
+        view.badges[i] = tile.del_btn
+
     def _make_add_shortcut_button(self) -> QPushButton:
-        btn = QPushButton("➕\nAdd")
+        btn = QPushButton("➕\nAdd", objectName="addTile")
         btn.setFixedSize(self.TILE, self.TILE)
         btn.setCursor(Qt.PointingHandCursor)
-        btn.setStyleSheet(
-            "QPushButton{background:rgba(51,65,85,0.5);color:#94a3b8;border:2px dashed rgba(71,85,105,0.6);border-radius:8px;font-size:11px;}"
-            "QPushButton:hover{border-color:rgba(203,213,225,0.8);}"
-        )
         btn.clicked.connect(self._add_shortcut)
         return btn
 
@@ -378,82 +2198,288 @@ class VirtualSteamDeck(QMainWindow):
     # -------------------------------------------------------------------
     # Shortcut actions
     # -------------------------------------------------------------------
-    def _handle_shortcut(self, sc: Shortcut):
+    def _handle_shortcut(self, sc: Shortcut, origin_ns: int = 0):
         """Esegue la scorciatoia o avvia l’app collegata."""
         if self.is_edit_mode:
             return  # in edit-mode i click non fanno nulla
+        t0 = TRACE.now() if TRACE.enabled else 0
+        self._usage.hit(sc.id)
+        if self.prewarm and not self._prewarm_queued:
+            self._prewarm_queued = True
+            QTimer.singleShot(0, self._prewarm_next)
 
-        print(f"Shortcut triggered: {sc.name} ({sc.key})")
-
+        # esecuzione fuori dal thread GUI: l'overlay resta reattivo
         if sc.type == "shortcut":
-            self._send_keystroke(sc.key)
+            run = self._send_plan
+            if t0:
+                run = TRACE.completion("keystroke", run, origin_ns or t0)
+            self._executor.submit_keys(f"keys:{sc.id}", run, sc.plan)
         elif sc.type == "app" and sc.path:
-            self._launch_app(sc.path)
+            run = self._launch_app
+            if t0:
+                run = TRACE.completion("launch", run, origin_ns or t0)
+            self._executor.submit_launch(f"launch:{sc.path}", run, sc.path)
+        elif sc.type == "macro" and sc.plan:
+            self._macros.run(sc.id, sc.plan)
+        if t0:
+            TRACE.record("gui.handle_shortcut", t0)
 
     def _trigger_tile(self, idx: int):
         """Esegue il tile idx via hot-key."""
+        origin = self._trace_delivered("tile")
+        t0 = TRACE.now() if TRACE.enabled else 0
         if self.is_edit_mode:
             return
-        cur = self.pages[self.current_page]
+        cur = self._visible_tiles()
         if 0 <= idx < len(cur):
-            self._handle_shortcut(cur[idx])
+            self._handle_shortcut(cur[idx], origin)
+        if t0:
+            TRACE.record("gui.trigger_tile", t0)
+
+    def _trace_delivered(self, signal: str) -> int:
+        """Chiude lo span di consegna cross-thread; restituisce il timestamp del press (0 se ignoto)."""
+        pending = self._trace_pending[signal]
+        if not TRACE.enabled or not pending:
+            return 0
+        origin, emitted = pending.popleft()
+        TRACE.record("signal.delivery", emitted)
+        return origin
+
+    def dump_trace(self) -> Optional[Path]:
+        """Scrive gli istogrammi di latenza in JSON (default ~/.umpb_trace.json)."""
+        path = self.trace_path or Path.home() / ".umpb_trace.json"
+        try:
+            TRACE.dump(path, self.stats())
+            print("Trace written to", path)
+            return path
+        except OSError as e:
+            print("⚠️  Failed to write trace:", e)
+            return None
 
     # -------------------------------------------------------------------
     # Cross-platform keystroke sender (pynput)
     # -------------------------------------------------------------------
     def _send_keystroke(self, combo: str):
-        """Invia la combinazione di tasti (es. 'Ctrl+Alt+K')."""
+        """Invia la combinazione di tasti (es. 'Ctrl+Alt+K', 'ctrl+f5', '⌘⇧S')."""
         try:
-            from pynput.keyboard import Key, Controller
-
-            mapper = {
-                "ctrl": Key.ctrl,
-                "shift": Key.shift,
-                "alt": Key.alt,
-                "cmd": Key.cmd,
-                "meta": Key.cmd,
-            }
-            ctl = Controller()
-            parts = [p.strip().lower() for p in combo.split("+")]
-            # correzione: su macOS un eventuale 'ctrl' → 'cmd' (salvo lo voglia davvero)
-            if sys.platform == "darwin":
-                parts = ["cmd" if p == "ctrl" else p for p in parts]
-            mods = [mapper[p] for p in parts if p in mapper]
-            chars = [p for p in parts if p not in mapper]
-
-            for m in mods:
-                ctl.press(m)
-            for ch in chars:
-                if len(ch) == 1:
-                    ctl.press(ch)
-                    ctl.release(ch)
-            for m in reversed(mods):
-                ctl.release(m)
-        except Exception as e:
+            self._send_plan(compile_combo(combo))
+        except ValueError as e:
             print("Couldn't send keystroke:", e)
 
-    @staticmethod
-    def _launch_app(path: str):
-        """Avvia l’app collegata, cross-platform."""
-        import os, subprocess, sys
+    _send_plan = staticmethod(send_plan)
 
-        if sys.platform.startswith("darwin"):
-            subprocess.Popen(["open", path])
-        elif sys.platform.startswith("win"):
-            os.startfile(path)          # type: ignore
-        else:                           # Linux / BSD
-            subprocess.Popen(["xdg-open", path])
+    def _macro_keys(self, name: str, fn: Callable, arg):
+        """Thread delle macro: invio in coda al worker dei keystroke, atteso prima del passo dopo."""
+        if not self._executor.run_keys(name, fn, arg):
+            raise RuntimeError("keystrokes dropped (queue full, edit mode or shutting down)")
+
+    def _launch_app(self, path: str):
+        """Avvia l’app collegata tramite il supervisor dei processi."""
+        open_path(self._supervisor, path)
 
     # -------------------------------------------------------------------
     # edit helpers
     # -------------------------------------------------------------------
+    def control(self, cmd: str, args: List[str]) -> Optional[str]:
+        """Esegue un comando del canale IPC (o della riga di comando); ValueError se non valido.
+
+        Restituisce la risposta per i comandi che ne hanno una (`stats`), altrimenti None.
+        """
+        spec = _CONTROL_ARGS.get(cmd)
+        if spec is None:
+            raise ValueError(f"unknown command {cmd!r}")
+        least, most, usage = spec
+        if not least <= len(args) <= most:
+            raise ValueError(f"usage: {usage}")
+        if cmd == "ping":
+            return None
+        if cmd == "stats":
+            return json.dumps(self.stats())
+        if cmd == "tile":
+            idx = _control_number(args[0], "tile") - 1
+            if not 0 <= idx < len(self._visible_tiles()):
+                raise ValueError(f"no tile {args[0]} on page {self.current_page + 1}")
+            self._trigger_tile(idx)
+        elif cmd == "page":
+            idx = _control_number(args[0], "page") - 1
+            if not 0 <= idx < len(self.pages):
+                raise ValueError(f"no page {args[0]}")
+            self._trigger_page(idx)
+        elif cmd == "shortcut":
+            if args[0] not in self._shortcut_index().by_id:
+                raise ValueError(f"no shortcut {args[0]!r}")
+            self._trigger_shortcut(args[0])
+        elif cmd == "toggle":
+            self.toggle_visibility()
+        elif cmd in ("show", "hide"):
+            self.toggle_visibility(cmd == "show")
+            if cmd == "show":
+                self.raise_()
+        elif cmd == "palette":
+            self._open_palette()
+        elif cmd == "most-used":
+            if not self.most_used:
+                raise ValueError("the most used page is off (layout key \"most_used\")")
+            self._show_most_used()
+        elif cmd == "reload":
+            self._reload_layout()
+        elif cmd == "cancel":
+            self._macros.cancel(args[0] if args else None)
+        return None
+
+    def stats(self) -> dict:
+        """Contatori di runtime: cache delle icone, azioni, avvii, hot-key, macro."""
+        return {
+            "icons": ICON_CACHE.summary(),
+            "actions": self._executor.stats(),
+            "launches": self._supervisor.snapshot(),
+            "hotkeys": self.hotkey_stats(),
+            "macros": self._macros.stats(),
+        }
+
+    def _reload_layout(self):
+        """Rilegge subito il layout dal disco e applica solo le differenze (se è cambiato da fuori)."""
+        loaded = self._read_layout()
+        if loaded is None:
+            raise ValueError("layout file unreadable; keeping the current layout")
+        self._on_layout_changed(*loaded)
+
+    # -------------------------------------------------------------------
+    # Pagina automatica dalla finestra attiva
+    # -------------------------------------------------------------------
+    def _sync_window_watcher(self):
+        """Avvia il watcher solo se il layout ha regole "app_rules"; lo ferma se non ne ha più."""
+        if self._app_router and self._window_watcher is None:
+            self._window_watcher = self._make_window_watcher()
+            if self._window_watcher is not None:
+                self._window_watcher.start(self._on_active_window)
+        elif not self._app_router and self._window_watcher is not None:
+            self._window_watcher.stop()
+            self._window_watcher = None
+
+    def _make_window_watcher(self) -> Optional[WindowWatcher]:
+        """Backend della finestra attiva (sovrascrivibile: FakeWindowWatcher nei test)."""
+        return make_window_watcher()
+
+    def _on_active_window(self, wid, app: str):
+        """Thread del watcher: segnala solo quando la pagina risolta non è già quella mostrata."""
+        page = self._app_router.changed(wid, app, self.current_page)   # lettura di un int: basta
+        if page is not None:
+            self.app_page_requested.emit(page)
+
+    def _on_app_page(self, idx: int):
+        if self.is_edit_mode or idx == self.current_page or not 0 <= idx < len(self.pages):
+            return                          # pagina invariata: nessun re-render
+        self._goto_page(idx)
+
+    def _trigger_page(self, idx: int):
+        """Salta alla pagina idx via hot-key."""
+        if 0 <= idx < len(self.pages):
+            self._goto_page(idx)
+
+    def _trigger_shortcut(self, sid: str):
+        """Esegue il tile `sid` (binding per-tile), su qualunque pagina si trovi."""
+        origin = self._trace_delivered("shortcut")
+        if self.is_edit_mode:
+            return
+        hit = self._shortcut_index().by_id.get(sid)
+        if hit is not None:
+            self._handle_shortcut(hit[2], origin)
+
+    # -------------------------------------------------------------------
+    # Usage: pagina automatica "most used" e prewarm dei tile probabili
+    # -------------------------------------------------------------------
+    def _visible_tiles(self) -> List[Shortcut]:
+        """Tile della griglia mostrata (Alt+1…8, comando "tile"): pagina corrente o "most used"."""
+        if self.showing_most_used and self._most_used_view is not None:
+            return self._most_used_view[1]
+        return self.pages[self.current_page]
+
+    def _most_used_tiles(self) -> List[Shortcut]:
+        self._usage.fold()
+        by_id = self._shortcut_index().by_id
+        limit = min(int(self.most_used), self.grid_rows * self.grid_cols)
+        return [by_id[sid][2] for sid in self._usage.ranked(limit, by_id)]
+
+    def _most_used_page(self) -> QWidget:
+        """Vista della pagina "most used": ricostruita solo se cambiano la classifica o il layout."""
+        tiles = self._most_used_tiles()
+        key = (self._layout_gen, self.renderer, tuple(sc.id for sc in tiles))
+        cached = self._most_used_view
+        if cached is not None and cached[0] == key:
+            return cached[2]
+        if cached is not None:
+            self.grid_stack.removeWidget(cached[2])
+            cached[2].deleteLater()
+        view = self._build_grid(tiles)
+        self.grid_stack.addWidget(view)
+        self._most_used_view = (key, tiles, view)
+        return view
+
+    def _show_most_used(self):
+        if self.most_used and not self.is_edit_mode:
+            self.showing_most_used = True
+            self._refresh_ui()
+
+    def _prewarm_next(self):
+        """Dopo un uso, fuori dal percorso del click: icone, Controller e launcher pronti
+        per i tile che probabilmente seguiranno (i piani sono già compilati nel layout)."""
+        self._prewarm_queued = False
+        self._usage.fold()
+        by_id = self._shortcut_index().by_id
+        for sid in self._usage.likely_next(self.prewarm, by_id):
+            sc = by_id[sid][2]
+            steps = sc.plan if sc.type == "macro" else ()
+            if sc.type == "app" and sc.path:
+                self._icon_loader.request(sc.path, lambda _icon: None, token="prewarm")  # resta nella LRU
+            if (sc.type == "app" or any(op == "launch" for op, _ in steps)) and not self._launcher_warm:
+                self._launcher_warm = True
+                threading.Thread(target=self._supervisor.prewarm, name="umpb-prewarm", daemon=True).start()
+            plans = [sc.plan] if sc.type == "shortcut" else [arg for op, arg in steps if op == "keys"]
+            for plan in plans:
+                if plan and plan not in self._warm_plans:
+                    self._warm_plans.add(plan)
+                    # sul worker dei keystroke (lo stesso thread che poi userà il Controller),
+                    # a priorità minima: non prende il posto di un keystroke vero
+                    self._executor.submit_idle(f"prewarm:{sc.id}", KEYBOARD.prepare, plan)
+
+    # -------------------------------------------------------------------
+    # Command palette
+    # -------------------------------------------------------------------
+    def _shortcut_index(self) -> ShortcutIndex:
+        if self._index is None:
+            self._index = ShortcutIndex(self.pages)
+        return self._index
+
+    def _prebuild_index(self):
+        """Costruisce l'indice in background, così la palette è pronta al primo hotkey."""
+        gen, pages = self._layout_gen, [list(page) for page in self.pages]    # copia: il thread GUI modifica le liste
+
+        def build():
+            self.index_ready.emit(gen, ShortcutIndex(pages))
+
+        threading.Thread(target=build, name="umpb-index", daemon=True).start()
+
+    def _on_index_ready(self, gen: int, index: ShortcutIndex):
+        if gen == self._layout_gen and self._index is None:      # layout cambiato nel frattempo: scarta
+            self._index = index
+
+    def _open_palette(self):
+        if self._palette is None:
+            self._palette = CommandPalette()
+            self._palette.chosen.connect(self._run_from_palette)
+        self._palette.open_with(self._shortcut_index())
+
+    def _run_from_palette(self, sc: Shortcut):
+        QTimer.singleShot(self.PALETTE_RUN_DELAY_MS, lambda: self._handle_shortcut(sc))
+
     def _delete_shortcut(self, sid: str):
-        """Rimuove una scorciatoia dalla pagina corrente e aggiorna la UI."""
-        self.pages[self.current_page] = [
-            s for s in self.pages[self.current_page] if s.id != sid
-        ]
-        self._refresh_ui()
-        self._save_layout()
+        """Rimuove una scorciatoia dalla pagina corrente (annullabile) e aggiorna la UI."""
+        page = self.pages[self.current_page]
+        for i, sc in enumerate(page):
+            if sc.id == sid:
+                self._edit({"op": "delete", "page": self.current_page, "index": i, "shortcut": sc.to_dict()})
+                return
 
     def _add_shortcut(self):
         self._prompt_new_shortcut()
@@ -485,7 +2511,7 @@ class VirtualSteamDeck(QMainWindow):
         from pathlib import Path
         import time
 
-        if len(self.pages[self.current_page]) >= self.GRID_ROWS * self.GRID_COLS:
+        if len(self.pages[self.current_page]) >= self.grid_rows * self.grid_cols:
             return
 
         ask = QMessageBox(self)
@@ -511,8 +2537,8 @@ class VirtualSteamDeck(QMainWindow):
                 type="app",
                 path=path,
             )
-            self.pages[self.current_page].append(sc)
-            self._refresh_ui()
+            self._edit({"op": "add", "page": self.current_page,
+                        "index": len(self.pages[self.current_page]), "shortcut": sc.to_dict()})
             return
 
         elif ask.clickedButton() is btn_keys:
@@ -529,26 +2555,23 @@ class VirtualSteamDeck(QMainWindow):
                 color="bg-blue-500",
                 type="shortcut",
             )
-            self.pages[self.current_page].append(sc)
-            self._refresh_ui()
-            self._save_layout()
+            self._edit({"op": "add", "page": self.current_page,
+                        "index": len(self.pages[self.current_page]), "shortcut": sc.to_dict()})
             return
 
         else:
             return  # Cancel
 
     def _add_page(self):
-        """Crea una nuova pagina (max 10) e ci naviga subito."""
-        if len(self.pages) >= self.MAX_PAGES:
+        """Crea una nuova pagina (fino a `max_pages`, se impostato) e ci naviga subito."""
+        if not self._can_add_page():
             return
-        self.pages.append([])
-        self.current_page = len(self.pages) - 1
-        self._refresh_ui()
-        self._save_layout()
+        self._edit({"op": "add_page", "page": len(self.pages)})
 
     def _goto_page(self, idx: int):
         """Salta alla pagina indicizzata `idx`."""
         self.current_page = idx
+        self.showing_most_used = False
         self._refresh_ui()
 
     # -------------------------------------------------------------------
@@ -556,15 +2579,38 @@ class VirtualSteamDeck(QMainWindow):
     # -------------------------------------------------------------------
     def _handle_home(self):
         self.current_page = 0
+        self.showing_most_used = False
         self.is_edit_mode = False
         self._refresh_ui()
 
     def _handle_settings(self):
         self.is_edit_mode = not self.is_edit_mode
+        if self.is_edit_mode:               # niente azioni residue mentre si modifica il layout
+            self._macros.cancel()           # prima le macro: il loro passo scartato sotto è "cancelled"
+            self._executor.cancel_pending()
         self._refresh_ui()
 
+    def set_theme(self, name: str):
+        """Cambia tema: solo lo stylesheet applicativo, nessun widget ricostruito."""
+        self._themes.apply(name)
+        if self._themes.current == name and name != self.theme:
+            self.theme = name
+            self._save_layout()
+
+    def _cycle_theme(self):
+        names = list(self._themes.themes)
+        cur = names.index(self.theme) if self.theme in names else -1
+        self.set_theme(names[(cur + 1) % len(names)])
+
     def _handle_power(self):
         self._save_layout()
+        self._persister.flush()
+        self._journal.close()
+        if self._window_watcher is not None:
+            self._window_watcher.stop()
+        self._macros.shutdown()
+        self._icon_loader.shutdown()
+        self._executor.shutdown()
         QApplication.quit()
 
     # -------------------------------------------------------------------
@@ -574,6 +2620,12 @@ class VirtualSteamDeck(QMainWindow):
         self.is_minimized = not getattr(self, "is_minimized", False)
         self.body.setVisible(not self.is_minimized)
 
+    def _on_toggle_requested(self):
+        origin = self._trace_delivered("toggle")
+        self.toggle_visibility()
+        if origin:
+            TRACE.record("e2e.toggle", origin)
+
     def toggle_visibility(self, state: Optional[bool] = None):
         """Mostra/nasconde l’overlay. Se `state` è None effettua toggle."""
         if state is None:
@@ -584,83 +2636,146 @@ class VirtualSteamDeck(QMainWindow):
     # -------------------------------------------------------------------
     # Global hot-key (Ctrl+Shift+D)
     # -------------------------------------------------------------------
-    def _install_hotkey(self):
-        """Hot-keys globali:
+    def hotkey_stats(self) -> dict:
+        """Contatori del listener: attivazioni, auto-repeat scartati, limiti di frequenza, coda piena."""
+        return {**self._hotkey_engine.counters, "dropped": self._hotkey_queue.dropped,
+                "backend": self.hotkey_backend}
+
+    def _set_hotkey_table(self, table: HotkeyTable):
+        """Nuovi binding: all'engine e, con un backend nativo, ri-registrati presso l'OS."""
+        self._hotkey_engine.table = table
+        if isinstance(self._hotkey_source, NativeHotkeys):
+            self._hotkey_source.update(table)
+
+    def _build_hotkey_table(self) -> HotkeyTable:
+        """Compila i binding del layout; i conflitti sono segnalati subito, vince il primo."""
+        table = HotkeyTable.from_config(self.hotkeys_cfg, self.pages)
+        for msg in table.conflicts:
+            print("⚠️  Hotkey conflict:", msg)
+        return table
+
+    def _dispatch_hotkey(self, action: tuple, origin_ns: int = 0):
+        """Chiamato dal thread del listener: accoda l'azione e, se serve, sveglia il thread GUI."""
+        if self._hotkey_queue.put((action, origin_ns, TRACE.now() if origin_ns else 0)):
+            self.hotkeys_pending.emit()
+
+    _HOTKEY_SIGNALS = {
+        "toggle": "toggle_requested", "tile": "tile_requested", "page": "page_requested",
+        "shortcut": "shortcut_requested", "palette": "palette_requested", "most_used": "most_used_requested",
+    }
+
+    def _drain_hotkeys(self):
+        """Thread GUI: consegna in ordine le azioni accodate dal listener, come segnali.
+
+        Siamo già sul thread GUI: gli slot connessi qui (e da chi usa il deck) sono chiamati subito.
+        """
+        for action, origin_ns, queued_ns in self._hotkey_queue.drain():
+            kind = action[0]
+            if origin_ns and kind in self._trace_pending:
+                self._trace_pending[kind].append((origin_ns, queued_ns))
+            getattr(self, self._HOTKEY_SIGNALS[kind]).emit(*action[1:])
+
+    def _install_hotkey(self, native: bool = True):
+        """Hot-keys globali (default, configurabili nella sezione `hotkeys` del layout):
             ⌘/Ctrl + Shift + D   → mostra/nasconde
-            ⌘/Ctrl + Alt + 1-8   → attiva il tile 1-8
+            Alt + 1-8            → attiva il tile 1-8
+
+        Con un backend nativo l'OS consegna solo queste combo; altrimenti (o se fallisce)
+        il Listener di pynput vede ogni tasto e l'engine filtra.
         """
-        from pynput import keyboard
+        self._hotkey_engine.reset()
+        hotkeys = self._hotkey_input = HotkeyInput(self._hotkey_engine, self._dispatch_hotkey)
+        if self.record_keys is not None:
+            hotkeys.record = []
+        backend = self.hotkeys_cfg.get("backend", self.HOTKEY_BACKEND)
+        listener = None
+        if native and backend != "pynput" and self.record_keys is None:    # registrare richiede ogni tasto
+            listener = self._make_native_hotkeys()
+            if listener is None and backend == "native":
+                print("⚠️  Native hot-keys unavailable here, using pynput")
+        if listener is None:
+            listener = self._make_listener(hotkeys.on_press, hotkeys.on_release)
+            hotkeys.clock = getattr(listener, "clock", None)      # sorgente con tempo proprio (replay)
+        self._hotkey_source = listener
+        self.hotkey_backend = listener.name if isinstance(listener, NativeHotkeys) else "pynput"
+        listener.start()
+        PROFILE.mark("listener started")
 
-        is_mac = sys.platform == "darwin"
-        MOD_CMD = keyboard.Key.cmd   if is_mac else keyboard.Key.ctrl
-        MOD_ALT = keyboard.Key.alt
-        MOD_SFT = keyboard.Key.shift
-
-        combo_toggle = {MOD_CMD, MOD_SFT, keyboard.KeyCode.from_char("d")}
-        # --- combo_tiles: ogni numero ha due varianti (digit e char con Shift) -------
-        symbols = ["!", "@", "#", "$", "%", "^", "&", "*"]  # US / Intl quasi identico
-        combo_tiles = []
-        for n in range(1, 9):
-            digit   = keyboard.KeyCode.from_char(str(n))
-            symbol  = keyboard.KeyCode.from_char(symbols[n-1])
-            combo_tiles.append(({MOD_ALT, digit},  n-1))
-            combo_tiles.append(({MOD_ALT, symbol}, n-1))  # variante shiftata
-
-        pressed: set = set()
-
-        def on_press(key):
-            pressed.add(key)
-            #print("PRESS:", key, "| set =", pressed)
-
-            if combo_toggle.issubset(pressed):
-                #print("→ toggle combo")
-                self.toggle_requested.emit()
-                pressed.clear()
-
-            for combo, idx in combo_tiles:
-                if combo.issubset(pressed):
-                    #print(f"→ tile {idx+1} combo")
-                    self.tile_requested.emit(idx)
-                    pressed.clear()
-
-        def on_release(key):
-            pressed.discard(key)
+        def wait_ready():
+            # listener.wait() non ritorna se il backend fallisce: si osserva anche il suo thread
+            waiter = threading.Thread(target=listener.wait, daemon=True)
+            waiter.start()
+            while waiter.is_alive() and listener.is_alive():
+                waiter.join(0.05)
+            self.listener_ready.emit(not waiter.is_alive() and listener.running)
+
+        threading.Thread(target=wait_ready, name="umpb-listener-wait", daemon=True).start()
+
+    def _make_native_hotkeys(self) -> Optional[NativeHotkeys]:
+        """Backend nativo (XGrabKey su X11, RegisterHotKey su Windows); None → Listener di pynput."""
+        return make_native_hotkeys(self._hotkey_engine, self._dispatch_hotkey)
+
+    def _make_listener(self, on_press: Callable, on_release: Callable):
+        """Sorgente degli eventi tastiera: il Listener globale di pynput.
+
+        Sovrascrivibile per pilotare le callback senza tastiera (es. umpb.ReplaySource).
+        """
+        from pynput import keyboard
 
         listener = keyboard.Listener(on_press=on_press, on_release=on_release)
         listener.daemon = True
-        listener.start()
+        return listener
 
     # -------------------------------------------------------------------
     # Default shortcuts
     # -------------------------------------------------------------------
     def _default_shortcuts(self) -> List[Shortcut]:
-        IS_MAC = sys.platform == "darwin"
-        return [
-            Shortcut(
-                "1", "Photoshop", "/", "editing", "bg-purple-500", "app", path="/Applications/Adobe Photoshop 2025/Adobe Photoshop 2025.app"if sys.platform == "darwin" else "C:\\\\Windows\\\\Adobe Photoshop 2025.exe",),
-            Shortcut(
-                "2", "ArduinoIDE", "/", "programming", "bg-purple-500", "app", path="/Applications/Arduino IDE.app"if sys.platform == "darwin" else "C:\\\\Windows\\\\Arduino.exe",),
-            Shortcut("3", "Discord", "/", "chat", "bg-purple-500", "app", path="/Applications/Discord.app"if sys.platform == "darwin" else "C:\\\\Windows\\\\Discord.exe",),
-            Shortcut("4", "Zenmap", "/", "hacking", "bg-purple-500", "app", path="/Applications/Zenmap.app"if sys.platform == "darwin" else "C:\\\\Windows\\\\Zenmap.exe",),
-            Shortcut("5", "FortiClient", "/", "vpn", "bg-purple-500", "app", path="/Applications/FortiClient.app"if sys.platform == "darwin" else "C:\\\\Windows\\\\FortiClient.exe"),
-            Shortcut("6", "AnyDesk", "/", "remote", "bg-purple-500", "app", path="/Applications/AnyDesk.app"if sys.platform == "darwin" else "C:\\\\Windows\\\\AnyDesk.exe"),
-            Shortcut("7", "Save",   "cmd+s" if IS_MAC else "ctrl+s",  "save", "bg-green-500", "shortcut"),
-            Shortcut("8", "Find",   "cmd+f" if IS_MAC else "ctrl+f",  "find", "bg-green-500", "shortcut"),
-        ]
+        return default_shortcuts()
 
 
 # ---------------------------------------------------------------------------
 # Bootstrap
 # ---------------------------------------------------------------------------
 def main():
-    app = QApplication(sys.argv)
+    args, qt_args = _cli_parser().parse_known_args()
+    commands = _control_commands(args)
+
+    # istanza singola: se un overlay è già in ascolto gli si inoltrano i comandi e si esce subito
+    if not args.new_instance:
+        replies = send_control(VirtualSteamDeck.CONTROL_NAME, commands or ["show"])
+        if replies is not None:
+            sys.exit(_report_replies(replies, commands or ["show"]))
+    else:
+        VirtualSteamDeck.CONTROL_NAME = None
+    if args.trace is not None:
+        TRACE.enabled = True
+
+    app = QApplication([sys.argv[0], *qt_args])
     app.setApplicationName("umpb")
-
-    # ► icona dell’intera app (finestre + dialoghi QMessageBox)
-    app.setWindowIcon(QIcon("icon1024.png"))
-
-    deck = VirtualSteamDeck()
+    PROFILE.mark("QApplication")
+
+    # ► icona dell’intera app (finestre + dialoghi QMessageBox); QIcon carica il file solo quando serve
+    app.setWindowIcon(QIcon(str(Path(__file__).with_name("icon1024.png"))))
+
+    deck = VirtualSteamDeck(
+        fast_start=args.fast_start,
+        profile_startup=args.profile_startup,
+        perf_hud=args.perf_hud,
+        trace_path=Path(args.trace).expanduser() if args.trace else None,
+        record_keys=Path(args.record_keys).expanduser() if args.record_keys else None,
+    )
     deck.show()
+    PROFILE.mark("shown")
+    for line in commands:           # nessuna istanza in esecuzione: i comandi valgono per questa
+        try:
+            cmd, *rest = line.split()
+            reply = deck.control(cmd, rest)
+            if reply is not None:
+                print(reply)
+        except ValueError as e:
+            print("⚠️ ", e)
+        except Exception as e:
+            print(f"⚠️  {line} failed:", repr(e))
     sys.exit(app.exec())
 
 
@@ -0,0 +1,2494 @@
+"""umpb — il nucleo senza Qt dell'overlay: modello dei tile, layout su disco, azioni, hot-key.
+
+deck_overlay.py lo importa per l'interfaccia; script e CI lo usano senza PySide6 né
+display, tramite la CLI:
+
+    python -m umpb list [--json]
+    python -m umpb run 2:3 [--dry-run]        # pagina:tile (da 1, come Alt+1…8) o Shortcut.id
+    python -m umpb export [-o layout.json]
+    python -m umpb import layout.json [--check]
+"""
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import heapq
+import itertools
+import json
+import math
+import os
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter, defaultdict, deque, namedtuple
+from dataclasses import dataclass, field, fields
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, List, Optional
+
+if TYPE_CHECKING:
+    import subprocess                   # a runtime solo pigro: vedi ProcessSupervisor.prewarm
+
+# ---------------------------------------------------------------------------
+# Keystroke plans: combo compilati una volta in press/release, poi solo replay
+# ---------------------------------------------------------------------------
+
+# token testuali (minuscoli) → nome pynput.keyboard.Key
+_KEY_TOKENS = {
+    "ctrl": "ctrl", "control": "ctrl", "shift": "shift", "alt": "alt", "option": "alt",
+    "cmd": "cmd", "meta": "cmd", "super": "cmd", "win": "cmd",
+    "enter": "enter", "return": "enter", "tab": "tab", "backtab": "backtab", "esc": "esc",
+    "escape": "esc", "space": "space", "backspace": "backspace", "del": "delete",
+    "delete": "delete", "ins": "insert", "insert": "insert", "home": "home", "end": "end",
+    "pgup": "page_up", "pageup": "page_up", "page_up": "page_up", "pgdn": "page_down",
+    "pgdown": "page_down", "pagedown": "page_down", "page_down": "page_down",
+    "up": "up", "down": "down", "left": "left", "right": "right",
+    "print": "print_screen", "printscreen": "print_screen", "sysreq": "print_screen",
+    "pause": "pause", "menu": "menu", "capslock": "caps_lock", "caps lock": "caps_lock",
+    "numlock": "num_lock", "num lock": "num_lock", "scrolllock": "scroll_lock",
+    "scroll lock": "scroll_lock", "volume up": "media_volume_up",
+    "volume down": "media_volume_down", "volume mute": "media_volume_mute",
+    "media play": "media_play_pause", "toggle media play/pause": "media_play_pause",
+    "media next": "media_next", "media previous": "media_previous",
+    **{f"f{n}": f"f{n}" for n in range(1, 21)},
+}
+_MODIFIER_NAMES = {"ctrl", "shift", "alt", "cmd"}
+
+# simboli di QKeySequence.NativeText su macOS (⌘ = Command, ⌃ = Control vero)
+_MAC_SYMBOLS = {
+    "⌘": "cmd", "⌃": "ctrl", "⌥": "alt", "⇧": "shift",
+    "⌫": "backspace", "⌦": "delete", "↩": "enter", "⏎": "enter", "⌅": "enter",
+    "⎋": "esc", "⇥": "tab", "⇤": "backtab", "←": "left", "→": "right", "↑": "up", "↓": "down",
+    "⇞": "page_up", "⇟": "page_down", "↖": "home", "↘": "end", "␣": "space",
+}
+
+
+def _parse_chord(chord: str, is_mac: bool) -> tuple[List[str], List[str]]:
+    """Un accordo ('Ctrl+Shift+F5', 'ctrl+s', '⌘⇧S') → (modificatori, tasti) come nomi pynput."""
+    mods: List[str] = []
+    keys: List[str] = []
+
+    # forma macOS: simboli dei modificatori in prefisso, senza '+'
+    while chord and chord[0] in "⌘⌃⌥⇧":
+        mods.append(_MAC_SYMBOLS[chord[0]])
+        chord = chord[1:]
+    if mods and "+" not in chord:
+        tokens, remap_ctrl = [chord], False
+    else:
+        tokens = chord.split("+")
+        if chord.endswith("++"):                  # 'Ctrl++' → tasto '+'
+            tokens = tokens[:-2] + ["+"]
+        remap_ctrl = is_mac                       # 'ctrl' testuale su macOS → ⌘
+
+    for raw in tokens:
+        tok = raw.strip()
+        low = tok.lower()
+        if not tok:
+            if raw:                               # ' ' letterale
+                keys.append(" ")
+                continue
+            raise ValueError(f"empty key in {chord!r}")
+        name = _KEY_TOKENS.get(low) or _MAC_SYMBOLS.get(tok)
+        if name == "backtab":                     # Qt: Backtab è Shift+Tab
+            if "shift" not in mods:
+                mods.append("shift")
+            keys.append("tab")
+        elif name in _MODIFIER_NAMES:
+            mods.append("cmd" if remap_ctrl and name == "ctrl" else name)
+        elif name is not None:
+            keys.append(name)
+        elif len(tok) == 1:
+            keys.append(low)
+        else:
+            raise ValueError(f"unknown key {tok!r}")
+    return mods, keys
+
+
+@lru_cache(maxsize=512)
+def compile_combo(combo: str, is_mac: bool = sys.platform == "darwin") -> tuple[tuple[bool, str], ...]:
+    """'Ctrl+Shift+T' → ((True,'ctrl'), (True,'shift'), (True,'t'), (False,'t'), ...).
+
+    Ogni passo è (press?, token): token di un carattere = tasto carattere, altrimenti
+    nome di pynput.keyboard.Key. Accordi multipli ('Ctrl+K, Ctrl+C') in sequenza.
+    """
+    plan: List[tuple[bool, str]] = []
+    for chord in combo.split(", ") if ", " in combo else [combo]:
+        mods, keys = _parse_chord(chord.strip() or chord, is_mac)
+        plan += [(True, m) for m in mods]
+        for k in keys:
+            plan += [(True, k), (False, k)]
+        plan += [(False, m) for m in reversed(mods)]
+    return tuple(plan)
+
+
+class KeyboardOut:
+    """Un solo pynput Controller condiviso; i token del piano vengono risolti una volta."""
+
+    def __init__(self):
+        self._ctl = None
+        self._keys: dict[str, object] = {}
+
+    def _resolve(self, token: str):
+        k = self._keys.get(token)
+        if k is None:
+            from pynput.keyboard import Key
+            k = self._keys[token] = token if len(token) == 1 else getattr(Key, token)
+        return k
+
+    def _controller(self):
+        if self._ctl is None:
+            from pynput.keyboard import Controller
+            self._ctl = Controller()
+        return self._ctl
+
+    def replay(self, plan: tuple[tuple[bool, str], ...]):
+        """Risolve tutto il piano prima di premere; se un passo fallisce a metà, i tasti
+        ancora premuti (ctrl/shift/alt...) vengono rilasciati."""
+        ctl = self._controller()
+        steps = [(press, self._resolve(token)) for press, token in plan]
+        held: List[object] = []
+        try:
+            for press, key in steps:
+                if press:
+                    ctl.press(key)
+                    held.append(key)
+                else:
+                    ctl.release(key)
+                    if key in held:
+                        held.remove(key)
+        finally:
+            for key in reversed(held):
+                try:
+                    ctl.release(key)
+                except Exception:
+                    pass
+
+    def type_text(self, text: str):
+        self._controller().type(text)
+
+    def prepare(self, plan: tuple[tuple[bool, str], ...]):
+        """Controller e token del piano pronti prima del primo invio (prewarm)."""
+        self._controller()
+        for _, token in plan:
+            self._resolve(token)
+
+
+KEYBOARD = KeyboardOut()
+
+
+def send_plan(plan: tuple) -> bool:
+    """Riproduce un piano già compilato con il Controller condiviso."""
+    try:
+        KEYBOARD.replay(plan)
+        return True
+    except Exception as e:
+        print("Couldn't send keystroke:", e)
+        return False
+
+# ---------------------------------------------------------------------------
+# Action executor: keystroke in ordine su un worker dedicato, launch in parallelo
+# ---------------------------------------------------------------------------
+
+@dataclass
+class ActionStats:
+    """Tempi (s) di attesa in coda ed esecuzione di un'azione."""
+    count: int = 0
+    wait_total: float = 0.0
+    wait_max: float = 0.0
+    exec_total: float = 0.0
+    exec_max: float = 0.0
+    errors: int = 0
+
+    def add(self, wait: float, exec_: float, ok: bool):
+        self.count += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        self.exec_total += exec_
+        self.exec_max = max(self.exec_max, exec_)
+        self.errors += not ok
+
+    def as_dict(self) -> dict:
+        n = self.count or 1
+        return {
+            "count": self.count, "errors": self.errors,
+            "wait_avg_ms": self.wait_total / n * 1e3, "wait_max_ms": self.wait_max * 1e3,
+            "exec_avg_ms": self.exec_total / n * 1e3, "exec_max_ms": self.exec_max * 1e3,
+        }
+
+
+class ActionExecutor:
+    """Esegue le azioni dei tile fuori dal thread GUI.
+
+    * keystroke: un worker, coda limitata, ordine FIFO garantito
+    * launch:    pool di thread, più avvii in parallelo
+    * idle:      lavoro speculativo (prewarm) sullo stesso worker, solo a coda keystroke vuota
+    Back-pressure (hotkey martellate): per ogni azione al massimo `max_same`
+    esecuzioni in coda (le altre vengono accorpate); a coda piena si scarta la
+    più vecchia, così l'ultimo input non aspetta dietro a una raffica. La coda idle
+    ha un limite suo e non occupa mai posti dei keystroke.
+    """
+
+    def __init__(self, max_pending: int = 16, max_same: int = 2, launch_workers: int = 4):
+        self.max_pending = max_pending
+        self.max_same = max_same
+        self._queue: deque = deque()
+        self._queued: dict[str, int] = {}
+        self._idle: deque = deque(maxlen=max_pending)     # piena: esce il job speculativo più vecchio
+        self._cv = threading.Condition()
+        self._launching: set[str] = set()
+        from concurrent.futures import ThreadPoolExecutor     # import pigro: la CLI non lo usa
+        self._launch_pool = ThreadPoolExecutor(max_workers=launch_workers, thread_name_prefix="umpb-launch")
+        self.metrics: dict[str, ActionStats] = {}
+        self.dropped = 0
+        self.coalesced = 0
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="umpb-keys", daemon=True)
+        self._worker.start()
+
+    # ---- submission (thread GUI)
+    def submit_keys(self, name: str, fn: Callable, *args, done: Optional[threading.Event] = None) -> bool:
+        """Accoda un'azione ordinata (keystroke). False se accorpata.
+
+        `done` viene segnalato quando l'azione è eseguita o scartata; chi lo passa attende
+        ogni invio prima del successivo, quindi non viene accorpato.
+        """
+        with self._cv:
+            if self._closed:
+                return False
+            if done is None and self._queued.get(name, 0) >= self.max_same:
+                self.coalesced += 1
+                return False
+            if len(self._queue) >= self.max_pending:
+                old = self._queue.popleft()
+                self._queued[old[0]] -= 1
+                self.dropped += 1
+                if old[4] is not None:
+                    old[4].set()
+            self._queue.append((name, fn, args, time.perf_counter(), done))
+            self._queued[name] = self._queued.get(name, 0) + 1
+            self._cv.notify()
+        return True
+
+    def run_keys(self, name: str, fn: Callable, *args, timeout: float = 30.0) -> bool:
+        """Esegue `fn` sul worker dei keystroke, in coda con i tile, e ne attende la fine.
+
+        Per i thread che inviano tasti fuori dal thread GUI (macro): un invio non si intreccia
+        mai con un altro piano. False se scartata (coda piena, cancel_pending) o chiusa;
+        un'eccezione di `fn` viene rilanciata qui.
+        """
+        done, ran, errors = threading.Event(), [], []
+
+        def call(*a):
+            ran.append(True)
+            try:
+                fn(*a)
+            except Exception as e:
+                errors.append(e)
+                raise
+
+        if not self.submit_keys(name, call, *args, done=done) or not done.wait(timeout):
+            return False
+        if errors:
+            raise errors[0]
+        return bool(ran)
+
+    def submit_idle(self, name: str, fn: Callable, *args) -> bool:
+        """Accoda lavoro a priorità minima sul worker dei keystroke: parte solo quando non ci
+        sono keystroke in coda e non ne scarta mai uno. False se l'executor è chiuso."""
+        with self._cv:
+            if self._closed:
+                return False
+            self._idle.append((name, fn, args, time.perf_counter()))
+            self._cv.notify()
+        return True
+
+    def submit_launch(self, name: str, fn: Callable, *args) -> bool:
+        """Avvia in parallelo; un secondo avvio dello stesso `name` ancora in corso viene accorpato."""
+        with self._cv:
+            if self._closed or name in self._launching:
+                self.coalesced += 1
+                return False
+            self._launching.add(name)
+        self._launch_pool.submit(self._execute, name, fn, args, time.perf_counter(), self._launching)
+        return True
+
+    def cancel_pending(self) -> int:
+        """Scarta i keystroke ancora in coda (es. overlay in edit-mode)."""
+        with self._cv:
+            n = len(self._queue)
+            for item in self._queue:
+                if item[4] is not None:
+                    item[4].set()
+            self._queue.clear()
+            self._queued.clear()
+            self.dropped += n
+        return n
+
+    # ---- workers
+    def _run(self):
+        while True:
+            with self._cv:
+                while not self._queue and not self._idle and not self._closed:
+                    self._cv.wait()
+                if self._queue:
+                    name, fn, args, t_enq, done = self._queue.popleft()
+                    self._queued[name] -= 1
+                elif self._idle and not self._closed:
+                    name, fn, args, t_enq = self._idle.popleft()
+                    done = None
+                else:
+                    return
+            self._execute(name, fn, args, t_enq)
+            if done is not None:
+                done.set()
+
+    def _execute(self, name: str, fn: Callable, args: tuple, t_enq: float, inflight: Optional[set] = None):
+        t0 = time.perf_counter()
+        ok = True
+        try:
+            fn(*args)
+        except Exception as e:
+            ok = False
+            print(f"⚠️  Action {name!r} failed:", e)
+        t1 = time.perf_counter()
+        with self._cv:
+            if inflight is not None:
+                inflight.discard(name)
+            self.metrics.setdefault(name, ActionStats()).add(t0 - t_enq, t1 - t0, ok)
+
+    # ---- reporting / shutdown
+    def stats(self) -> dict:
+        with self._cv:
+            return {
+                "dropped": self.dropped,
+                "coalesced": self.coalesced,
+                "actions": {k: v.as_dict() for k, v in self.metrics.items()},
+            }
+
+    def shutdown(self, timeout: float = 1.0):
+        with self._cv:
+            self._closed = True
+            self._cv.notify_all()
+        self._worker.join(timeout)
+        self._launch_pool.shutdown(wait=False)
+
+
+# ---------------------------------------------------------------------------
+# Macro: passi compilati una volta, eseguiti da uno scheduler con clock monotono
+# ---------------------------------------------------------------------------
+
+_MACRO_STEPS = ("keys", "text", "delay", "launch", "page")
+
+
+def compile_macro(steps: list) -> tuple[tuple[str, object], ...]:
+    """[{"launch": "…"}, {"delay": 800}, {"keys": "ctrl+n"}, {"text": "ciao"}, {"page": 2}] → piano.
+
+    keys → piano di compile_combo, delay in ms → secondi, page da 1 → indice.
+    ValueError (con il numero del passo) se un passo non è valido.
+    """
+    if not isinstance(steps, list) or not steps:
+        raise ValueError("a macro needs a non-empty list of steps")
+    plan: List[tuple[str, object]] = []
+    for n, step in enumerate(steps, 1):
+        if not isinstance(step, dict) or len(step) != 1:
+            raise ValueError(f"step {n}: expected one of {{{', '.join(_MACRO_STEPS)}: …}}")
+        (kind, arg), = step.items()
+        number = isinstance(arg, (int, float)) and not isinstance(arg, bool)    # JSON true/false sono int
+        try:
+            if kind == "keys":
+                plan.append((kind, compile_combo(str(arg))))
+            elif kind in ("text", "launch") and isinstance(arg, str) and arg:
+                plan.append((kind, arg))
+            elif kind == "delay" and number and math.isfinite(arg) and arg >= 0:
+                if plan and plan[-1][0] == "delay":       # ritardi consecutivi: uno solo
+                    plan[-1] = ("delay", plan[-1][1] + arg / 1000)
+                else:
+                    plan.append((kind, arg / 1000))
+            elif kind == "page" and number and isinstance(arg, int) and arg >= 1:
+                plan.append((kind, arg - 1))
+            else:
+                raise ValueError(f"invalid {kind!r} value {arg!r}" if kind in _MACRO_STEPS
+                                 else f"unknown step {kind!r}")
+        except ValueError as e:
+            raise ValueError(f"step {n}: {e}") from None
+    return tuple(plan)
+
+
+class MacroRunner:
+    """Esegue le macro su un thread dedicato: mai sul thread GUI.
+
+    Un heap di (scadenza, …) ordinato su time.monotonic(); il passo dopo un ritardo è
+    programmato rispetto all'istante *previsto* del passo precedente, così i ritardi non
+    accumulano deriva. Una macro già in esecuzione non riparte (trigger accorpato);
+    `cancel` la interrompe prima del passo successivo.
+    """
+
+    def __init__(self, handlers: dict[str, Callable[[object], None]]):
+        self.handlers = handlers            # "keys" / "text" / "launch" / "page" → fn(arg)
+        self.counters = Counter()           # started / completed / cancelled / coalesced / failed
+        self.late_max = 0.0                 # ritardo massimo di un passo rispetto alla scadenza (s)
+        self._late_total = 0.0
+        self._timed = 0
+        self._heap: list = []
+        self._running: dict[str, int] = {}  # nome macro → id dell'esecuzione corrente
+        self._ids = itertools.count(1)
+        self._closed = False
+        self._cv = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="umpb-macro", daemon=True)
+        self._thread.start()
+
+    def run(self, name: str, plan: tuple) -> bool:
+        with self._cv:
+            if self._closed or name in self._running:
+                self.counters["coalesced"] += 1
+                return False
+            rid = self._running[name] = next(self._ids)
+            heapq.heappush(self._heap, (time.monotonic(), rid, name, plan, 0))
+            self.counters["started"] += 1
+            self._cv.notify_all()
+        return True
+
+    def cancel(self, name: Optional[str] = None) -> int:
+        """Interrompe la macro `name` (o tutte); restituisce quante ne ha fermate."""
+        with self._cv:
+            names = list(self._running) if name is None else [name] if name in self._running else []
+            for n in names:
+                del self._running[n]
+            self.counters["cancelled"] += len(names)
+            self._cv.notify_all()
+        return len(names)
+
+    def running(self) -> List[str]:
+        with self._cv:
+            return list(self._running)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Attende che non ci siano macro in corso (per chi non ha un event loop, es. la CLI)."""
+        with self._cv:
+            return self._cv.wait_for(lambda: not self._running, timeout)
+
+    def _run(self):
+        while True:
+            with self._cv:
+                while True:
+                    if self._closed:
+                        return
+                    if not self._heap:
+                        self._cv.wait()
+                        continue
+                    wait = self._heap[0][0] - time.monotonic()
+                    if wait > 0:
+                        self._cv.wait(wait)
+                        continue
+                    due, rid, name, plan, i = heapq.heappop(self._heap)
+                    if self._running.get(name) == rid:
+                        break                       # altrimenti: cancellata, si scarta
+            if i:
+                late = time.monotonic() - due
+                self._late_total += late
+                self._timed += 1
+                self.late_max = max(self.late_max, late)
+            self._steps(due, rid, name, plan, i)
+
+    def _steps(self, due: float, rid: int, name: str, plan: tuple, i: int):
+        """Esegue i passi da `i` fino al prossimo ritardo (riprogrammato) o alla fine."""
+        while i < len(plan):
+            if self._running.get(name) != rid:
+                return                              # cancellata tra un passo e l'altro
+            kind, arg = plan[i]
+            i += 1
+            if kind == "delay":
+                with self._cv:
+                    if self._running.get(name) == rid:
+                        heapq.heappush(self._heap, (due + arg, rid, name, plan, i))
+                return
+            try:
+                self.handlers[kind](arg)
+            except Exception as e:
+                with self._cv:
+                    if self._running.get(name) != rid:
+                        return                      # cancellata mentre il passo girava: già contata
+                    del self._running[name]
+                    self.counters["failed"] += 1
+                    self._cv.notify_all()
+                print(f"⚠️  Macro {name!r} stopped at step {i}:", e)
+                return
+        with self._cv:
+            if self._running.get(name) == rid:
+                del self._running[name]
+                self.counters["completed"] += 1
+                self._cv.notify_all()
+
+    def stats(self) -> dict:
+        with self._cv:
+            return {
+                **self.counters, "running": len(self._running),
+                "late_avg_ms": self._late_total / max(1, self._timed) * 1e3,
+                "late_max_ms": self.late_max * 1e3,
+            }
+
+    def shutdown(self):
+        with self._cv:
+            self._closed = True
+            self._running.clear()
+            self._cv.notify_all()
+
+
+@dataclass
+class Shortcut:
+    id: str
+    name: str
+    key: str
+    action: str
+    color: str  # e.g. "bg-blue-500" (mapped later)
+    type: str   # "shortcut" | "app" | "macro"
+    path: Optional[str] = None
+    hotkey: Optional[str] = None   # binding globale del singolo tile (es. "ctrl+alt+p")
+    glyph: Optional[str] = None    # glyph custom al posto di quello dell'azione (es. "🎬")
+    steps: Optional[list] = None   # passi di una macro (type "macro"), vedi compile_macro
+    plan: tuple = field(default=(), init=False, repr=False, compare=False)   # compile_combo / compile_macro
+
+    def __post_init__(self):
+        self.compile()
+
+    def compile(self):
+        """Precompila la combo (tile "shortcut") o i passi (tile "macro") in un piano eseguibile."""
+        self.plan = ()
+        try:
+            if self.type == "shortcut" and self.key:
+                self.plan = compile_combo(self.key)
+            elif self.type == "macro":
+                self.plan = compile_macro(self.steps)
+        except ValueError as e:
+            print(f"⚠️  Shortcut {self.name!r}: {e}")
+
+    def to_dict(self) -> dict:
+        """Solo i campi persistiti (niente stato compilato)."""
+        return {f.name: getattr(self, f.name) for f in fields(self) if f.init}
+
+
+def default_shortcuts() -> List[Shortcut]:
+    """Pagina iniziale quando non esiste ancora un layout."""
+    IS_MAC = sys.platform == "darwin"
+    return [
+        Shortcut(
+            "1", "Photoshop", "/", "editing", "bg-purple-500", "app", path="/Applications/Adobe Photoshop 2025/Adobe Photoshop 2025.app"if sys.platform == "darwin" else "C:\\\\Windows\\\\Adobe Photoshop 2025.exe",),
+        Shortcut(
+            "2", "ArduinoIDE", "/", "programming", "bg-purple-500", "app", path="/Applications/Arduino IDE.app"if sys.platform == "darwin" else "C:\\\\Windows\\\\Arduino.exe",),
+        Shortcut("3", "Discord", "/", "chat", "bg-purple-500", "app", path="/Applications/Discord.app"if sys.platform == "darwin" else "C:\\\\Windows\\\\Discord.exe",),
+        Shortcut("4", "Zenmap", "/", "hacking", "bg-purple-500", "app", path="/Applications/Zenmap.app"if sys.platform == "darwin" else "C:\\\\Windows\\\\Zenmap.exe",),
+        Shortcut("5", "FortiClient", "/", "vpn", "bg-purple-500", "app", path="/Applications/FortiClient.app"if sys.platform == "darwin" else "C:\\\\Windows\\\\FortiClient.exe"),
+        Shortcut("6", "AnyDesk", "/", "remote", "bg-purple-500", "app", path="/Applications/AnyDesk.app"if sys.platform == "darwin" else "C:\\\\Windows\\\\AnyDesk.exe"),
+        Shortcut("7", "Save",   "cmd+s" if IS_MAC else "ctrl+s",  "save", "bg-green-500", "shortcut"),
+        Shortcut("8", "Find",   "cmd+f" if IS_MAC else "ctrl+f",  "find", "bg-green-500", "shortcut"),
+    ]
+
+# ---------------------------------------------------------------------------
+# Hotkey engine: stato premuto → (maschera modificatori, tasto) → lookup O(1)
+# ---------------------------------------------------------------------------
+
+MOD_CTRL, MOD_SHIFT, MOD_ALT, MOD_CMD = 1, 2, 4, 8
+
+_MOD_TOKENS = {
+    "ctrl": MOD_CTRL, "control": MOD_CTRL, "shift": MOD_SHIFT,
+    "alt": MOD_ALT, "option": MOD_ALT, "cmd": MOD_CMD, "meta": MOD_CMD,
+    "super": MOD_CMD, "win": MOD_CMD,
+}
+
+# nomi dei tasti modificatori come li riporta pynput (Key.<name>)
+_MOD_KEYS = {
+    "ctrl": MOD_CTRL, "ctrl_l": MOD_CTRL, "ctrl_r": MOD_CTRL,
+    "shift": MOD_SHIFT, "shift_l": MOD_SHIFT, "shift_r": MOD_SHIFT,
+    "alt": MOD_ALT, "alt_l": MOD_ALT, "alt_r": MOD_ALT, "alt_gr": MOD_ALT,
+    "cmd": MOD_CMD, "cmd_l": MOD_CMD, "cmd_r": MOD_CMD,
+}
+
+# varianti shiftate delle cifre (layout US): Alt+Shift+1 arriva come "!"
+US_SHIFTED_DIGITS = {"!": "1", "@": "2", "#": "3", "$": "4", "%": "5", "^": "6", "&": "7", "*": "8", "(": "9", ")": "0"}
+
+
+def key_name(key) -> Optional[str]:
+    """Nome canonico di un tasto pynput: char minuscolo per i KeyCode, nome enum per i Key."""
+    char = getattr(key, "char", None)
+    if char:
+        if len(char) == 1 and ord(char) < 32:       # Ctrl+lettera → carattere di controllo
+            return chr(ord(char) + 96)
+        return char.lower()
+    vk = getattr(key, "vk", None)
+    if vk is not None and (0x30 <= vk <= 0x39 or 0x41 <= vk <= 0x5A):   # VK_0-9 / VK_A-Z
+        return chr(vk).lower()
+    name = getattr(key, "name", None)
+    return name.lower() if name else None
+
+
+def parse_binding(text: str, is_mac: bool = sys.platform == "darwin") -> tuple[int, str]:
+    """'ctrl+shift+d' → (MOD_CTRL|MOD_SHIFT, 'd'). Su macOS 'ctrl' vale ⌘, come in _send_keystroke."""
+    mask, key = 0, None
+    for part in (p.strip().lower() for p in text.split("+")):
+        if not part:
+            raise ValueError(f"empty key in binding {text!r}")
+        if is_mac and part == "ctrl":
+            part = "cmd"
+        flag = _MOD_TOKENS.get(part)
+        if flag is not None:
+            mask |= flag
+        elif key is None:
+            key = part
+        else:
+            raise ValueError(f"binding {text!r} has more than one non-modifier key")
+    if key is None:
+        raise ValueError(f"binding {text!r} has no key")
+    return mask, key
+
+
+@dataclass(frozen=True)
+class HotkeyPolicy:
+    """Limiti di un binding: `repeat` lascia passare l'auto-repeat dell'OS,
+    `interval_ms` è la distanza minima tra due attivazioni dello stesso binding."""
+    repeat: bool = False
+    interval_ms: int = 0
+
+    @classmethod
+    def from_dict(cls, d: dict, base: "HotkeyPolicy" = None) -> "HotkeyPolicy":
+        base = base or cls()
+        return cls(bool(d.get("repeat", base.repeat)), max(0, int(d.get("interval_ms", base.interval_ms))))
+
+
+class HotkeyTable:
+    """Tabella precompilata (mask, tasto) → azione; i conflitti vengono raccolti al caricamento.
+
+    Le azioni sono tuple: ("toggle",), ("tile", idx), ("page", idx), ("shortcut", id), ("palette",), ("most_used",).
+    Ogni binding ha una HotkeyPolicy (default: solo fronte di discesa, nessun limite di frequenza).
+    """
+
+    def __init__(self, aliases: Optional[dict] = None, is_mac: bool = sys.platform == "darwin"):
+        self.aliases = dict(US_SHIFTED_DIGITS if aliases is None else aliases)
+        self.is_mac = is_mac
+        self._table: dict[tuple[int, str], tuple] = {}
+        self._names: dict[tuple[int, str], str] = {}
+        self._policies: dict[tuple[int, str], HotkeyPolicy] = {}
+        self.default_policy = HotkeyPolicy()
+        self.keys: set[str] = set()         # tasti (non modificatori) che compaiono in un binding
+        self.conflicts: List[str] = []
+
+    def bind(self, binding: str, action: tuple) -> bool:
+        try:
+            mask, key = parse_binding(binding, self.is_mac)
+        except ValueError as e:
+            self.conflicts.append(str(e))
+            return False
+        key = self.aliases.get(key, key)
+        prev = self._table.get((mask, key))
+        if prev is not None and prev != action:
+            self.conflicts.append(
+                f"{binding!r} is bound to {prev} (as {self._names[(mask, key)]!r}); ignoring {action}"
+            )
+            return False
+        self._table[(mask, key)] = action
+        self._names[(mask, key)] = binding
+        self.keys.add(key)
+        self.keys.update(sym for sym, k in self.aliases.items() if k == key)
+        return True
+
+    def set_policy(self, binding: str, policy: HotkeyPolicy) -> bool:
+        try:
+            mask, key = parse_binding(binding, self.is_mac)
+        except ValueError as e:
+            self.conflicts.append(str(e))
+            return False
+        self._policies[(mask, self.aliases.get(key, key))] = policy
+        return True
+
+    def resolve(self, mask: int, key: str) -> Optional[tuple[tuple[int, str], tuple]]:
+        """(slot, azione) per il tasto premuto; lo slot identifica il binding (per i limiti)."""
+        alias = self.aliases.get(key)
+        if alias is not None:
+            key, mask = alias, mask & ~MOD_SHIFT    # il simbolo implica già Shift
+        action = self._table.get((mask, key))
+        return None if action is None else ((mask, key), action)
+
+    def lookup(self, mask: int, key: str) -> Optional[tuple]:
+        hit = self.resolve(mask, key)
+        return None if hit is None else hit[1]
+
+    def policy(self, slot: tuple[int, str]) -> HotkeyPolicy:
+        return self._policies.get(slot, self.default_policy)
+
+    def bindings(self) -> dict[str, tuple]:
+        return {self._names[k]: a for k, a in self._table.items()}
+
+    def combos(self) -> List[tuple[int, str, str]]:
+        """[(mask, tasto, binding)]: ciò che un backend nativo deve registrare presso l'OS."""
+        return [(mask, key, self._names[(mask, key)]) for mask, key in self._table]
+
+    def shifted(self, mask: int, key: str) -> Optional[str]:
+        """Simbolo con cui (mask, key) arriva se si tiene anche Shift ("1" → "!"), se la combo
+        con Shift non ha un binding suo; None altrimenti."""
+        if mask & MOD_SHIFT or (mask | MOD_SHIFT, key) in self._table:
+            return None
+        return next((sym for sym, k in self.aliases.items() if k == key), None)
+
+    @classmethod
+    def from_config(cls, cfg: dict, pages: List[List[Shortcut]], **kw) -> "HotkeyTable":
+        """Compila la sezione `hotkeys` del layout + i binding per-tile (`Shortcut.hotkey`)."""
+        table = cls(aliases=cfg.get("aliases"), **kw)
+        table.bind(cfg["toggle"], ("toggle",))
+        for i, b in enumerate(cfg.get("tiles", [])):
+            if b:
+                table.bind(b, ("tile", i))
+        for i, b in enumerate(cfg.get("pages", [])):
+            if b:
+                table.bind(b, ("page", i))
+        if cfg.get("palette"):
+            table.bind(cfg["palette"], ("palette",))
+        if cfg.get("most_used"):
+            table.bind(cfg["most_used"], ("most_used",))
+        for page in pages:
+            for sc in page:
+                if sc.hotkey:
+                    table.bind(sc.hotkey, ("shortcut", sc.id))
+        limits = dict(cfg.get("limits", {}))
+        table.default_policy = HotkeyPolicy.from_dict(limits.pop("default", {}))
+        for binding, lim in limits.items():
+            table.set_policy(binding, HotkeyPolicy.from_dict(lim, table.default_policy))
+        return table
+
+
+class HotkeyEngine:
+    """Macchina a stati del listener: modificatori tenuti + tasti giù → (mask, tasto) → azione.
+
+    L'attivazione avviene solo sul fronte di discesa: l'auto-repeat dell'OS (press
+    ripetuti senza release) viene scartato, o limitato, secondo la policy del binding.
+    Tutto lo stato è protetto da un lock: il listener chiama press/release dal suo thread,
+    il thread GUI sostituisce la tabella.
+    """
+
+    STALE_REPEAT = 0.5      # s: un "repeat" dopo questa pausa è un press nuovo (release perso)
+
+    def __init__(self, table: HotkeyTable):
+        self._lock = threading.Lock()
+        self._table = table
+        self._held: dict[str, int] = {}     # modificatori premuti (lato sx/dx separati)
+        self._mask = 0
+        self._down: dict[str, float] = {}   # tasti non-modificatori giù → ultimo evento
+        self._last_fire: dict[tuple[int, str], float] = {}
+        self.counters = Counter()           # fired / repeat_suppressed / rate_limited
+
+    @property
+    def table(self) -> HotkeyTable:
+        return self._table
+
+    @table.setter
+    def table(self, table: HotkeyTable):
+        with self._lock:
+            self._table = table
+            self._last_fire.clear()
+
+    def press(self, key, now: Optional[float] = None) -> Optional[tuple]:
+        name = key_name(key)
+        if name is None:
+            return None
+        flag = _MOD_KEYS.get(name)
+        if flag is None and name not in self._table.keys:
+            return None                     # fast path: tasto che non compare in nessun binding
+        with self._lock:
+            if flag is not None:
+                self._held[name] = flag
+                self._mask |= flag
+                return None
+            return self._fire(self._mask, name, time.monotonic() if now is None else now)
+
+    def press_combo(self, mask: int, name: str, now: Optional[float] = None) -> Optional[tuple]:
+        """Press con i modificatori già noti: i backend nativi ricevono dall'OS la combo intera."""
+        with self._lock:
+            return self._fire(mask, name, time.monotonic() if now is None else now)
+
+    def _fire(self, mask: int, name: str, now: float) -> Optional[tuple]:
+        """(con il lock) Tasto giù con i modificatori `mask`: azione, oppure None se scartato."""
+        down = self._table.aliases.get(name, name)      # "!" giù e "1" su: stesso tasto fisico
+        prev = self._down.get(down)
+        self._down[down] = now
+        hit = self._table.resolve(mask, name)
+        if hit is None:
+            return None
+        slot, action = hit
+        policy = self._table.policy(slot)
+        if prev is not None and now - prev < self.STALE_REPEAT and not policy.repeat:
+            self.counters["repeat_suppressed"] += 1
+            return None
+        last = self._last_fire.get(slot)
+        if last is not None and (now - last) * 1000 < policy.interval_ms:
+            self.counters["rate_limited"] += 1
+            return None
+        self._last_fire[slot] = now
+        self.counters["fired"] += 1
+        return action
+
+    def release(self, key):
+        name = key_name(key)
+        if name not in _MOD_KEYS and name not in self._table.keys:
+            return
+        with self._lock:
+            if self._down.pop(self._table.aliases.get(name, name), None) is not None:
+                return
+            if self._held.pop(name, None) is not None:
+                mask = 0
+                for flag in self._held.values():
+                    mask |= flag
+                self._mask = mask
+
+    def release_key(self, name: str):
+        """Release di un tasto non modificatore (backend nativi: i modificatori non arrivano)."""
+        with self._lock:
+            self._down.pop(self._table.aliases.get(name, name), None)
+
+    def reset(self):
+        """Dimentica i tasti premuti (es. listener riavviato: i release persi non arriveranno)."""
+        with self._lock:
+            self._held.clear()
+            self._down.clear()
+            self._mask = 0
+
+
+class EventQueue:
+    """Coda limitata listener → GUI, protetta da lock.
+
+    `put` restituisce True solo se la coda era vuota: basta un segnale di risveglio
+    per ogni raffica, il thread GUI svuota tutto con `drain`.
+    """
+
+    def __init__(self, maxlen: int = 64):
+        self.maxlen = maxlen
+        self.dropped = 0
+        self._items: deque = deque()
+        self._lock = threading.Lock()
+
+    def put(self, item) -> bool:
+        with self._lock:
+            if len(self._items) >= self.maxlen:
+                self.dropped += 1
+                return False
+            self._items.append(item)
+            return len(self._items) == 1
+
+    def drain(self) -> list:
+        with self._lock:
+            items = list(self._items)
+            self._items.clear()
+            return items
+
+
+# ---------------------------------------------------------------------------
+# Input hot-key: callback del listener e sorgenti di eventi iniettabili
+# ---------------------------------------------------------------------------
+
+class HotkeyInput:
+    """Callback del listener globale: tasto → HotkeyEngine → `dispatch(action, origin_ns)`.
+
+    Non dipende dalla sorgente degli eventi: il Listener di pynput in produzione, una
+    ReplaySource nell'harness. Se la sorgente ha un `clock()`, il suo tempo sostituisce
+    time.monotonic() per repeat e limiti di frequenza. Con `record` (lista) ogni evento
+    viene registrato; i tasti che non compaiono in nessun binding diventano "·".
+    """
+
+    PLACEHOLDER = "·"
+
+    def __init__(self, engine: HotkeyEngine, dispatch: Callable[[tuple, int], None]):
+        self.engine = engine
+        self.dispatch = dispatch
+        self.clock: Optional[Callable[[], float]] = None
+        self.record: Optional[list] = None      # [(t, press, nome)] per save_key_stream
+
+    def on_press(self, key):
+        t0 = TRACE.now() if TRACE.enabled else 0
+        now = self.clock() if self.clock is not None else None
+        if self.record is not None:
+            self._record(key, True, now)
+        action = self.engine.press(key, now)
+        if action is not None:
+            self.dispatch(action, t0)
+        if t0:
+            TRACE.record("hotkey.on_press", t0)
+
+    def on_release(self, key):
+        if self.record is not None:
+            self._record(key, False, None)
+        self.engine.release(key)
+
+    def _record(self, key, press: bool, now: Optional[float]):
+        name = key_name(key)
+        if name is None:
+            return
+        if name not in _MOD_KEYS and name not in self.engine.table.keys:
+            name = self.PLACEHOLDER            # niente testo digitato su disco
+        self.record.append((time.monotonic() if now is None else now, press, name))
+
+
+# tasto sintetico con la stessa forma dei Key/KeyCode di pynput (vedi key_name)
+ReplayKey = namedtuple("ReplayKey", "char name vk")
+
+
+def replay_key(name: str) -> ReplayKey:
+    """"a", "!" → come un KeyCode (char); "alt", "shift_r", "f5" → come un Key (name)."""
+    return ReplayKey(name, None, None) if len(name) == 1 else ReplayKey(None, name, None)
+
+
+def save_key_stream(path: Path, events: List[tuple], expected: Optional[List[tuple]] = None):
+    """Flusso [(t, press, nome)] in JSON lines: {"t", "down"|"up"}, più le azioni attese ({"expect"})."""
+    t0 = events[0][0] if events else 0.0
+    with Path(path).open("w", encoding="utf-8") as f:
+        for t, press, name in events:
+            f.write(json.dumps({"t": round(t - t0, 6), "down" if press else "up": name}, ensure_ascii=False) + "\n")
+        for action in expected or ():
+            f.write(json.dumps({"expect": list(action)}) + "\n")
+
+
+def load_key_stream(path: Path) -> tuple[List[tuple], Optional[List[tuple]]]:
+    """(eventi [(t, press, nome)], azioni attese o None se il file non ne indica)."""
+    events, expected = [], None
+    with Path(path).open("r", encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            rec = json.loads(line)
+            if "expect" in rec:
+                expected = (expected or []) + [tuple(rec["expect"])]
+            elif "down" in rec or "up" in rec:
+                events.append((float(rec["t"]), "down" in rec, rec.get("down", rec.get("up"))))
+            else:
+                raise ValueError(f"{path}:{n}: expected 'down', 'up' or 'expect'")
+    return events, expected
+
+
+class ReplaySource:
+    """Sorgente di eventi con l'interfaccia di pynput.keyboard.Listener (start/stop/wait/
+    is_alive/running) che rigioca un flusso [(t, press, nome)] dal proprio thread.
+
+    `speed` scala i tempi del flusso (2.0 = doppia velocità, 0 = più veloce possibile).
+    `clock()` restituisce il tempo *del flusso* dell'evento in corso: il motore vede gli
+    stessi intervalli a qualunque velocità di replay. `costs_ns` è la durata di ogni callback.
+    """
+
+    def __init__(self, events: List[tuple], on_press: Callable, on_release: Callable, speed: float = 1.0):
+        self.events = [(t, press, replay_key(name)) for t, press, name in events]
+        self.on_press = on_press
+        self.on_release = on_release
+        self.speed = speed
+        self.costs_ns: List[int] = []
+        self.elapsed = 0.0                  # s di replay effettivo
+        self.running = False
+        self._base = time.monotonic()
+        self._t = 0.0
+        self._stop = threading.Event()
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="umpb-replay", daemon=True)
+
+    def clock(self) -> float:
+        return self._base + self._t
+
+    def start(self):
+        self.running = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def wait(self):
+        self._started.wait()
+
+    def is_alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def join(self, timeout: Optional[float] = None):
+        self._thread.join(timeout)
+
+    def _run(self):
+        self._started.set()
+        callbacks = (self.on_release, self.on_press)
+        costs, clock = self.costs_ns, time.perf_counter_ns
+        start = time.perf_counter()
+        for t, press, key in self.events:
+            if self.speed > 0:
+                delay = start + t / self.speed - time.perf_counter()
+                if delay > 0 and self._stop.wait(delay):
+                    break
+            elif self._stop.is_set():
+                break
+            self._t = t
+            t0 = clock()
+            callbacks[press](key)
+            costs.append(clock() - t0)
+        self.elapsed = time.perf_counter() - start
+        self.running = False
+
+
+# ---------------------------------------------------------------------------
+# Hot-key native: l'OS consegna solo le combo registrate (niente snooping della tastiera)
+# ---------------------------------------------------------------------------
+
+class NativeHotkeys(ABC):
+    """Base dei backend nativi, con l'interfaccia del Listener di pynput (start/stop/wait/
+    is_alive/running). Registra presso l'OS le sole combo della HotkeyTable; ogni combo
+    ricevuta passa da `HotkeyEngine.press_combo` (repeat e limiti come con pynput) e poi
+    da `dispatch(action, origin_ns)`: nel deck è `_dispatch_hotkey`, la stessa coda del
+    Listener, svuotata sul thread GUI come segnali (toggle_requested, tile_requested, …).
+    `update(table)` ri-registra dopo una modifica del layout.
+    """
+
+    name = "native"
+
+    def __init__(self, engine: HotkeyEngine, dispatch: Callable[[tuple, int], None]):
+        self.engine = engine
+        self.dispatch = dispatch
+        self.running = False
+        self.problems: List[str] = []       # combo non registrate (tasto assente, già prese da altri)
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._serve, name=f"umpb-hotkeys-{self.name}", daemon=True)
+
+    def start(self):
+        self.running = True
+        self._thread.start()
+
+    def wait(self):
+        self._ready.wait()
+
+    def is_alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def join(self, timeout: Optional[float] = None):
+        self._thread.join(timeout)
+
+    def stop(self):
+        self.running = False
+
+    @abstractmethod
+    def update(self, table: HotkeyTable):
+        """Ri-registra le combo di `table` (chiamato dal thread GUI)."""
+
+    def _serve(self):
+        try:
+            self._run()
+        except Exception as e:
+            print(f"⚠️  Native hot-keys ({self.name}) stopped:", e)
+        finally:
+            self.running = False
+
+    @abstractmethod
+    def _run(self):
+        """Thread del backend: registra (poi `_registered`) e consegna le combo finché `running`."""
+
+    def _registered(self, problems: List[str]):
+        """Dal thread del backend, dopo ogni (ri)registrazione."""
+        self.problems = problems
+        for msg in problems:
+            print("⚠️  Hotkey not registered:", msg)
+        self._ready.set()
+
+    def _press(self, mask: int, name: str):
+        t0 = TRACE.now() if TRACE.enabled else 0
+        action = self.engine.press_combo(mask, name)
+        if action is not None:
+            self.dispatch(action, t0)
+        if t0:
+            TRACE.record("hotkey.on_press", t0)
+
+
+# ---- X11: XGrabKey sulla root window (python-xlib, connessione e thread propri)
+
+X11_CONTROL, X11_SHIFT, X11_LOCK, X11_MOD1, X11_MOD2, X11_MOD4 = 4, 1, 2, 8, 16, 64
+_X11_MODS = ((MOD_CTRL, X11_CONTROL), (MOD_SHIFT, X11_SHIFT), (MOD_ALT, X11_MOD1), (MOD_CMD, X11_MOD4))
+_X11_LOCKS = (0, X11_LOCK, X11_MOD2, X11_LOCK | X11_MOD2)      # CapsLock / NumLock fanno parte della combo per X
+
+# nomi dei tasti (come key_name) → keysym X11
+_X11_KEYSYMS = {
+    "backspace": "BackSpace", "caps_lock": "Caps_Lock", "delete": "Delete", "down": "Down", "end": "End",
+    "enter": "Return", "esc": "Escape", "home": "Home", "left": "Left", "page_down": "Next",
+    "page_up": "Prior", "right": "Right", "space": "space", "tab": "Tab", "up": "Up", "insert": "Insert",
+    "menu": "Menu", "num_lock": "Num_Lock", "pause": "Pause", "print_screen": "Print",
+    "scroll_lock": "Scroll_Lock", "media_play_pause": "XF86AudioPlay", "media_volume_mute": "XF86AudioMute",
+    "media_volume_down": "XF86AudioLowerVolume", "media_volume_up": "XF86AudioRaiseVolume",
+    "media_previous": "XF86AudioPrev", "media_next": "XF86AudioNext",
+    # modificatori: servono solo per iniettare eventi (XTest) nei test
+    "ctrl": "Control_L", "ctrl_l": "Control_L", "ctrl_r": "Control_R", "shift": "Shift_L",
+    "shift_l": "Shift_L", "shift_r": "Shift_R", "alt": "Alt_L", "alt_l": "Alt_L", "alt_r": "Alt_R",
+    "alt_gr": "ISO_Level3_Shift", "cmd": "Super_L", "cmd_l": "Super_L", "cmd_r": "Super_R",
+}
+
+
+def x11_keysym(name: str) -> int:
+    """Keysym del tasto `name` (0 se sconosciuto): Latin-1 e Unicode per i caratteri, per nome gli altri."""
+    from Xlib import XK
+
+    if len(name) == 1:
+        cp = ord(name)
+        return cp if 0x20 <= cp <= 0xFF else 0x01000000 | cp
+    sym = name.upper() if name[0] == "f" and name[1:].isdigit() else _X11_KEYSYMS.get(name)
+    if sym is None:
+        return 0
+    if sym.startswith("XF86"):
+        XK.load_keysym_group("xf86")
+        sym = "XF86_" + sym[4:]             # python-xlib: XK_XF86_AudioNext
+    return XK.string_to_keysym(sym)
+
+
+def x11_grabs(table: HotkeyTable, keycode: Callable[[int], int]) -> tuple[dict, List[str]]:
+    """{(keycode, stato X senza lock): (mask, nome per l'engine)} da registrare, e i problemi.
+
+    Le cifre legate senza Shift si registrano anche con Shift (Alt+Shift+1 arriva come "!"),
+    come fa il percorso pynput tramite gli alias.
+    """
+    grabs, problems = {}, []
+    for mask, key, binding in table.combos():
+        kc = keycode(x11_keysym(key))
+        if not kc:
+            problems.append(f"{binding!r}: no key {key!r} on this keyboard")
+            continue
+        state = sum(x for m, x in _X11_MODS if mask & m)
+        grabs[(kc, state)] = (mask, key)
+        sym = table.shifted(mask, key)
+        if sym is not None:
+            grabs.setdefault((kc, state | X11_SHIFT), (mask | MOD_SHIFT, sym))
+    return grabs, problems
+
+
+def x11_detectable_autorepeat(d) -> bool:
+    """XkbSetDetectableAutoRepeat(True) sulla connessione python-xlib `d` (che non ha un modulo XKB).
+
+    Con il flag l'auto-repeat arriva come press ripetuti senza i release sintetici; senza,
+    ogni ripetizione è una coppia release/press. False se il server non lo supporta.
+    """
+    from Xlib.protocol import rq
+
+    class UseExtension(rq.ReplyRequest):            # xkbReqType 0
+        _request = rq.Struct(rq.Card8("opcode"), rq.Opcode(0), rq.RequestLength(),
+                             rq.Card16("wanted_major"), rq.Card16("wanted_minor"))
+        _reply = rq.Struct(rq.ReplyCode(), rq.Bool("supported"), rq.Card16("sequence_number"),
+                           rq.ReplyLength(), rq.Card16("server_major"), rq.Card16("server_minor"), rq.Pad(20))
+
+    class PerClientFlags(rq.ReplyRequest):          # xkbReqType 21
+        _request = rq.Struct(rq.Card8("opcode"), rq.Opcode(21), rq.RequestLength(),
+                             rq.Card16("device_spec"), rq.Pad(2), rq.Card32("change"), rq.Card32("value"),
+                             rq.Card32("ctrls_to_change"), rq.Card32("auto_ctrls"), rq.Card32("auto_ctrl_values"))
+        _reply = rq.Struct(rq.ReplyCode(), rq.Card8("device_id"), rq.Card16("sequence_number"),
+                           rq.ReplyLength(), rq.Card32("supported"), rq.Card32("value"),
+                           rq.Card32("auto_ctrls"), rq.Card32("auto_ctrl_values"), rq.Pad(8))
+
+    ext = d.query_extension("XKEYBOARD")
+    if ext is None or not ext.present:
+        return False
+    if not UseExtension(display=d.display, opcode=ext.major_opcode, wanted_major=1, wanted_minor=0).supported:
+        return False
+    detectable = 1                                  # XkbPCF_DetectableAutoRepeatMask
+    reply = PerClientFlags(display=d.display, opcode=ext.major_opcode, device_spec=0x100,   # XkbUseCoreKbd
+                           change=detectable, value=detectable,
+                           ctrls_to_change=0, auto_ctrls=0, auto_ctrl_values=0)
+    return bool(reply.supported & reply.value & detectable)
+
+
+class X11Hotkeys(NativeHotkeys):
+    """XGrabKey delle sole combo configurate: il server X non consegna nessun altro tasto.
+
+    L'auto-repeat è reso rilevabile (x11_detectable_autorepeat): un tasto tenuto giù arriva
+    come press ripetuti, che l'engine tratta come con pynput, senza indovinare dai timestamp.
+    """
+
+    name = "x11"
+
+    def __init__(self, engine: HotkeyEngine, dispatch: Callable[[tuple, int], None],
+                 display_name: Optional[str] = None):
+        from Xlib import display
+
+        super().__init__(engine, dispatch)
+        self._display = display.Display(display_name)
+        self._root = self._display.screen().root
+        self._grabs: dict = {}
+        self._pressed: dict[int, str] = {}      # keycode giù → nome (il release può arrivare senza modificatori)
+        self._table: Optional[HotkeyTable] = engine.table
+        self._wake_r, self._wake_w = os.pipe()
+
+    def stop(self):
+        super().stop()
+        self._wake()
+
+    def update(self, table: HotkeyTable):
+        self._table = table                 # ri-registrata dal thread del backend
+        self._wake()
+
+    def _wake(self):
+        with contextlib.suppress(OSError):  # thread già terminato: pipe chiusa
+            os.write(self._wake_w, b"x")
+
+    def _grab_all(self):
+        from Xlib import X, error
+
+        d, root = self._display, self._root
+        root.ungrab_key(X.AnyKey, X.AnyModifier)
+        self._grabs, problems = x11_grabs(self._table, d.keysym_to_keycode)
+        caught = []
+        for kc, state in self._grabs:
+            ec = error.CatchError(error.BadAccess)
+            for lock in _X11_LOCKS:
+                root.grab_key(kc, state | lock, True, X.GrabModeAsync, X.GrabModeAsync, onerror=ec)
+            caught.append((kc, state, ec))
+        d.sync()
+        for kc, state, ec in caught:
+            if ec.get_error() is not None:
+                mask, key = self._grabs.pop((kc, state))
+                problems.append(f"{key!r} with modifiers {mask:#x} is already grabbed by another application")
+        self._registered(problems)
+
+    def _run(self):
+        import select
+        from Xlib import X
+
+        d = self._display
+        if not x11_detectable_autorepeat(d):
+            print("⚠️  X server without detectable auto-repeat: a held hot-key repeats as new presses")
+        self._grab_all()
+        try:
+            while self.running:
+                if not d.pending_events():
+                    ready, _, _ = select.select([d.fileno(), self._wake_r], [], [])
+                    if self._wake_r in ready:
+                        os.read(self._wake_r, 64)
+                        if self.running:
+                            self._grab_all()
+                    continue
+                self._on_key(d.next_event())
+        finally:
+            self._root.ungrab_key(X.AnyKey, X.AnyModifier)
+            d.close()
+            os.close(self._wake_r)
+            os.close(self._wake_w)
+
+    def _on_key(self, ev):
+        from Xlib import X
+
+        if ev.type == X.KeyPress:
+            hit = self._grabs.get((ev.detail, ev.state & ~(X11_LOCK | X11_MOD2)))
+            if hit is None:
+                return
+            self._pressed[ev.detail] = hit[1]
+            self._press(*hit)
+        elif ev.type == X.KeyRelease:
+            name = self._pressed.pop(ev.detail, None)
+            if name is not None:
+                self.engine.release_key(name)
+
+
+# ---- Windows: RegisterHotKey sul thread del backend (ctypes)
+
+_WIN_MODS = ((MOD_ALT, 0x1), (MOD_CTRL, 0x2), (MOD_SHIFT, 0x4), (MOD_CMD, 0x8))    # MOD_ALT/CONTROL/SHIFT/WIN
+_WIN_NOREPEAT = 0x4000
+_WIN_VK = {
+    "backspace": 0x08, "tab": 0x09, "enter": 0x0D, "pause": 0x13, "caps_lock": 0x14, "esc": 0x1B,
+    "space": 0x20, "page_up": 0x21, "page_down": 0x22, "end": 0x23, "home": 0x24, "left": 0x25,
+    "up": 0x26, "right": 0x27, "down": 0x28, "print_screen": 0x2C, "insert": 0x2D, "delete": 0x2E,
+    "menu": 0x5D, "num_lock": 0x90, "scroll_lock": 0x91, "media_volume_mute": 0xAD,
+    "media_volume_down": 0xAE, "media_volume_up": 0xAF, "media_next": 0xB0, "media_previous": 0xB1,
+    "media_play_pause": 0xB3,
+}
+
+
+def win32_vk(name: str, vk_scan: Optional[Callable[[str], int]] = None) -> int:
+    """Virtual-key del tasto `name` (0 se sconosciuto); gli altri caratteri via VkKeyScanW."""
+    if len(name) == 1 and name.isascii() and name.isalnum():
+        return ord(name.upper())
+    if name[0] == "f" and name[1:].isdigit() and 1 <= int(name[1:]) <= 24:
+        return 0x6F + int(name[1:])
+    vk = _WIN_VK.get(name, 0)
+    if not vk and len(name) == 1 and vk_scan is not None:
+        code = vk_scan(name)
+        vk = code & 0xFF if code != -1 and not code & 0x600 else 0     # niente combo con Ctrl/Alt
+    return vk
+
+
+class Win32Hotkeys(NativeHotkeys):
+    """RegisterHotKey delle sole combo configurate, con MOD_NOREPEAT: Windows non consegna
+    né gli altri tasti né l'auto-repeat. I messaggi WM_HOTKEY arrivano al thread del backend."""
+
+    name = "win32"
+    WM_QUIT, WM_HOTKEY, WM_RELOAD = 0x0012, 0x0312, 0x8001     # WM_RELOAD = WM_APP + 1
+
+    def __init__(self, engine: HotkeyEngine, dispatch: Callable[[tuple, int], None]):
+        import ctypes
+
+        super().__init__(engine, dispatch)
+        self._user32 = ctypes.windll.user32                     # type: ignore[attr-defined]
+        self._user32.VkKeyScanW.restype = ctypes.c_short        # -1 = carattere non digitabile
+        self._table = engine.table
+        self._ids: dict[int, tuple[int, str]] = {}
+        self._tid = 0
+
+    def stop(self):
+        super().stop()
+        if self._tid:
+            self._user32.PostThreadMessageW(self._tid, self.WM_QUIT, 0, 0)
+
+    def update(self, table: HotkeyTable):
+        self._table = table
+        if self._tid:
+            self._user32.PostThreadMessageW(self._tid, self.WM_RELOAD, 0, 0)
+
+    def _register(self):
+        user32 = self._user32
+        for hid in self._ids:
+            user32.UnregisterHotKey(None, hid)
+        self._ids, problems = {}, []
+        for mask, key, binding in self._table.combos():
+            vk = win32_vk(key, user32.VkKeyScanW)
+            if not vk:
+                problems.append(f"{binding!r}: no key {key!r} on this keyboard")
+                continue
+            mods = sum(w for m, w in _WIN_MODS if mask & m)
+            combos = [(mods, (mask, key))]
+            sym = self._table.shifted(mask, key)
+            if sym is not None:
+                combos.append((mods | 0x4, (mask | MOD_SHIFT, sym)))
+            for win_mods, hit in combos:
+                hid = len(self._ids) + 1
+                if user32.RegisterHotKey(None, hid, win_mods | _WIN_NOREPEAT, vk):
+                    self._ids[hid] = hit
+                elif hit[1] == key:
+                    problems.append(f"{binding!r} is already registered by another application")
+        self._registered(problems)
+
+    def _run(self):
+        import ctypes
+        from ctypes import wintypes
+
+        user32, msg = self._user32, wintypes.MSG()
+        user32.PeekMessageW(ctypes.byref(msg), None, 0, 0, 0)      # crea la coda dei messaggi
+        self._tid = ctypes.windll.kernel32.GetCurrentThreadId()    # type: ignore[attr-defined]
+        self._register()
+        try:
+            while self.running and user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+                if msg.message == self.WM_HOTKEY:
+                    hit = self._ids.get(msg.wParam)
+                    if hit is not None:
+                        self._press(*hit)
+                        self.engine.release_key(hit[1])     # MOD_NOREPEAT: ogni WM_HOTKEY è un press nuovo
+                elif msg.message == self.WM_RELOAD:
+                    self._register()
+        finally:
+            for hid in self._ids:
+                user32.UnregisterHotKey(None, hid)
+
+
+def make_native_hotkeys(engine: HotkeyEngine, dispatch: Callable[[tuple, int], None]) -> Optional[NativeHotkeys]:
+    """Backend nativo per questa piattaforma; None (con il motivo) se non disponibile."""
+    try:
+        if sys.platform.startswith("win"):
+            return Win32Hotkeys(engine, dispatch)
+        if sys.platform == "darwin":
+            return None                     # nessun backend nativo: resta pynput
+        if not os.environ.get("DISPLAY"):
+            print("⚠️  Native hot-keys unavailable: no X11 display")
+            return None
+        return X11Hotkeys(engine, dispatch)
+    except Exception as e:
+        print("⚠️  Native hot-keys unavailable:", e)
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Process supervisor: reaping dei figli, concorrenza limitata, niente doppi avvii
+# ---------------------------------------------------------------------------
+
+@dataclass
+class LaunchStats:
+    """Contatori per tile (chiave = path dell'app)."""
+    launches: int = 0
+    skipped: int = 0            # già in esecuzione e in fase di avvio
+    failed: int = 0
+    spawn_total: float = 0.0    # tempo speso in Popen / startfile (s)
+    spawn_max: float = 0.0
+    exited: int = 0
+    runtime_total: float = 0.0  # vita dei figli reaped (s)
+    runtime_max: float = 0.0
+    last_exit: Optional[int] = None
+
+    def as_dict(self) -> dict:
+        return {
+            "launches": self.launches, "skipped": self.skipped, "failed": self.failed,
+            "spawn_avg_ms": self.spawn_total / max(1, self.launches) * 1e3,
+            "spawn_max_ms": self.spawn_max * 1e3, "exited": self.exited,
+            "runtime_avg_s": self.runtime_total / max(1, self.exited),
+            "runtime_max_s": self.runtime_max, "last_exit": self.last_exit,
+        }
+
+
+@dataclass
+class _Child:
+    key: str
+    proc: subprocess.Popen
+    started: float
+    holds_slot: bool = True
+
+
+class ProcessSupervisor:
+    """Tiene traccia di ogni processo avviato dai tile.
+
+    * un thread reaper raccoglie i figli terminati (niente zombie `xdg-open`)
+    * al massimo `max_concurrent` avvii in fase di startup contemporaneamente;
+      lo slot si libera quando il figlio esce o dopo `startup_window` secondi
+    * con `reuse_running`, un secondo avvio della stessa app ancora in startup viene saltato
+    """
+
+    POLL = 0.25
+
+    def __init__(self, max_concurrent: int = 4, startup_window: float = 3.0, reuse_running: bool = True):
+        self.max_concurrent = max_concurrent
+        self.startup_window = startup_window
+        self.reuse_running = reuse_running
+        self._children: List[_Child] = []
+        self._starting = 0
+        self._cv = threading.Condition()
+        self.stats: dict[str, LaunchStats] = {}
+        self._reaper = threading.Thread(target=self._reap, name="umpb-reaper", daemon=True)
+        self._reaper.start()
+
+    def configure(self, max_concurrent: Optional[int] = None, startup_window: Optional[float] = None,
+                  reuse_running: Optional[bool] = None):
+        with self._cv:
+            if max_concurrent is not None:
+                self.max_concurrent = max(1, int(max_concurrent))
+            if startup_window is not None:
+                self.startup_window = float(startup_window)
+            if reuse_running is not None:
+                self.reuse_running = bool(reuse_running)
+            self._cv.notify_all()
+
+    def config(self) -> dict:
+        return {"max_concurrent": self.max_concurrent, "startup_window": self.startup_window,
+                "reuse_running": self.reuse_running}
+
+    def launch(self, key: str, argv: Optional[List[str]] = None, start: Optional[Callable[[], None]] = None,
+               timeout: float = 10.0) -> bool:
+        """Avvia `argv` (Popen, tracciato) oppure `start()` (es. os.startfile, non tracciabile).
+
+        Bloccante finché non c'è uno slot libero: va chiamato fuori dal thread GUI.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cv:
+            st = self.stats.setdefault(key, LaunchStats())
+            if self.reuse_running and self._starting_now(key):
+                st.skipped += 1
+                return False
+            while self._starting >= self.max_concurrent:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    st.failed += 1
+                    print(f"⚠️  Launch of {key!r} timed out waiting for a free slot")
+                    return False
+                self._cv.wait(min(left, self.POLL))
+            self._starting += 1
+
+        t0 = time.monotonic()
+        try:
+            import subprocess               # import pigro: la CLI lo paga solo se avvia qualcosa
+            proc = subprocess.Popen(argv) if argv is not None else None
+            if start is not None:
+                start()
+        except Exception as e:
+            with self._cv:
+                self._starting -= 1
+                st.failed += 1
+                self._cv.notify_all()
+            print(f"⚠️  Failed to launch {key!r}:", e)
+            return False
+        spawn = time.monotonic() - t0
+
+        with self._cv:
+            st.launches += 1
+            st.spawn_total += spawn
+            st.spawn_max = max(st.spawn_max, spawn)
+            if proc is None:
+                self._starting -= 1         # nessun handle: niente da sorvegliare
+            else:
+                self._children.append(_Child(key, proc, t0))
+            self._cv.notify_all()
+        return True
+
+    def _starting_now(self, key: str) -> bool:
+        now = time.monotonic()
+        return any(c.key == key and c.holds_slot and now - c.started < self.startup_window
+                   for c in self._children)
+
+    def _reap(self):
+        while True:
+            with self._cv:
+                while not self._children:
+                    self._cv.wait()
+                now = time.monotonic()
+                alive: List[_Child] = []
+                for c in self._children:
+                    code = c.proc.poll()
+                    if code is None:
+                        if c.holds_slot and now - c.started >= self.startup_window:
+                            c.holds_slot = False        # avviato: lo slot torna libero
+                            self._starting -= 1
+                        alive.append(c)
+                        continue
+                    if c.holds_slot:
+                        self._starting -= 1
+                    st = self.stats[c.key]
+                    st.exited += 1
+                    st.last_exit = code
+                    runtime = now - c.started
+                    st.runtime_total += runtime
+                    st.runtime_max = max(st.runtime_max, runtime)
+                if len(alive) != len(self._children):
+                    self._cv.notify_all()
+                self._children = alive
+                self._cv.wait(self.POLL)
+
+    def running(self) -> int:
+        with self._cv:
+            return len(self._children)
+
+    def prewarm(self):
+        """Importa subprocess prima del primo avvio, che altrimenti ne paga il costo."""
+        import subprocess  # noqa: F401
+
+    def snapshot(self) -> dict:
+        with self._cv:
+            return {
+                "running": len(self._children),
+                "starting": self._starting,
+                "tiles": {k: v.as_dict() for k, v in self.stats.items()},
+            }
+
+
+def open_path(supervisor: ProcessSupervisor, path: str) -> bool:
+    """Avvia l’app collegata, cross-platform (tramite il supervisor dei processi)."""
+    if sys.platform.startswith("darwin"):
+        return supervisor.launch(path, ["open", path])
+    if sys.platform.startswith("win"):
+        return supervisor.launch(path, start=lambda: os.startfile(path))   # type: ignore
+    return supervisor.launch(path, ["xdg-open", path])                      # Linux / BSD
+
+
+# ---------------------------------------------------------------------------
+# Tracing: istogrammi di latenza del percorso hotkey → azione
+# ---------------------------------------------------------------------------
+
+class LatencyHistogram:
+    """Istogramma log-lineare (4 bucket per ottava, in µs): memoria costante, percentili ±10%."""
+
+    SUB = 4
+
+    def __init__(self):
+        self.buckets: dict[int, int] = {}
+        self.count = 0
+        self.total_us = 0.0
+        self.min_us = math.inf
+        self.max_us = 0.0
+
+    def add(self, us: float):
+        b = int(math.log2(us) * self.SUB) if us >= 1 else 0
+        self.buckets[b] = self.buckets.get(b, 0) + 1
+        self.count += 1
+        self.total_us += us
+        self.min_us = min(self.min_us, us)
+        self.max_us = max(self.max_us, us)
+
+    def percentile(self, p: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for b in sorted(self.buckets):
+            seen += self.buckets[b]
+            if seen >= rank:
+                return min(self.max_us, 2 ** ((b + 1) / self.SUB))   # limite superiore del bucket
+        return self.max_us
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_us": self.total_us / self.count if self.count else 0.0,
+            "min_us": self.min_us if self.count else 0.0,
+            "p50_us": self.percentile(50), "p90_us": self.percentile(90),
+            "p99_us": self.percentile(99), "max_us": self.max_us,
+            "buckets": {f"{2 ** (b / self.SUB):.1f}": n for b, n in sorted(self.buckets.items())},
+        }
+
+
+class Tracer:
+    """Registro in memoria delle durate per nome di span.
+
+    Da disabilitato ogni punto di misura costa solo la lettura di `TRACE.enabled`:
+    i chiamanti prendono i timestamp solo se il tracing è attivo.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._hists: dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def now() -> int:
+        return time.perf_counter_ns()
+
+    def record(self, name: str, start_ns: int, end_ns: Optional[int] = None):
+        us = ((end_ns or time.perf_counter_ns()) - start_ns) / 1e3
+        with self._lock:
+            h = self._hists.get(name)
+            if h is None:
+                h = self._hists[name] = LatencyHistogram()
+            h.add(max(us, 0.0))
+
+    def completion(self, kind: str, fn: Callable, origin_ns: int) -> Callable:
+        """Avvolge un'azione: registra `action.<kind>` (esecuzione) ed `e2e.<kind>` (dall'origine)."""
+        def run(*args):
+            t0 = time.perf_counter_ns()
+            try:
+                return fn(*args)
+            finally:
+                t1 = time.perf_counter_ns()
+                self.record(f"action.{kind}", t0, t1)
+                self.record(f"e2e.{kind}", origin_ns, t1)
+        return run
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {name: h.as_dict() for name, h in sorted(self._hists.items())}
+
+    def dump(self, path: Path, stats: Optional[dict] = None) -> Path:
+        """Istogrammi in JSON; `stats` (contatori di runtime del chiamante) va nello stesso file."""
+        data = {"taken_at": time.time(), "spans": self.snapshot()}
+        if stats is not None:
+            data["stats"] = stats
+        path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        return path
+
+    def hud_text(self) -> str:
+        with self._lock:
+            parts = []
+            for name in ("e2e.keystroke", "e2e.launch", "e2e.toggle", "signal.delivery"):
+                h = self._hists.get(name)
+                if h is not None and h.count:
+                    parts.append(f"{name.split('.')[-1]} p50 {h.percentile(50) / 1e3:.1f} / p99 {h.percentile(99) / 1e3:.1f} ms")
+        return " • ".join(parts) or "perf HUD: waiting for hotkeys…"
+
+
+TRACE = Tracer(enabled=os.environ.get("UMPB_TRACE", "") not in ("", "0"))
+
+# ---------------------------------------------------------------------------
+# Layout persistence: write-behind con debounce, scrittura atomica + backup
+# ---------------------------------------------------------------------------
+
+DEFAULT_LAYOUT_PATH = Path.home() / ".umpb_layout.json"
+
+
+def layout_files(layout: Path) -> List[Path]:
+    """File da cui provare a caricare, in ordine: layout corrente, poi l'ultima copia buona (.bak)."""
+    return [p for p in (layout, layout.with_name(layout.name + ".bak")) if p.exists()]
+
+
+def journal_path(layout: Path) -> Path:
+    return layout.with_name(layout.name + ".journal")
+
+
+class LayoutPersister:
+    """Scrive il layout su un thread in background.
+
+    Le richieste ravvicinate vengono accorpate in un'unica scrittura dopo
+    `debounce` secondi. Ogni scrittura va su un file temporaneo e poi viene
+    rinominata atomicamente; la versione precedente resta in `<file>.bak`.
+    """
+
+    def __init__(self, path: Path, debounce: float = 0.4, on_written: Optional[Callable[[dict], None]] = None):
+        self.path = path
+        self.on_written = on_written        # chiamato (thread del persister) dopo ogni scrittura riuscita
+        self.backup = path.with_name(path.name + ".bak")
+        self.debounce = debounce
+        self.writes = 0
+        self.coalesced = 0
+        self.written = deque(maxlen=8)      # sha256 delle ultime scritture (il watcher le ignora)
+        self._pending: Optional[dict] = None
+        self._busy = False                  # scrittura in background in corso
+        self._deadline = 0.0
+        self._cv = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="umpb-persist", daemon=True)
+        self._thread.start()
+
+    def candidates(self) -> List[Path]:
+        return layout_files(self.path)
+
+    def schedule(self, data: dict):
+        """Accoda uno snapshot (già serializzabile); sostituisce quello non ancora scritto."""
+        with self._cv:
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = data
+            self._deadline = time.monotonic() + self.debounce
+            self._cv.notify_all()
+
+    def discard(self):
+        """Scarta lo snapshot non ancora scritto (il file è stato cambiato da fuori e vince)."""
+        with self._cv:
+            self._pending = None
+
+    def flush(self):
+        """Scrive subito l'eventuale snapshot in attesa (chiamato all'uscita)."""
+        with self._cv:
+            data, self._pending = self._pending, None
+            while self._busy:
+                self._cv.wait()
+        if data is not None:
+            self._write(data)
+
+    def _run(self):
+        while True:
+            with self._cv:
+                while self._pending is None:
+                    self._cv.wait()
+                delay = self._deadline - time.monotonic()
+                if delay > 0:
+                    self._cv.wait(delay)
+                    continue                # ricontrolla: nel frattempo può essere arrivato altro
+                data, self._pending = self._pending, None
+                self._busy = True
+            self._write(data)
+            with self._cv:
+                self._busy = False
+                self._cv.notify_all()
+
+    def _write(self, data: dict):
+        with self._write_lock:
+            tmp = self.path.with_name(f".{self.path.name}.tmp")
+            try:
+                payload = json.dumps(data, indent=2).encode("utf-8")
+                with tmp.open("wb") as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+                if self.path.exists():
+                    prev = self.path.read_bytes()
+                    try:
+                        json.loads(prev)        # un file corrotto non sovrascrive la copia buona
+                    except ValueError:
+                        prev = None
+                    if prev is not None:
+                        bak_tmp = self.backup.with_name(f".{self.backup.name}.tmp")
+                        bak_tmp.write_bytes(prev)
+                        os.replace(bak_tmp, self.backup)
+                self.written.append(hashlib.sha256(payload).hexdigest())   # prima del rename
+                os.replace(tmp, self.path)
+                self.writes += 1
+            except Exception as e:
+                print("⚠️  Failed to save layout:", e)
+                return
+        if self.on_written is not None:
+            self.on_written(data)
+
+
+def parse_layout(raw: bytes) -> dict:
+    """Bytes del file → dict del layout con le pagine già come Shortcut e le impostazioni
+    validate (sicuro fuori dal thread GUI).
+
+    Solleva un'eccezione se il file non è valido: chi chiama tiene il layout che ha.
+    """
+    data = json.loads(raw)
+    if isinstance(data, list):      # formato v1: solo la lista di pagine
+        data = {"pages": data}
+    data["pages"] = [[Shortcut(**sc) for sc in page] for page in data["pages"]]
+    check_settings(data)
+    return data
+
+
+_LAUNCH_SETTINGS = ("max_concurrent", "startup_window", "reuse_running")
+_HOTKEY_BACKENDS = ("auto", "native", "pynput")
+
+
+def _setting_num(value, name: str, kind: type = int, minimum: float = 0):
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"{name}: expected a number, got {value!r}")
+    try:
+        n = kind(value)
+    except ValueError:
+        raise ValueError(f"{name}: expected a number, got {value!r}") from None
+    if n < minimum:
+        raise ValueError(f"{name}: must be at least {minimum}, got {value!r}")
+    return n
+
+
+def _setting_type(value, name: str, kind, what: str):
+    if not isinstance(value, kind):
+        raise ValueError(f"{name}: expected {what}, got {value!r}")
+    return value
+
+
+def check_settings(data: dict) -> dict:
+    """Valida e normalizza (in place) le impostazioni del layout; ValueError al primo valore non valido.
+
+    Le chiavi assenti restano assenti (valgono i default di chi applica il layout).
+    """
+    if "theme" in data:
+        _setting_type(data["theme"], "theme", str, "a theme name")
+    if "renderer" in data:
+        _setting_type(data["renderer"], "renderer", str, "a renderer name")
+    if "hotkeys" in data:
+        hk = _setting_type(data["hotkeys"], "hotkeys", dict, "an object")
+        for key in ("toggle", "palette", "most_used"):
+            if hk.get(key) is not None:
+                _setting_type(hk[key], f"hotkeys.{key}", str, "a binding")
+        for key in ("tiles", "pages"):
+            if key in hk:
+                for b in _setting_type(hk[key], f"hotkeys.{key}", list, "a list of bindings"):
+                    if b is not None:
+                        _setting_type(b, f"hotkeys.{key}", str, "a list of bindings")
+        for sym, k in _setting_type(hk.get("aliases", {}), "hotkeys.aliases", dict, "an object").items():
+            _setting_type(k, f"hotkeys.aliases.{sym}", str, "a key name")
+        for b, lim in _setting_type(hk.get("limits", {}), "hotkeys.limits", dict, "an object").items():
+            _setting_type(lim, f"hotkeys.limits.{b}", dict, "an object")
+            if "repeat" in lim:
+                _setting_type(lim["repeat"], f"hotkeys.limits.{b}.repeat", bool, "true or false")
+            if "interval_ms" in lim:
+                lim["interval_ms"] = _setting_num(lim["interval_ms"], f"hotkeys.limits.{b}.interval_ms")
+        if hk.get("backend", "auto") not in _HOTKEY_BACKENDS:
+            raise ValueError(f"hotkeys.backend: expected one of {', '.join(_HOTKEY_BACKENDS)}, got {hk['backend']!r}")
+    if "grid" in data:
+        grid = _setting_type(data["grid"], "grid", dict, "an object")
+        for key in ("rows", "cols"):
+            if key in grid:
+                grid[key] = _setting_num(grid[key], f"grid.{key}", minimum=1)
+    if data.get("max_pages") is not None:
+        data["max_pages"] = _setting_num(data["max_pages"], "max_pages", minimum=1)
+    if data.get("most_used") is not None:
+        data["most_used"] = _setting_num(data["most_used"], "most_used")
+    if "prewarm" in data:
+        data["prewarm"] = _setting_num(data["prewarm"] or 0, "prewarm")
+    if "launch" in data:
+        launch = _setting_type(data["launch"], "launch", dict, "an object")
+        for key, value in launch.items():
+            if key not in _LAUNCH_SETTINGS:
+                raise ValueError(f"launch: unknown setting {key!r} (expected {', '.join(_LAUNCH_SETTINGS)})")
+            if value is None:
+                continue
+            if key == "max_concurrent":
+                launch[key] = _setting_num(value, "launch.max_concurrent", minimum=1)
+            elif key == "startup_window":
+                launch[key] = _setting_num(value, "launch.startup_window", float)
+            else:
+                _setting_type(value, "launch.reuse_running", bool, "true or false")
+    if "app_rules" in data:
+        rules = _setting_type(data["app_rules"], "app_rules", dict, "an object")
+        for app, page in rules.items():
+            rules[app] = _setting_num(page, f"app_rules.{app}", minimum=1)
+    return data
+
+
+_INVERSE_OPS = {"add": "delete", "delete": "add", "add_page": "remove_page", "remove_page": "add_page"}
+
+
+def apply_layout_op(pages: List[List[Shortcut]], op: dict) -> int:
+    """Applica un'operazione del journal a `pages` (in place); restituisce la pagina toccata.
+
+    Operazioni: add / delete {page, index, shortcut}, add_page / remove_page {page}.
+    ValueError se l'operazione non è applicabile al layout.
+    """
+    kind, p = op["op"], op["page"]
+    if kind == "add_page":
+        p = min(p, len(pages))
+        pages.insert(p, [])
+        return p
+    if not 0 <= p < len(pages):
+        raise ValueError(f"{kind}: no page {p}")
+    if kind == "remove_page":
+        if pages[p] or len(pages) == 1:
+            raise ValueError(f"remove_page: page {p} is not empty")
+        del pages[p]
+        return p
+    page = pages[p]
+    if kind == "add":
+        page.insert(min(op["index"], len(page)), Shortcut(**op["shortcut"]))
+        return p
+    if kind == "delete":
+        sid, i = op["shortcut"]["id"], op["index"]
+        if not (i < len(page) and page[i].id == sid):
+            i = next((n for n, sc in enumerate(page) if sc.id == sid), None)
+            if i is None:
+                raise ValueError(f"delete: no shortcut {sid!r} on page {p}")
+        del page[i]
+        return p
+    raise ValueError(f"unknown layout operation {kind!r}")
+
+
+def invert_layout_op(op: dict) -> dict:
+    """L'operazione che annulla `op` (per l'undo)."""
+    inv = {k: v for k, v in op.items() if k != "seq"}
+    inv["op"] = _INVERSE_OPS[op["op"]]
+    return inv
+
+
+class LayoutJournal:
+    """Journal append-only delle modifiche al layout (JSON lines accanto al file di layout).
+
+    La prima riga è {"journal": id}, poi un'operazione per riga con `seq` crescente.
+    Lo snapshot (il file di layout) ricorda {"id", "seq"} dell'ultima operazione inclusa:
+    all'avvio si rigiocano solo le operazioni successive dello stesso journal. Append e
+    compattazione girano, in ordine, su un unico thread; l'append non fa fsync.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.id = ""
+        self.seq = 0
+        self.since_snapshot = 0             # operazioni non ancora incluse in uno snapshot
+        self.compactions = 0
+        self._fresh = False                 # restart() non ancora scritto su disco
+        self._io = None                     # executor creato alla prima scrittura (la CLI legge soltanto)
+        self._io_lock = threading.Lock()    # compact() arriva anche dal thread del persister
+
+    def load(self, snapshot: dict) -> List[dict]:
+        """Operazioni da rigiocare su `snapshot`; un journal che non gli appartiene viene scartato."""
+        ref = snapshot.get("journal") or {}
+        header, ops = None, []
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                header = json.loads(f.readline() or "null")
+                for line in f:
+                    try:
+                        ops.append(json.loads(line))
+                    except ValueError:
+                        break               # riga troncata da un crash: ci si ferma lì
+        except (OSError, ValueError):
+            pass
+        if not (header and ref.get("id") and header.get("journal") == ref["id"]):
+            if ops:
+                print(f"⚠️  {self.path.name} does not match the layout snapshot; ignoring {len(ops)} edit(s)")
+            self.restart()
+            return []
+        ops = [op for op in ops if op.get("seq", 0) > ref.get("seq", 0)]
+        self.id = ref["id"]
+        self.seq = max([ref.get("seq", 0)] + [op["seq"] for op in ops])
+        self.since_snapshot = len(ops)
+        return ops
+
+    def restart(self, truncate: bool = False):
+        """Nuovo journal vuoto (nuovo id): lo snapshot successivo ne diventa la base.
+
+        Il file viene riscritto alla prima operazione, o subito con `truncate` se esiste
+        (le operazioni che contiene non valgono più per il layout sul disco).
+        """
+        self.id = os.urandom(6).hex()
+        self.seq = 0
+        self.since_snapshot = 0
+        self._fresh = True
+        if truncate and self.path.exists():
+            self._fresh = False
+            self._submit(self._rewrite, self.id, [])
+
+    def append(self, op: dict) -> dict:
+        if self._fresh:
+            self._fresh = False
+            self._submit(self._rewrite, self.id, [])
+        self.seq += 1
+        self.since_snapshot += 1
+        op = {**op, "seq": self.seq}
+        self._submit(self._append, json.dumps(op, ensure_ascii=False))
+        return op
+
+    def position(self) -> dict:
+        """Da salvare nello snapshot; azzera il conteggio delle operazioni pendenti."""
+        self.since_snapshot = 0
+        return {"id": self.id, "seq": self.seq}
+
+    def compact(self, position: dict):
+        """Scarta le operazioni già incluse nello snapshot scritto (chiamabile da qualunque thread)."""
+        self._submit(self._compact, position.get("id"), position.get("seq", 0))
+
+    def close(self):
+        if self._io is not None:
+            self._io.shutdown(wait=True)
+
+    def _submit(self, fn: Callable, *args):
+        with self._io_lock:
+            if self._io is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="umpb-journal")
+            self._io.submit(fn, *args)
+
+    # ---- thread del journal
+    def _append(self, line: str):
+        try:
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            print("⚠️  Failed to write journal:", e)
+
+    def _compact(self, jid: str, upto: int):
+        if jid != self.id:
+            return                          # snapshot di un journal precedente
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                if (json.loads(f.readline() or "null") or {}).get("journal") != jid:
+                    raise ValueError        # journal precedente: lo snapshot lo rende obsoleto
+                keep = [line.rstrip("\n") for line in f if json.loads(line).get("seq", 0) > upto]
+        except (OSError, ValueError):
+            keep = []
+        self._rewrite(jid, keep)
+        self.compactions += 1
+
+    def _rewrite(self, jid: str, lines: List[str]):
+        tmp = self.path.with_name(f".{self.path.name}.tmp")
+        try:
+            tmp.write_text("".join(l + "\n" for l in [json.dumps({"journal": jid}), *lines]), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print("⚠️  Failed to write journal:", e)
+
+
+def read_layout(paths: List[Path]) -> Optional[tuple[str, dict]]:
+    """(sha256, layout parsato) dal primo file leggibile: se è corrotto si passa al successivo (.bak)."""
+    for path in paths:
+        try:
+            raw = path.read_bytes()
+            return hashlib.sha256(raw).hexdigest(), parse_layout(raw)
+        except Exception as e:
+            print(f"⚠️  Failed to load layout from {path}:", e)
+    return None
+
+
+def replay_journal(pages: List[List[Shortcut]], ops: List[dict]) -> List[List[Shortcut]]:
+    """Rigioca sulle pagine dello snapshot le operazioni del journal; ci si ferma alla prima non valida."""
+    for op in ops:
+        try:
+            apply_layout_op(pages, op)
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"⚠️  Journal replay stopped at seq {op.get('seq')}:", e)
+            break
+    return pages
+
+
+def load_layout(path: Path) -> dict:
+    """Layout effettivo come lo vede l'overlay all'avvio (snapshot + journal), in sola lettura.
+
+    Senza file di layout restituisce la pagina di default.
+    """
+    loaded = read_layout(layout_files(path))
+    data = loaded[1] if loaded is not None else {"pages": [default_shortcuts()]}
+    data["pages"] = replay_journal(data["pages"], LayoutJournal(journal_path(path)).load(data))
+    return data
+
+
+def check_layout(pages: List[List[Shortcut]]) -> List[str]:
+    """Problemi che l'overlay tollererebbe in silenzio: id duplicati, tile che non fanno nulla."""
+    problems, seen = [], set()
+    for p, page in enumerate(pages, 1):
+        for i, sc in enumerate(page, 1):
+            where = f"tile {p}:{i} ({sc.name!r})"
+            if sc.id in seen:
+                problems.append(f"{where}: duplicate id {sc.id!r}")
+            seen.add(sc.id)
+            if sc.type == "app" and not sc.path:
+                problems.append(f"{where}: app without a path")
+            elif sc.type in ("shortcut", "macro") and not sc.plan:
+                problems.append(f"{where}: nothing to run")
+            elif sc.type not in ("shortcut", "app", "macro"):
+                problems.append(f"{where}: unknown type {sc.type!r}")
+    return problems
+
+
+# ---------------------------------------------------------------------------
+# Usage telemetry: contatori per tile, scritti a lotti accanto al layout
+# ---------------------------------------------------------------------------
+
+def usage_path(layout: Path) -> Path:
+    return layout.with_name(layout.name + ".usage")
+
+
+@dataclass
+class TileUsage:
+    hits: int = 0
+    last: float = 0.0                                               # epoch dell'ultimo uso
+    hours: List[int] = field(default_factory=lambda: [0] * 24)      # usi per ora del giorno (locale)
+    after: Counter = field(default_factory=Counter)                 # id del tile usato subito dopo → volte
+
+    def as_dict(self) -> dict:
+        return {"hits": self.hits, "last": self.last, "hours": self.hours,
+                "after": dict(self.after.most_common(UsageStats.MAX_AFTER))}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "TileUsage":
+        hours = [int(h) for h in d.get("hours", [])][:24]
+        return cls(int(d.get("hits", 0)), float(d.get("last", 0.0)),
+                   hours + [0] * (24 - len(hours)), Counter(d.get("after", {})))
+
+
+class UsageStats:
+    """Contatori d'uso per `Shortcut.id`: quante volte, quando, a che ora, cosa viene dopo.
+
+    `hit()` è un solo append (thread GUI, niente lock né I/O). Gli eventi vengono accorpati
+    nei contatori da `fold`, chiamato dal proprietario fuori dal percorso del click (timer,
+    prima di leggere la classifica) e, ogni `batch` usi o con `flush`, scritti in background
+    su `<layout>.usage` (stessa scrittura atomica del layout).
+    """
+
+    MAX_AFTER = 8               # successori ricordati per tile
+    FOLLOW_WINDOW = 600.0       # s: un uso più tardi non conta come "subito dopo"
+    HALF_LIFE_DAYS = 14.0       # il punteggio di un tile non usato si dimezza ogni due settimane
+
+    def __init__(self, path: Optional[Path] = None, batch: int = 32):
+        self.path = path
+        self.batch = batch
+        self.tiles: dict[str, TileUsage] = {}
+        self.unsaved = 0
+        self._pending: list = []
+        self._last: Optional[tuple[str, float]] = None     # ultimo uso già accorpato (id, t)
+        self._persister: Optional[LayoutPersister] = None
+
+    def load(self) -> "UsageStats":
+        if self.path is None or not self.path.exists():
+            return self
+        try:
+            data = json.loads(self.path.read_bytes())
+            self.tiles = {sid: TileUsage.from_dict(d) for sid, d in data.get("tiles", {}).items()}
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            print("⚠️  Ignoring unreadable usage stats:", e)
+        return self
+
+    def hit(self, sid: str):
+        self._pending.append((sid, time.time()))
+
+    def fold(self) -> int:
+        """Accorpa gli usi in attesa nei contatori; ogni `batch` usi li scrive su disco."""
+        pending, self._pending = self._pending, []
+        prev, tiles = self._last, self.tiles
+        for sid, t in pending:
+            u = tiles.get(sid)
+            if u is None:
+                u = tiles[sid] = TileUsage()
+            u.hits += 1
+            u.last = t
+            u.hours[time.localtime(t).tm_hour] += 1
+            if prev is not None and prev[0] != sid and t - prev[1] <= self.FOLLOW_WINDOW:
+                before = tiles.get(prev[0])
+                if before is not None:
+                    before.after[sid] += 1
+            prev = (sid, t)
+        self._last = prev
+        self.unsaved += len(pending)
+        if self.unsaved >= self.batch:
+            self.save()
+        return len(pending)
+
+    def save(self):
+        if self.path is None:
+            return
+        if self._persister is None:
+            self._persister = LayoutPersister(self.path)
+        self.unsaved = 0
+        self._persister.schedule(self.as_dict())
+
+    def flush(self):
+        """Scrive subito quanto non è ancora su disco (chiusura, snapshot del layout)."""
+        self.fold()
+        if self.unsaved:
+            self.save()
+
+    def close(self):
+        self.flush()
+        if self._persister is not None:
+            self._persister.flush()
+
+    def as_dict(self) -> dict:
+        return {"version": 1, "tiles": {sid: u.as_dict() for sid, u in self.tiles.items()}}
+
+    def score(self, u: TileUsage, now: float, hour: int) -> float:
+        """Frequenza, con un peso in più per gli usi attorno a quest'ora, decaduta con l'inattività."""
+        near = u.hours[hour] + (u.hours[hour - 1] + u.hours[(hour + 1) % 24]) / 2
+        return (u.hits + 2 * near) * 0.5 ** ((now - u.last) / 86400 / self.HALF_LIFE_DAYS)
+
+    def ranked(self, limit: int, known=None, now: Optional[float] = None) -> List[str]:
+        """I `limit` id più usati (solo quelli in `known`, se dato), dal più probabile."""
+        now = time.time() if now is None else now
+        hour = time.localtime(now).tm_hour
+        items = [(sid, u) for sid, u in self.tiles.items() if known is None or sid in known]
+        best = heapq.nlargest(limit, items, key=lambda it: self.score(it[1], now, hour))
+        return [sid for sid, _ in best]
+
+    def likely_next(self, limit: int, known=None) -> List[str]:
+        """Tile probabili dopo l'ultimo usato: i suoi successori abituali, poi i più usati."""
+        out: List[str] = []
+        last = self.tiles.get(self._last[0]) if self._last is not None else None
+        if last is not None:
+            out = [sid for sid, _ in last.after.most_common() if known is None or sid in known][:limit]
+        for sid in self.ranked(limit + len(out), known):
+            if len(out) >= limit:
+                break
+            if sid not in out:
+                out.append(sid)
+        return out
+
+
+# ---------------------------------------------------------------------------
+# Search index: trigrammi + prefissi su name/action/key/path per la palette
+# ---------------------------------------------------------------------------
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class ShortcutIndex:
+    """Indice precostruito per la ricerca fuzzy dei tile.
+
+    * query < 3 caratteri: dizionario dei prefissi (1-2 char) di ogni parola
+    * query ≥ 3 caratteri: posting list per trigramma; un candidato deve avere
+      almeno metà dei trigrammi della query (tollera refusi), poi viene ordinato
+      per copertura, con bonus per match nel nome e a inizio parola.
+    """
+
+    _SEPARATORS = str.maketrans("/\\+_-.", "      ")
+
+    def __init__(self, pages: List[List[Shortcut]]):
+        self.entries: List[tuple[int, int, Shortcut]] = []
+        self.by_id: dict[str, tuple[int, int, Shortcut]] = {}
+        self._names: List[str] = []
+        self._texts: List[str] = []
+        self._grams: defaultdict[str, List[int]] = defaultdict(list)
+        self._prefix: defaultdict[str, List[int]] = defaultdict(list)
+        for p, page in enumerate(pages):
+            for i, sc in enumerate(page):
+                self._add(p, i, sc)
+
+    def _add(self, page: int, idx: int, sc: Shortcut):
+        n = len(self.entries)
+        self.entries.append((page, idx, sc))
+        self.by_id[sc.id] = (page, idx, sc)
+        name = sc.name.lower()
+        text = " ".join(x for x in (name, sc.action, sc.key, sc.path) if x).lower()
+        self._names.append(name)
+        self._texts.append(text)
+        grams = self._grams
+        for g in _trigrams(text):
+            grams[g].append(n)
+        prefixes = {w[:k] for w in text.translate(self._SEPARATORS).split() for k in (1, 2)}
+        for pre in prefixes:
+            self._prefix[pre].append(n)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def search(self, query: str, limit: int = 50) -> List[tuple[int, int, Shortcut]]:
+        q = query.strip().lower()
+        if not q:
+            return self.entries[:limit]
+        if len(q) < 3:
+            hits = ((self._score(n, q, 1.0), n) for n in self._prefix.get(q, ()))
+        else:
+            grams = _trigrams(q)
+            counts: Counter = Counter()
+            for g in grams:
+                counts.update(self._grams.get(g, ()))
+            need = (len(grams) + 1) // 2
+            hits = ((self._score(n, q, c / len(grams)), n) for n, c in counts.items() if c >= need)
+        return [self.entries[n] for _, n in heapq.nlargest(limit, hits)]
+
+    def _score(self, n: int, q: str, coverage: float) -> float:
+        name = self._names[n]
+        score = coverage
+        if name.startswith(q):
+            score += 2.0
+        elif q in name:
+            score += 1.0
+        elif q in self._texts[n]:
+            score += 0.5
+        return score - len(name) * 1e-3           # a parità, nomi più corti prima
+
+
+# ---------------------------------------------------------------------------
+# Canale di controllo: client senza Qt, per inoltrare i comandi prima di importare PySide6
+# ---------------------------------------------------------------------------
+
+def control_name() -> str:
+    """Nome del socket locale (per utente; sovrascrivibile con UMPB_CONTROL)."""
+    import getpass
+    return os.environ.get("UMPB_CONTROL") or f"umpb-{getpass.getuser()}"
+
+
+def control_socket_path(name: str) -> Optional[str]:
+    """Percorso del socket Unix di QLocalServer per `name` (come QDir::tempPath); None su Windows,
+    dove il canale è una named pipe e serve il client Qt."""
+    if sys.platform == "win32":
+        return None
+    if name.startswith("/"):
+        return name
+    return os.path.join(os.environ.get("TMPDIR") or "/tmp", name)
+
+
+def send_control(name: str, commands: List[str], timeout_ms: int = 300) -> Optional[List[str]]:
+    """Invia i comandi all'istanza in ascolto; None se non c'è nessuno dall'altra parte
+    (o se la piattaforma non ha socket Unix: vedi control_socket_path)."""
+    path = control_socket_path(name)
+    if path is None:
+        return None
+    import socket
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout_ms / 1000)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    buf = b""
+    deadline = time.monotonic() + timeout_ms / 1000
+    try:
+        sock.sendall("".join(c + "\n" for c in commands).encode("utf-8"))
+        while buf.count(b"\n") < len(commands):
+            left = deadline - time.monotonic()
+            if left <= 0:
+                break
+            sock.settimeout(left)
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            buf += chunk
+    except OSError:
+        pass                            # risposte parziali: chi chiama conta le righe
+    finally:
+        sock.close()
+    return buf.decode("utf-8", "replace").splitlines()[:len(commands)]
+
+
+# ---------------------------------------------------------------------------
+# CLI: python -m umpb list | run | import | export (niente Qt, niente display)
+# ---------------------------------------------------------------------------
+
+def find_tile(pages: List[List[Shortcut]], ref: str) -> Shortcut:
+    """"2:3" (pagina:tile, da 1) oppure uno Shortcut.id → Shortcut; KeyError se non esiste."""
+    page, sep, tile = ref.partition(":")
+    if sep and page.isdigit() and tile.isdigit():
+        p, t = int(page) - 1, int(tile) - 1
+        if 0 <= p < len(pages) and 0 <= t < len(pages[p]):
+            return pages[p][t]
+        raise KeyError(f"no tile {ref} in a layout of {len(pages)} page(s)")
+    for page in pages:
+        for sc in page:
+            if sc.id == ref:
+                return sc
+    raise KeyError(f"no tile with id {ref!r}")
+
+
+def _describe(sc: Shortcut) -> str:
+    if sc.type == "app":
+        return sc.path or ""
+    if sc.type == "macro":
+        return f"{len(sc.steps or [])} step(s)"
+    return sc.key
+
+
+def _snapshot(data: dict) -> dict:
+    """Layout pronto per json.dump, senza posizione del journal (è uno snapshot nuovo)."""
+    out = {k: v for k, v in data.items() if k != "journal"}
+    out["version"] = 2
+    out["pages"] = [[sc.to_dict() for sc in page] for page in data["pages"]]
+    return out
+
+
+def _cli_list(args, data: dict) -> int:
+    pages = data["pages"]
+    if args.json:
+        print(json.dumps([[sc.to_dict() for sc in page] for page in pages], ensure_ascii=False))
+        return 0
+    for p, page in enumerate(pages, 1):
+        for i, sc in enumerate(page, 1):
+            print(f"{f'{p}:{i}':<7}{sc.type:<10}{sc.name:<24}{_describe(sc)}")
+    return 0
+
+
+def _cli_run(args, data: dict) -> int:
+    try:
+        sc = find_tile(data["pages"], args.tile)
+    except KeyError as e:
+        print(f"umpb: {e.args[0]}", file=sys.stderr)
+        return 2
+    problems = check_layout([[sc]])
+    if problems:
+        print(f"umpb: {problems[0].partition(': ')[2]}", file=sys.stderr)
+        return 1
+    if args.dry_run:
+        print(json.dumps({"name": sc.name, "type": sc.type, "plan": sc.plan or sc.path}, ensure_ascii=False))
+        return 0
+    if sc.type == "shortcut":
+        return 0 if send_plan(sc.plan) else 1
+    supervisor = ProcessSupervisor()
+    supervisor.configure(**data.get("launch", {}))
+    if sc.type == "app":
+        return 0 if open_path(supervisor, sc.path) else 1
+    runner = MacroRunner({
+        "keys": send_plan,
+        "text": KEYBOARD.type_text,
+        "launch": lambda path: open_path(supervisor, path),
+        "page": lambda idx: print(f"umpb: page {idx + 1} step skipped (no overlay)", file=sys.stderr),
+    })
+    runner.run(sc.id, sc.plan)
+    runner.wait()
+    return 1 if runner.counters["failed"] else 0
+
+
+def _cli_export(args, data: dict) -> int:
+    text = json.dumps(_snapshot(data), indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    return 0
+
+
+def _cli_import(args) -> int:
+    try:
+        raw = sys.stdin.buffer.read() if args.file == "-" else Path(args.file).read_bytes()
+        with contextlib.redirect_stdout(sys.stderr):    # avvisi di parsing fuori dall'output
+            data = parse_layout(raw)
+    except Exception as e:
+        print(f"umpb: invalid layout {args.file}: {e}", file=sys.stderr)
+        return 1
+    problems = check_layout(data["pages"])
+    for msg in problems:
+        print(f"umpb: {msg}", file=sys.stderr)
+    if problems or args.check:
+        return 1 if problems else 0
+    persister = LayoutPersister(args.layout)    # atomico + .bak; un overlay aperto lo ricarica
+    persister.schedule(_snapshot(data))
+    persister.flush()
+    if not persister.writes:
+        return 1
+    n = sum(len(page) for page in data["pages"])
+    print(f"Imported {n} tile(s) on {len(data['pages'])} page(s) into {args.layout}")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="umpb", description="UMPB layouts and actions without the overlay")
+    parser.add_argument("--layout", type=Path, default=DEFAULT_LAYOUT_PATH, metavar="PATH",
+                        help=f"layout file (default {DEFAULT_LAYOUT_PATH})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("list", help="list the tiles as page:tile")
+    p.add_argument("--json", action="store_true", help="pages as JSON instead of a table")
+    p = sub.add_parser("run", help="run a tile like the overlay would")
+    p.add_argument("tile", help="page:tile (1-based, as in Alt+1…8) or a tile id")
+    p.add_argument("--dry-run", action="store_true", help="print the compiled plan instead of running it")
+    p = sub.add_parser("export", help="write the effective layout (snapshot + journal)")
+    p.add_argument("-o", "--output", help="file to write (default stdout)")
+    p = sub.add_parser("import", help="validate a layout and make it the current one")
+    p.add_argument("file", help="layout JSON, or - for stdin")
+    p.add_argument("--check", action="store_true", help="only validate; exit status 1 on problems")
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        return _cli_import(args)
+    with contextlib.redirect_stdout(sys.stderr):
+        data = load_layout(args.layout)
+    return {"list": _cli_list, "run": _cli_run, "export": _cli_export}[args.command](args, data)
+
+
+if __name__ == "__main__":
+    sys.exit(main())